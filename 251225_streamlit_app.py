@@ -1,30 +1,48 @@
 import streamlit as st
-import re
-import requests
 import pandas as pd
-import os
 import datetime
 import time
-import urllib.parse
-from streamlit_gsheets import GSheetsConnection
+import json
+import tracing
+from bookshelf import bookshelf, shelf_books
+from sheet_store import SheetStore, open_worksheet
+from local_mirror import LocalMirror
+from data_layer import DataLayer
+from libraries import LOCAL_HEADER, find_by_password, load_libraries, storage_name
+from book_table import CATEGORY_LIST, LANGUAGE_LIST, apply_filters, normalize_books, rating_value, sort_books
+from search_index import SearchIndex
+from reading_stats import compute_stats
 
 # --- 設定 ---
-CATEGORY_LIST = ["小説", "Stoicism", "語学", "キャリア", "AI", "ビジネス", "ノンフィクション", "エッセイ", "その他"]
-LANGUAGE_LIST = ["日本語", "英語", "スペイン語"]
-STATUS_LIST = ["読了", "読書中", "読みたい", "断念"]
+# 本棚・リストは月単位で少しずつ表示する（1ページの目安冊数と上限）
+PAGE_BOOKS = 70
+PAGE_MAX_BOOKS = 140
 
 # --- ページの設定 ---
 st.set_page_config(page_title="Reading Log", page_icon="📚", layout="wide")
+tracing.start()
 
 # --- 初期化 (Session State) ---
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
-if 'edit_index' not in st.session_state:
-    st.session_state.edit_index = None
-if 'active_detail_index' not in st.session_state:
-    st.session_state.active_detail_index = None
+if 'detail_mode' not in st.session_state:
+    st.session_state.detail_mode = "view"
 if 'filter_reset_key' not in st.session_state:
     st.session_state.filter_reset_key = 0
+if 'shelf_pages' not in st.session_state:
+    st.session_state.shelf_pages = 1
+
+# --- 本棚（ライブラリ）の選択 ---
+# 1つのサーバーで複数の本棚を扱う（?lib=<名前> で選ぶ。設定は libraries.py を参照）
+LIBRARIES = load_libraries(st.secrets)
+lib_name = st.query_params.get("lib", next(iter(LIBRARIES)))
+if lib_name not in LIBRARIES:
+    st.error(f"本棚「{lib_name}」は見つかりません")
+    st.stop()
+library = LIBRARIES[lib_name]
+# ログインは本棚ごと（別の本棚を開いたら編集モードを解除する）
+if st.session_state.authenticated and st.session_state.get("auth_library", lib_name) != lib_name:
+    st.session_state.authenticated = False
 
 # --- デザイン ---
 st.markdown("""
@@ -42,45 +60,7 @@ h1, h2, h3, h4 { font-family: 'Outfit', sans-serif; }
 }
 .stButton>button:hover { border-color: #94a3b8; background-color: #f8fafc; color: #1e293b; }
 
-/* --- 本棚ギャラリーのCSS --- */
-/* 書影のスタイル */
-.book-cover {
-    width: 100%;
-    aspect-ratio: 2/3;
-    object-fit: cover;
-    border-radius: 8px;
-    box-shadow: 0 4px 10px rgba(0,0,0,0.1);
-    transition: all 0.4s ease;
-    display: block;
-}
-.book-cover:hover {
-    transform: translateY(-5px);
-    box-shadow: 0 15px 30px rgba(0,0,0,0.2);
-}
-
-/* グリッド内のボタンを「豆アイコン」にする */
-.grid-btn button {
-    width: 32px !important;
-    height: 32px !important;
-    min-height: 32px !important;
-    padding: 0 !important;
-    border-radius: 50% !important;
-    background: rgba(255,255,255,0.9) !important;
-    border: none !important;
-    box-shadow: 0 2px 8px rgba(0,0,0,0.15) !important;
-    font-size: 14px !important;
-    line-height: 32px !important;
-    margin-top: -40px !important;
-    margin-left: auto !important;
-    margin-right: 5px !important;
-    display: block !important;
-    position: relative !important;
-    z-index: 10 !important;
-}
-.grid-btn button:hover {
-    background: white !important;
-    transform: scale(1.1) !important;
-}
+/* 本棚・リストのCSSは bookshelf_frontend/index.html */
 
 /* サイドバーをコンパクトに */
 [data-testid="stSidebar"] [data-testid="stVerticalBlock"] {
@@ -114,86 +94,12 @@ h1, h2, h3, h4 { font-family: 'Outfit', sans-serif; }
 [data-testid="stSidebar"] hr {
     margin: 0.5rem 0 !important;
 }
-/* --- Notion風リストのCSS --- */
-.notion-list-item {
-    display: flex;
-    align-items: flex-start;
-    background: white;
-    padding: 12px;
-    border-radius: 12px;
-    margin-bottom: 15px;
-    box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-    transition: transform 0.2s ease;
-    border: 1px solid #edf2f7;
-}
-.notion-list-item:hover {
-    transform: translateY(-2px);
-    box-shadow: 0 4px 12px rgba(0,0,0,0.1);
-}
-.notion-cover {
-    width: 80px;
-    height: 110px;
-    object-fit: cover;
-    border-radius: 6px;
-    box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-    margin-right: 15px;
-    flex-shrink: 0;
-}
-.notion-content {
-    flex-grow: 1;
-    min-width: 0; /* 折り返しを正常にするため */
-}
-.notion-title {
-    font-size: 1.1rem;
-    font-weight: 700;
-    color: #1e293b;
-    margin-bottom: 2px;
-    line-height: 1.3;
-}
-.notion-author {
-    font-size: 0.9rem;
-    color: #64748b;
-    margin-bottom: 8px;
-}
-.notion-meta-row {
-    display: flex;
-    flex-wrap: wrap;
-    gap: 6px;
-    margin-bottom: 8px;
-}
-.notion-tag {
-    font-size: 0.75rem;
-    padding: 2px 8px;
-    border-radius: 4px;
-    background: #f1f5f9;
-    color: #475569;
-}
-.notion-rating {
-    color: #f59e0b;
-    font-size: 0.9rem;
-    font-weight: 600;
-    margin-bottom: 6px;
-}
-.notion-comment {
-    font-size: 0.85rem;
-    color: #475569;
-    line-height: 1.4;
-    border-left: 3px solid #e2e8f0;
-    padding-left: 8px;
-    margin-top: 5px;
-}
-.notion-footer {
-    font-size: 0.75rem;
-    color: #94a3b8;
-    margin-top: 8px;
-    text-align: right;
-}
 </style>
 """, unsafe_allow_html=True)
 
 # --- サイドバー (管理・設定) ---
 st.sidebar.markdown(
-    "<h1 style='font-size: 1.5rem; margin-bottom: 0px; margin-top: -30px;'>📚 読書記録</h1>", 
+    f"<h1 style='font-size: 1.5rem; margin-bottom: 0px; margin-top: -30px;'>📚 {library['title']}</h1>", 
     unsafe_allow_html=True
 )
 
@@ -201,8 +107,13 @@ st.sidebar.markdown(
 if not st.session_state.authenticated:
     with st.sidebar.expander("🔐 管理ログイン"):
         pw = st.text_input("パスワードを入力", type="password")
-        if pw == "251225":
+        login_lib = find_by_password(LIBRARIES, pw) if pw else None
+        if login_lib:
+            # パスワードの本棚に切り替えてログインする
             st.session_state.authenticated = True
+            st.session_state.auth_library = login_lib
+            if login_lib != lib_name:
+                st.query_params["lib"] = login_lib
             st.rerun()
         elif pw != "":
             st.error("× パスワードが違います")
@@ -215,333 +126,317 @@ else:
     
     if st.sidebar.button("ログアウト", use_container_width=True):
         st.session_state.authenticated = False
-        st.session_state.edit_index = None
+        st.session_state.pop("auth_library", None)
+        st.session_state.detail_mode = "view"
         st.rerun()
     st.sidebar.markdown("---")
 
 # --- 関数 ---
-def update_gsheet(df_all):
-    try:
-        conn.update(worksheet="Sheet1", data=df_all)
-        return True
-    except Exception as e:
-        st.error(f"書き込みエラー: {e}")
-        return False
-
-def get_search_results(query):
-    # ASIN/ISBNの抽出（URLの場合）
-    asin_match = re.search(r"/(?:dp|product|ASID|ASIN|ebook)/([A-Z0-9]{10,13})", query)
-    asin_q = asin_match.group(1) if asin_match else None
-    
-    # URLからタイトルのヒント（スラグ）を抽出
-    keyword_q = None
-    slug_match = re.search(r"jp/([^/]+)/(?:dp|product|ebook|ASID|ASIN)", query)
-    if slug_match:
-        decoded = urllib.parse.unquote(slug_match.group(1))
-        # ハイフンやアンダースコアも区切りとして扱う
-        raw_words = re.findall(r"[\wéàèùâêîôûëïü]+", decoded.replace("-", " ").replace("_", " "))
-        keyword_q = " ".join([w for w in raw_words if w.lower() not in ["novel", "english", "ebook", "kindle", "edition", "paperback", "hardcover", "psychological", "thriller"]])
-    
-    # ASINがない場合は入力クエリそのものをキーワードとする
-    if not asin_q and not keyword_q:
-        keyword_q = query
-
-    results = []
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "application/json",
-        "Accept-Language": "ja,en-US;q=0.9,en;q=0.8",
-        "Referer": "https://www.google.com/"
-    }
-
-    # 検索パターンの構築
-    search_queries = []
-    if asin_q: search_queries.append(asin_q)
-    if keyword_q: search_queries.append(keyword_q)
-
-    seen_titles = set()
-    for sq in search_queries:
-        safe_q = urllib.parse.quote(sq)
-        api_url = f"https://www.googleapis.com/books/v1/volumes?q={safe_q}&country=JP&maxResults=10"
+@st.cache_resource
+def get_store(connection, worksheet):
+    # streamlit_gsheets は読み込みに時間がかかるので、接続するときに初めて読み込む
+    from streamlit_gsheets import GSheetsConnection
+    conn = st.connection(connection, type=GSheetsConnection)
+    return SheetStore(open_worksheet(conn, worksheet))
+
+# キャッシュのキーは渡し方ごとに別になる（get_mirror() と get_mirror("Sheet1") は別のミラー）ので、
+# 保存先の名前（libraries.storage_name）は常に位置引数で渡す
+@st.cache_resource
+def get_mirror(storage):
+    return LocalMirror(storage)
+
+def connect_mirror(mirror, library):
+    if library["local"]:
+        # シートを使わない本棚はローカルだけに保存する（同期スレッドはスナップショットのため）
+        mirror.init_header(LOCAL_HEADER)
+        mirror.start()
+        return
+    # 接続できなくてもローカルのデータで表示を続ける（次の再実行で再接続を試す）
+    if mirror.store is None:
         try:
-            res = requests.get(api_url, headers=headers, timeout=10).json()
-            if "items" in res:
-                for item in res["items"]:
-                    v = item.get("volumeInfo", {})
-                    title = v.get("title", "不明なタイトル")
-                    # 重複排除
-                    if title in seen_titles: continue
-                    seen_titles.add(title)
-                    
-                    img = v.get("imageLinks", {}).get("thumbnail", "").replace("zoom=1", "zoom=0")
-                    if img:
-                        img = img.replace("http://", "https://")
-                    results.append({
-                        "title": title,
-                        "authors": ", ".join(v.get("authors", ["不明な著者"])),
-                        "thumbnail": img
-                    })
+            mirror.attach(get_store(library["connection"], library["worksheet"]))
         except Exception as e:
-            st.error(f"検索中にエラーが発生しました ({sq}): {e}")
-    
-    return results
-
-    # ダイアログではなく、メイン画面にexpanderで展開する方式に変更（動作安定化のため）
-    pass
-
-def render_registration_ui():
-    """メイン画面に表示する登録フォーム"""
-    if 'new_book' not in st.session_state:
-        st.session_state.new_book = {"title": "", "authors": "", "thumbnail": "", "url": ""}
-    if 'search_results' not in st.session_state:
-        st.session_state.search_results = []
-    
-    with st.expander("➕ 新しい本を登録する", expanded=st.session_state.get('show_reg_ui', False)):
-        st.markdown("##### 1. 本を検索")
-        col_s1, col_s2 = st.columns([4, 1])
-        with col_s1:
-            search_input_val = st.text_input("Amazon URL または タイトル", value=st.session_state.new_book["url"], placeholder="例: 夏目漱石 こころ", key="search_input_main")
-        with col_s2:
-            st.write("")
-            if st.button("検索", use_container_width=True, key="search_btn_main"):
-                if search_input_val:
-                    st.session_state.new_book["url"] = search_input_val
-                    with st.spinner("検索中..."):
-                        res = get_search_results(search_input_val)
-                        st.session_state.search_results = res
-                        if not res:
-                            st.warning("見つかりませんでした")
-                        else:
-                            st.success(f"{len(res)}件見つかりました！下から選択してください")
-                else:
-                    st.warning("検索キーワードを入力してください")
-
-        # 検索候補 (3列構成で多くの候補を表示)
-        if st.session_state.search_results:
-            st.markdown("##### 候補から選択:")
-            res_list = st.session_state.search_results
-            for i in range(0, len(res_list), 3):
-                cols = st.columns(3)
-                for j in range(3):
-                    if i + j < len(res_list):
-                        res = res_list[i + j]
-                        with cols[j]:
-                            if res["thumbnail"]: st.image(res["thumbnail"], use_container_width=True)
-                            else: st.write("No Image")
-                            short_title = res['title'][:15] + "..." if len(res['title']) > 15 else res['title']
-                            st.caption(f"{short_title}")
-                            if st.button("選択", key=f"sel_{i+j}", use_container_width=True):
-                                st.session_state.new_book.update(res)
-                                st.session_state.search_results = []
-                                st.rerun()
-            st.divider()
-
-        st.markdown("##### 2. 詳細を入力して登録")
-        with st.form("new_book_main_form"):
-            f_title = st.text_input("タイトル (必須)", value=st.session_state.new_book["title"])
-            f_author = st.text_input("著者", value=st.session_state.new_book["authors"])
-            f_img = st.text_input("画像URL", value=st.session_state.new_book["thumbnail"])
-            
-            # 画像プレビューの追加
-            if f_img and f_img.startswith("http"):
-                st.image(f_img, width=100, caption="プレビュー")
-            
-            c1, c2, c3 = st.columns(3)
-            with c1: f_cat = st.selectbox("カテゴリ", CATEGORY_LIST)
-            with c2: f_lang = st.selectbox("言語", LANGUAGE_LIST)
-            with c3: f_stat = st.selectbox("ステータス", STATUS_LIST)
-            
-            f_rate = st.select_slider("評価", options=["1", "2", "3", "4", "5"], value="3")
-            f_comment = st.text_area("コメント", placeholder="感想などを入力")
-            f_dates = st.date_input("読書期間", [datetime.date.today(), datetime.date.today()])
-            
-            st.markdown("---")
-            confirm = st.checkbox("内容を確認しました（誤操作防止）", key="reg_confirm")
-            
-            if st.form_submit_button("保存する", type="primary", use_container_width=True):
-                if not f_title:
-                    st.error("タイトルは必須です")
-                elif not confirm:
-                    st.error("⚠️ 保存するにはチェックボックスを入れてください")
-                else:
-                    sd = f_dates[0].strftime("%Y-%m-%d") if len(f_dates) > 0 else ""
-                    ed = f_dates[1].strftime("%Y-%m-%d") if len(f_dates) > 1 else sd
-                    # 既存のdf_booksを参照するためにglobal宣言は避け、引数かst.session_stateから取得する設計が望ましいが
-                    # 簡易対応としてst.connectionから再取得して追記する
-                    record = {"タイトル": f_title, "著者": f_author, "評価": f_rate, "カテゴリ": f_cat, "言語": f_lang, "ステータス": f_stat, "コメント": f_comment, "開始日": sd, "読了日": ed, "画像URL": f_img}
-                    
-                    # 読み書き用コネクション再取得
-                    conn_w = st.connection("gsheets", type=GSheetsConnection)
-                    current_df = conn_w.read()
-                    updated_df = pd.concat([current_df, pd.DataFrame([record])], ignore_index=True)
-                    try:
-                        conn_w.update(worksheet="Sheet1", data=updated_df)
-                        st.toast("登録しました！")
-                        # フォームリセット
-                        st.session_state.new_book = {"title": "", "authors": "", "thumbnail": "", "url": ""}
-                        st.session_state.show_reg_ui = False # 閉じる
-                        time.sleep(1)
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"保存エラー: {e}")
-
-@st.dialog("✏️ 本の情報を編集", width="large")
-def show_edit_dialog(index):
-    edit_data = df_books.loc[index]
-    with st.form("edit_form"):
-        f_title = st.text_input("タイトル", value=str(edit_data.get("タイトル", "")) if str(edit_data.get("タイトル", "")) != 'nan' else "")
-        f_author = st.text_input("著者", value=str(edit_data.get("著者", "")) if str(edit_data.get("著者", "")) != 'nan' else "")
-        
-        # 画像URLの処理（nanチェック）
-        img_val = edit_data.get("画像URL", "")
-        img_val = str(img_val) if str(img_val) != 'nan' else ""
-        f_img = st.text_input("画像URL", value=img_val)
-        if f_img and f_img.startswith("http"):
-            st.image(f_img, width=100)
-        
-        c1, c2, c3 = st.columns(3)
-        with c1: 
-            d_cat = str(edit_data.get("カテゴリ", "")) if str(edit_data.get("カテゴリ", "")) != 'nan' else "その他"
-            f_cat = st.selectbox("カテゴリ", CATEGORY_LIST, index=CATEGORY_LIST.index(d_cat) if d_cat in CATEGORY_LIST else 0)
-        with c2:
-            d_lang = str(edit_data.get("言語", "")) if str(edit_data.get("言語", "")) != 'nan' else "日本語"
-            f_lang = st.selectbox("言語", LANGUAGE_LIST, index=LANGUAGE_LIST.index(d_lang) if d_lang in LANGUAGE_LIST else 0)
-        with c3:
-            d_stat = str(edit_data.get("ステータス", "")) if str(edit_data.get("ステータス", "")) != 'nan' else "読了"
-            f_stat = st.selectbox("ステータス", STATUS_LIST, index=STATUS_LIST.index(d_stat) if d_stat in STATUS_LIST else 0)
-        
-        try:
-            rate_val = edit_data.get("評価", "3")
-            # 安全に数値化し、1〜5の範囲に収める
-            if str(rate_val) == 'nan' or str(rate_val) == '':
-                val_int = 3
-            else:
-                val_int = int(float(rate_val))
-            
-            if val_int < 1: val_int = 1
-            if val_int > 5: val_int = 5
-            d_rate = str(val_int)
-        except: d_rate = "3"
-        f_rate = st.select_slider("評価", options=["1", "2", "3", "4", "5"], value=d_rate)
-        
-        comment_val = edit_data.get("コメント", "")
-        f_comment = st.text_area("コメント", value=str(comment_val) if str(comment_val) != 'nan' else "")
-        
-        # 日付の処理を修正
-        try:
-            sd_val = str(edit_data.get("開始日", ""))
-            ed_val = str(edit_data.get("読了日", ""))
-            if sd_val and sd_val != 'nan':
-                start_date = datetime.datetime.strptime(sd_val, "%Y-%m-%d").date()
-            else:
-                start_date = datetime.date.today()
-            if ed_val and ed_val != 'nan':
-                end_date = datetime.datetime.strptime(ed_val, "%Y-%m-%d").date()
-            else:
-                end_date = datetime.date.today()
-        except:
-            start_date = datetime.date.today()
-            end_date = datetime.date.today()
-        f_dates = st.date_input("読書期間", value=(start_date, end_date))
-        
-        st.divider()
-        confirm = st.checkbox("内容を確認しました（誤操作防止）")
-        
-        if st.form_submit_button("💾 更新を保存する", use_container_width=True):
-            if not confirm:
-                st.error("⚠️ 保存するにはチェックボックスを入れてください")
-            else:
-                # f_datesがタプルかリストかを確認
-                if isinstance(f_dates, (list, tuple)) and len(f_dates) >= 2:
-                    sd = f_dates[0].strftime("%Y-%m-%d")
-                    ed = f_dates[1].strftime("%Y-%m-%d")
-                else:
-                    sd = f_dates.strftime("%Y-%m-%d") if hasattr(f_dates, 'strftime') else str(datetime.date.today())
-                    ed = sd
-                record = {"タイトル": f_title, "著者": f_author, "評価": f_rate, "カテゴリ": f_cat, "言語": f_lang, "ステータス": f_stat, "コメント": f_comment, "開始日": sd, "読了日": ed, "画像URL": f_img}
-                df_books.loc[index] = record
-                if update_gsheet(df_books):
-                    st.toast("データが正常に更新されました！", icon="✅")
-                    time.sleep(1.5)
-                    st.session_state.edit_index = None
-                    st.cache_data.clear()
-                    st.rerun()
-    
-    if st.button("❌ 編集をキャンセル", use_container_width=True):
-        st.session_state.edit_index = None
-        st.rerun()
-
+            mirror.last_error = f"接続エラー: {e}"
+
+# --- データバージョン ---
+# ミラーへの書き込み・取り込みのたびに mirror.version が上がる。load_books はそれをキーに読み直し、
+# 内容から求めた data_version を返す。本の表に依存するキャッシュ（検索・フィルタ・統計）は
+# data_version をキーにするので、st.cache_data.clear() で全体を消す必要はない。
+# 書影や Google Books の検索結果のキャッシュは影響を受けない。
+#
+# 本の表と、そこから作る検索インデックスなどは data_layer に本棚ごとに1つだけ持ち、全セッションで
+# 共有する（複製しないので、各画面は書き換えないこと）。メモリの目安を超えたら開かれていない本棚から捨てる。
+@st.cache_resource
+def get_data_layer():
+    return DataLayer()
+
+def load_books(lib, mirror):
+    # データバージョンごとに1回だけ正規化する（各画面はこの型付きの表を参照）
+    return get_data_layer().books(lib, mirror, lambda m: normalize_books(m.read()))
+
+def get_search_index(lib, version, _df):
+    return get_data_layer().derived(lib, version, "search_index", lambda: SearchIndex(_df))
+
+def get_duplicate_index(lib, version, _df):
+    # 登録・インポート時の重複チェック用（ログイン時だけ読み込む）
+    from dup_index import DuplicateIndex
+    return get_data_layer().derived(lib, version, "duplicates", lambda: DuplicateIndex(_df))
+
+def get_stats(lib, version, _df):
+    return get_data_layer().derived(lib, version, "stats", lambda: compute_stats(_df))
+
+def get_timeline(lib, version, _df):
+    from reading_timeline import ReadingTimeline
+    return get_data_layer().derived(lib, version, "timeline", lambda: ReadingTimeline(_df))
+
+def get_similar_books(lib, version, _df):
+    # 詳細ダイアログの「似ている本」（初めて開いたときに読み込む）。データが変わったら、
+    # 前のデータバージョンのインデックスの変わった行だけを数え直して使う
+    from similar_books import SimilarBooks
+    return get_data_layer().derived(lib, version, "similar", lambda: SimilarBooks(_df), lambda old: old.update(_df))
+
+@st.cache_data(max_entries=32)
+def filter_books(lib, version, _df, status_group, q, f_cat, f_lang, f_year, sort_order):
+    """フィルタ・並び替え後の行ラベルを返す"""
+    # キーワードはタイトル・著者・コメントをインデックスで検索し、関連度順のまま返す
+    index = get_search_index(lib, version, _df) if q else None
+    df_f = apply_filters(_df, status_group, q, f_cat, f_lang, f_year, search_index=index)
+    return df_f.index if q else sort_books(df_f, sort_order).index
+
+@st.cache_data(max_entries=4)
+def year_options(version, _df):
+    return ["すべて"] + sorted(_df['読了日_dt'].dt.year.dropna().unique().astype(int).astype(str).tolist(), reverse=True)
+
+# ダイアログ内の操作（編集への切り替え・キャンセル）はダイアログだけを再実行する。
+# データが変わる保存・削除のときだけ全体を再実行して本棚を描き直す
 @st.dialog("📖 本の詳細", width="large")
-def show_detail_dialog(row, index):
+def show_detail_dialog(row):
+    # 「似ている本」から選んだ本に切り替える
+    switched = st.session_state.get("detail_switch")
+    if switched is not None:
+        hit = df_books.index[df_books["ID"] == switched]
+        if len(hit):
+            row = df_books.loc[hit[0]]
+    if st.session_state.detail_mode == "edit" and st.session_state.authenticated:
+        import admin_ui
+        admin_ui.render_edit_form(mirror, row)
+        return
     col1, col2 = st.columns([1, 2])
     with col1:
-        img_url = row["画像URL"]
-        if isinstance(img_url, str) and img_url != "" and str(img_url) != 'nan':
-            st.image(img_url, use_container_width=True)
+        if row["画像URL"]:
+            from cover_cache import cover_path
+            st.image(cover_path(row["画像URL"], "detail"), use_container_width=True)
         else: st.warning("画像なし")
     with col2:
         st.title(row["タイトル"])
         st.write(f"🖊️ **著者:** {row['著者']}")
-        # ステータスを追加
-        status_val = row.get('ステータス', '読了') if str(row.get('ステータス', '')) != 'nan' else '読了'
-        st.write(f"🏷️ **カテゴリ:** {row['カテゴリ']} | 🌐 **言語:** {row['言語']} | 📌 **ステータス:** {status_val}")
+        st.write(f"🏷️ **カテゴリ:** {row['カテゴリ']} | 🌐 **言語:** {row['言語']} | 📌 **ステータス:** {row['ステータス']}")
         st.write(f"📅 **読書期間:** {row['開始日']} 〜 {row['読了日']}")
-        try:
-            r_val = int(float(row['評価'])) if str(row['評価']) != 'nan' else 0
-            st.subheader('★' * r_val if r_val > 0 else '評価なし')
-        except: pass
-        st.info(f"💬 **コメント:**\n\n{row['コメント'] if str(row['コメント']) != 'nan' else 'なし'}")
+        r_val = rating_value(row['評価'])
+        st.subheader('★' * r_val if r_val > 0 else '評価なし')
+        st.info(f"💬 **コメント:**\n\n{row['コメント'] or 'なし'}")
         
         # 編集・削除ボタン（ログイン時のみ）
         if st.session_state.authenticated:
             st.divider()
             if st.button("✏️ この情報を更新する", use_container_width=True):
-                st.session_state.edit_index = index
-                st.session_state.active_detail_index = None # 詳細を閉じる
-                st.rerun()
+                st.session_state.detail_mode = "edit"
+                st.rerun(scope="fragment")
             with st.popover("🗑️ 本を削除する", use_container_width=True):
                 st.error("⚠️ 本当に削除しますか？")
                 if st.button("🔴 削除を実行", use_container_width=True):
-                    # indexを使って行を削除
-                    updated_df = df_books.drop(index)
-                    if update_gsheet(updated_df):
-                        st.session_state.active_detail_index = None
-                        st.cache_data.clear() # キャッシュを消して即反映
+                    import admin_ui
+                    # IDで対象の1行だけを削除
+                    if admin_ui.delete_book(mirror, row):
                         st.toast("削除しました")
                         time.sleep(1)
                         st.rerun()
+    render_similar_books(row)
+
+def switch_detail(row_id):
+    st.session_state.detail_switch = row_id
+    st.session_state.detail_mode = "view"
+
+def render_similar_books(row):
+    """詳細ダイアログの下に、記録の中から似ている本を並べる（選ぶとその本の詳細に切り替わる）"""
+    with tracing.span("similar_books"):
+        neighbours = get_similar_books(lib_name, data_version, df_books).neighbours(row["ID"])
+    if not neighbours:
+        return
+    # 共有のインデックスは新しいデータで更新されていることがあるので、この表にある本だけを使う
+    order = {row_id: i for i, (row_id, _) in enumerate(neighbours)}
+    books = df_books[df_books["ID"].isin(order)].drop_duplicates("ID").sort_values("ID", key=lambda s: s.map(order))
+    if books.empty:
+        return
+    from cover_cache import PLACEHOLDER_PATH, cover_path
+    st.divider()
+    st.markdown("##### 📚 似ている本")
+    for col, (_, b) in zip(st.columns(len(books)), books.iterrows()):
+        with col:
+            st.image(cover_path(b["画像URL"], "grid") if b["画像URL"] else PLACEHOLDER_PATH, use_container_width=True)
+            title = b["タイトル"] if len(b["タイトル"]) <= 16 else b["タイトル"][:16] + "…"
+            st.button(title, key=f"similar_{b['ID']}", help=f"{b['タイトル']} / {b['著者']}",
+                      on_click=switch_detail, args=(b["ID"],), use_container_width=True)
+
+def render_stats_dashboard(stats):
+    """📊 読書統計（全記録が対象）"""
+    st.markdown("### 📊 読書統計")
+    m1, m2, m3, m4, m5 = st.columns(5)
+    m1.metric("読了", f"{stats['total']} 冊")
+    m2.metric("今年", f"{stats['this_year']} 冊")
+    m3.metric("平均評価", f"{stats['avg_rating']:.1f}" if stats["avg_rating"] is not None else "-")
+    m4.metric("読了までの日数", f"{stats['avg_days']:.0f} 日" if stats["avg_days"] is not None else "-",
+              help=f"開始日から読了日までの平均（中央値 {stats['median_days']:.0f} 日）" if stats["median_days"] is not None else None)
+    m5.metric("連続読了月", f"{stats['current_streak']} か月", help=f"最長 {stats['longest_streak']} か月")
+
+    if stats["total"] == 0:
+        st.info("読了した本がまだありません")
+        return
+    st.markdown("##### 月ごとの読了数（直近24か月）")
+    per_month = stats["per_month"].iloc[-24:]
+    st.bar_chart(pd.Series(per_month.values, index=per_month.index.strftime("%Y-%m"), name="冊数"))
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown("##### 年ごとの読了数")
+        st.bar_chart(stats["per_year"].rename("冊数").set_axis(stats["per_year"].index.astype(str)))
+        st.markdown("##### カテゴリ")
+        st.bar_chart(stats["categories"].rename("冊数").set_axis(stats["categories"].index.astype(str)), horizontal=True)
+    with c2:
+        st.markdown("##### 評価の分布")
+        st.bar_chart(stats["ratings"].rename("冊数").set_axis([f"★{i}" for i in stats["ratings"].index]))
+        st.markdown("##### 言語")
+        st.bar_chart(stats["languages"].rename("冊数").set_axis(stats["languages"].index.astype(str)), horizontal=True)
+
+TIMELINE_MAX_BARS = 150  # タイムラインに一度に描く本の上限
+
+def render_timeline(timeline, df):
+    """🗓️ 読書タイムライン（開始日〜読了日の期間が分かる本が対象）"""
+    st.markdown("### 🗓️ 読書タイムライン")
+    if not len(timeline):
+        st.info("開始日と読了日が記録された本がまだありません")
+        return
+    s = timeline.summary()
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("期間の分かる本", f"{s['books']} 冊")
+    m2.metric("最大の同時読書", f"{s['max_concurrent']} 冊", help=f"{s['max_concurrent_on']:%Y-%m-%d}")
+    for col, label, streak in ((m3, "最長の連続読書", s["reading_streak"]), (m4, "最長の並行読書（2冊以上）", s["parallel_streak"])):
+        col.metric(label, f"{streak[2]} 日" if streak else "-", help=f"{streak[0]:%Y-%m-%d} 〜 {streak[1]:%Y-%m-%d}" if streak else None)
+
+    st.markdown("##### 月ごとの読んでいた冊数")
+    per_month = timeline.monthly_counts().iloc[-36:]
+    st.bar_chart(pd.Series(per_month.values, index=per_month.index.strftime("%Y-%m"), name="冊数"))
+
+    last_day = min(datetime.date.today(), s["last_day"])
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        day = st.date_input("この日に読んでいた本", value=last_day, key="timeline_day")
+        hits = df.loc[timeline.overlapping(day)]
+        if hits.empty:
+            st.caption("この日に読んでいた本はありません")
+        for _, b in hits.iterrows():
+            st.markdown(f"- **{b['タイトル']}** {b['著者']}  \n  <small>{b['開始日']} 〜 {b['読了日'] or '読書中'}</small>", unsafe_allow_html=True)
+    with c2:
+        period = st.date_input("期間", value=(last_day - datetime.timedelta(days=180), last_day), key="timeline_period")
+        if len(period) == 2:
+            labels = timeline.overlapping(period[0], period[1])
+            rows = df.loc[labels[-TIMELINE_MAX_BARS:]]
+            if len(labels) > TIMELINE_MAX_BARS:
+                st.caption(f"{len(labels)} 冊のうち、開始日の新しい {TIMELINE_MAX_BARS} 冊を表示しています")
+            end = rows["読了日_dt"].fillna(pd.Timestamp(datetime.date.today()))
+            bars = pd.DataFrame({
+                "タイトル": rows["タイトル"].str.slice(0, 30),
+                "著者": rows["著者"],
+                "カテゴリ": rows["カテゴリ"].astype(str),
+                "開始": rows["開始日_dt"].dt.strftime("%Y-%m-%d"),
+                # 期間は読了日を含むので、棒は翌日まで伸ばす
+                "終了": (end + pd.Timedelta(days=1)).dt.strftime("%Y-%m-%d"),
+                "読了日": rows["読了日"],
+            })
+            st.vega_lite_chart(bars, {
+                "mark": {"type": "bar", "cornerRadius": 3},
+                "encoding": {
+                    "x": {"field": "開始", "type": "temporal", "title": None,
+                          "scale": {"domain": [period[0].isoformat(), (period[1] + datetime.timedelta(days=1)).isoformat()]}},
+                    "x2": {"field": "終了"},
+                    "y": {"field": "タイトル", "type": "nominal", "sort": None, "title": None},
+                    "color": {"field": "カテゴリ", "type": "nominal"},
+                    "tooltip": [{"field": "タイトル"}, {"field": "著者"}, {"field": "開始"}, {"field": "読了日"}],
+                },
+                "height": {"step": 18},
+            }, use_container_width=True)
 
 # --- メイン画面 ---
-st.title("📚 読書記録")
+st.title(f"📚 {library['title']}")
 
-# ログイン中のみ「新規登録」UIを表示
-if st.session_state.authenticated:
-    render_registration_ui()
+# ログイン中のみ「新規登録」UIを表示（中身は本棚の表示後に描く）
+admin_area = st.container() if st.session_state.authenticated else None
 
 st.divider()
 
-# --- Google Sheets 接続 ---
-df_books = pd.DataFrame() # 初期化
-try:
-    conn = st.connection("gsheets", type=GSheetsConnection)
-    df_books = conn.read(ttl=60) 
-except Exception as e:
-    st.error(f"接続エラー: {e}")
-    st.stop()
+# --- Google Sheets 接続（ローカルミラー経由） ---
+# 保存済みのデータがあれば、シートへの接続は本棚を表示した後に行う（最後の connect_mirror）
+with tracing.span("mirror"):
+    mirror = get_mirror(storage_name(library))
+    if not mirror.has_data():
+        # 初回起動時だけはシートに接続して読み込みを待つ
+        connect_mirror(mirror, library)
+        if mirror.store is not None:
+            try:
+                with st.spinner("シートを読み込み中..."):
+                    mirror.pull_blocking()
+            except Exception as e:
+                mirror.last_error = f"接続エラー: {e}"
+if mirror.last_error:
+    if mirror.has_data():
+        st.caption(f"⚠️ シートに接続できないため、保存済みのデータを表示しています（{mirror.last_error}）")
+    else:
+        st.error(mirror.last_error)
+with tracing.span("load_books"):
+    df_books, data_version = load_books(lib_name, mirror)
 
 # --- サイドバー (表示・フィルタ) ---
+def open_detail(row):
+    st.session_state.detail_mode = "view"
+    st.session_state.detail_switch = None
+    show_detail_dialog(row)
+
+# 表示中の本棚全体を1つのコンポーネントで描く。クリックされるとこのフラグメントだけが再実行され、
+# 返ってきたIDの本の詳細ダイアログを開く（本棚全体を描き直さないので、冊数が多くても開く速さは変わらない）
+@st.fragment
+def render_shelf(df_v, mode):
+    books = shelf_books(df_v, mode)
+    tracing.count("html_bytes", len(json.dumps(books, ensure_ascii=False).encode("utf-8")))
+    clicked = bookshelf(books, mode, key=f"shelf_{mode}")
+    # 値は次の再実行でも残るので、同じクリックで二度開かないようにする
+    if clicked and clicked["nonce"] != st.session_state.get("shelf_clicked"):
+        st.session_state.shelf_clicked = clicked["nonce"]
+        hit = df_v.index[df_v["ID"] == clicked["id"]]
+        if len(hit):
+            open_detail(df_v.loc[hit[0]])
+
 def clear_all_states():
-    st.session_state.active_detail_index = None
-    st.session_state.edit_index = None
+    st.session_state.shelf_pages = 1
+
+def show_more_months():
+    st.session_state.shelf_pages += 1
+
+def visible_rows(month_labels, pages):
+    """先頭から表示する行数（月の途中では切らず、冊数の上限は守る）"""
+    target = pages * PAGE_BOOKS
+    if target >= len(month_labels):
+        return len(month_labels)
+    # 並び替え済みなので同じ月の行は連続している
+    month_no = month_labels.ne(month_labels.shift()).cumsum()
+    n_rows = int((month_no <= month_no.iloc[target - 1]).sum())
+    return min(n_rows, pages * PAGE_MAX_BOOKS)
 
 if not df_books.empty:
-    df_books['読了日_dt'] = pd.to_datetime(df_books['読了日'], errors='coerce')
-    
     # --- フィルタと設定の順序整理 ---
     # 1. ホーム (フィルタクリア & データ更新)
     if st.sidebar.button("🏠 ホーム", use_container_width=True):
         st.session_state.filter_reset_key += 1
-        st.cache_data.clear()
+        # シートから取り込み、変更があればデータバージョンが上がって関連キャッシュだけが入れ替わる
+        mirror.sync_now(wait=3)
         clear_all_states()
         st.rerun()
     
@@ -551,8 +446,8 @@ if not df_books.empty:
     reset_prefix = f"filter_{st.session_state.filter_reset_key}_"
 
     # 2. 表示スタイル
-    display_mode_raw = st.sidebar.radio("🖼️ 表示スタイル", ["PC向け", "スマホ向け"], key=f"{reset_prefix}display_mode")
-    display_mode = "本棚 (グリッド)" if display_mode_raw == "PC向け" else "リスト (一覧表)"
+    display_mode_raw = st.sidebar.radio("🖼️ 表示スタイル", ["PC向け", "スマホ向け", "統計", "タイムライン"], key=f"{reset_prefix}display_mode")
+    display_mode = {"PC向け": "本棚 (グリッド)", "スマホ向け": "リスト (一覧表)"}.get(display_mode_raw, display_mode_raw)
     
     if 'last_display_mode' not in st.session_state:
         st.session_state.last_display_mode = display_mode
@@ -573,7 +468,7 @@ if not df_books.empty:
     st.sidebar.write("") # 余白調整
 
     # 4. 読了年
-    years = ["すべて"] + sorted(df_books['読了日_dt'].dt.year.dropna().unique().astype(int).astype(str).tolist(), reverse=True)
+    years = year_options(data_version, df_books)
     f_year = st.sidebar.selectbox("読了年", years, key=f"{reset_prefix}year", on_change=clear_all_states)
 
     # 5. 言語
@@ -588,126 +483,90 @@ if not df_books.empty:
     # 8. 並び替え
     sort_order = st.sidebar.selectbox("並び替え", ["新しい順", "古い順"], key=f"{reset_prefix}sort", on_change=clear_all_states)
     
-    # フィルタ条件の適用
-    df_f = df_books.copy()
-    
-    # ステータスグループによるフィルタ
-    if status_group == "読了":
-        df_f = df_f[df_f['ステータス'] == '読了']
-    else:  # 「読みたい・読書中」
-        df_f = df_f[df_f['ステータス'].isin(['読みたい', '読書中'])]
-    
-    if q:
-        df_f = df_f[df_f['タイトル'].str.contains(q, case=False, na=False) | df_f['著者'].str.contains(q, case=False, na=False)]
-    if f_cat != "すべて": df_f = df_f[df_f['カテゴリ'] == f_cat]
-    if f_lang != "すべて": df_f = df_f[df_f['言語'] == f_lang] if '言語' in df_f.columns else df_f
-    if f_year != "すべて": df_f = df_f[df_f['読了日_dt'].dt.year == int(f_year)]
-    
-    is_asc = (sort_order == "古い順")
-    df_f = df_f.sort_values(['読了日_dt'], ascending=is_asc)
-
-    st.write(f"全 {len(df_f)} 冊の記録がヒットしました")
-
-    if display_mode == "本棚 (グリッド)":
-        current_month = None
-        for idx, row in df_f.iterrows():
-            month_label = row['読了日_dt'].strftime('%Y年 %m月') if pd.notnull(row['読了日_dt']) else "日付なし"
-            if month_label != current_month:
-                current_month = month_label
-                st.markdown(f"### 🗓️ {current_month}")
-                cols = st.columns(7)
-                col_idx = 0
-            
-            with cols[col_idx % 7]:
-                img = row["画像URL"]
-                if isinstance(img, str) and img != "" and str(img) != 'nan':
-                    st.markdown(f'<img src="{img}" class="book-cover">', unsafe_allow_html=True)
-                else:
-                    st.markdown('<div class="book-cover" style="background:#f1f5f9; display:flex; align-items:center; justify-content:center; color:#94a3b8; font-size:0.7em;">No Cover</div>', unsafe_allow_html=True)
-                
-                # 豆アイコンボタン（画像の右下に浮く）
-                st.markdown('<div class="grid-btn">', unsafe_allow_html=True)
-                if st.button("➕", key=f"v_{idx}"):
-                    st.session_state.active_detail_index = idx
-                    st.rerun()
-                st.markdown('</div>', unsafe_allow_html=True)
-            col_idx += 1
-            if col_idx % 7 == 0 and month_label == current_month:
-                cols = st.columns(7)
+    # フィルタ条件の適用（結果はデータバージョンと条件ごとにキャッシュ）
+    with tracing.span("filter"):
+        df_f = df_books.loc[filter_books(lib_name, data_version, df_books, status_group, q, f_cat, f_lang, f_year, sort_order)]
+
+    if display_mode == "統計":
+        with tracing.span("stats"):
+            render_stats_dashboard(get_stats(lib_name, data_version, df_books))
+    elif display_mode == "タイムライン":
+        with tracing.span("timeline"):
+            render_timeline(get_timeline(lib_name, data_version, df_books), df_books)
     else:
-        # 改良版リスト表示（Notion風カード形式）
-        current_month = None
-        for idx, row in df_f.iterrows():
-            month_label = row['読了日_dt'].strftime('%Y年 %m月') if pd.notnull(row['読了日_dt']) else "日付なし"
-            if month_label != current_month:
-                current_month = month_label
-                st.markdown(f"#### 🗓️ {current_month}")
-
-            # 表示データの準備
-            img = row["画像URL"]
-            if not (isinstance(img, str) and img != "" and str(img) != 'nan'):
-                img = "https://via.placeholder.com/80x110?text=No+Cover" # ダミー画像
-            
-            title = row['タイトル']
-            author = row['著者'] if str(row['著者']) != 'nan' else '不明な著者'
-            cat = row['カテゴリ']
-            lang = row.get('言語', '日本語') if str(row.get('言語', '')) != 'nan' else '日本語'
-            stat = row.get('ステータス', '読了') if str(row.get('ステータス', '')) != 'nan' else '読了'
-            comm = str(row['コメント']) if str(row['コメント']) != 'nan' else ""
-            date_val = row['読了日']
-            
-            try:
-                r_val = int(float(row['評価'])) if str(row['評価']) != 'nan' else 0
-                stars = '★' * r_val + '☆' * (5 - r_val)
-            except:
-                stars = ""
-
-            # HTMLの構築
-            list_item_html = f"""<div class="notion-list-item">
-<img src="{img}" class="notion-cover">
-<div class="notion-content">
-<div class="notion-title">{title}</div>
-<div class="notion-author">{author}</div>
-<div class="notion-rating">{stars}</div>
-<div class="notion-meta-row">
-<span class="notion-tag">{cat}</span>
-<span class="notion-tag">{lang}</span>
-<span class="notion-tag">{stat}</span>
-</div>"""
-            
-            if comm:
-                # コメントは60文字で切り詰め
-                short_comm = comm[:60] + ("..." if len(comm) > 60 else "")
-                list_item_html += f'<div class="notion-comment">{short_comm}</div>'
-            
-            list_item_html += f"""<div class="notion-footer">📅 {date_val}</div>
-</div>
-</div>"""
-            
-            # コンテナを使って表示（ボタンとの整合性のため）
-            with st.container():
-                # カードとボタンを一つの枠に収める
-                inner_container = st.container(border=True)
-                with inner_container:
-                    # HTMLを表示
-                    st.markdown(list_item_html, unsafe_allow_html=True)
-                    # 詳細ボタン（右下に「＋」のみ配置）
-                    c_btn1, c_btn2 = st.columns([8, 1])
-                    with c_btn2:
-                        # 確実に詳細を開くために、ボタンが押されたらその場でインデックスをセットして即再表示する形式に変更
-                        if st.button("➕", key=f"lbtn_{idx}", use_container_width=True):
-                            st.session_state.active_detail_index = idx
-                            st.rerun()
-            st.write("") 
-
-# 新規登録UIは上部で既に表示済み（render_registration_ui）
-
-# 詳細ダイアログの起動
-if st.session_state.active_detail_index is not None:
-    if st.session_state.active_detail_index in df_books.index:
-        show_detail_dialog(df_books.loc[st.session_state.active_detail_index], st.session_state.active_detail_index)
-
-# 編集ダイアログの起動
-if st.session_state.edit_index is not None:
-    if st.session_state.edit_index in df_books.index:
-        show_edit_dialog(st.session_state.edit_index)
+        st.write(f"全 {len(df_f)} 冊の記録がヒットしました")
+
+        # 表示中の月の分だけウィジェットを作る
+        if q:
+            # 検索結果は関連度順なので月ごとにはまとめず、見出しを1つにする
+            n_visible = min(len(df_f), st.session_state.shelf_pages * PAGE_BOOKS)
+            df_v = df_f.iloc[:n_visible].assign(月ラベル="検索結果（関連度順）")
+        else:
+            n_visible = visible_rows(df_f['月ラベル'], st.session_state.shelf_pages)
+            df_v = df_f.iloc[:n_visible]
+        tracing.count("rows_rendered", len(df_v))
+        with tracing.span("render_grid" if display_mode == "本棚 (グリッド)" else "render_list"):
+            render_shelf(df_v, "grid" if display_mode == "本棚 (グリッド)" else "list")
+
+        if n_visible < len(df_f):
+            st.button(f"⬇️ さらに表示（残り {len(df_f) - n_visible} 冊）", on_click=show_more_months, use_container_width=True)
+
+# 同期状況（ログイン時のみ。シートを使わない本棚にはない）
+if st.session_state.authenticated and not library["local"]:
+    sync = mirror.status()
+    with st.sidebar.expander(f"🔄 同期（未送信 {sync['pending']} 件）"):
+        last_pull = datetime.datetime.fromtimestamp(sync["last_pull"]).strftime("%m/%d %H:%M:%S") if sync["last_pull"] else "なし"
+        st.caption(f"最終取り込み: {last_pull}")
+        if sync["last_error"]:
+            st.error(sync["last_error"])
+        if sync["remote_empty"]:
+            st.warning("シートにこの本棚の本が1冊も見つかりません。どちらに合わせるか選んでください")
+            if st.button("シートに合わせる（ローカルの本を消す）", use_container_width=True):
+                mirror.resolve_empty_remote(use_local=False)
+                st.rerun()
+            if st.button("ローカルの本をシートに書き戻す", use_container_width=True):
+                mirror.resolve_empty_remote(use_local=True)
+                mirror.sync_now(wait=5)
+                st.rerun()
+        if sync["conflicts"]:
+            st.warning(f"シート側で先に変更されていたため送信しなかった操作: {sync['conflicts']} 件")
+            if st.button("記録を消去", use_container_width=True):
+                mirror.clear_conflicts()
+                st.rerun()
+        if st.button("今すぐ同期", use_container_width=True):
+            mirror.sync_now(wait=5)
+            st.rerun()
+
+# 登録・検索・インポート（ログイン時だけ読み込む）
+if admin_area is not None:
+    import admin_ui
+    with admin_area:
+        duplicates = get_duplicate_index(lib_name, data_version, df_books)
+        admin_ui.render_registration_ui(mirror, duplicates)
+        admin_ui.render_import_ui(mirror, duplicates)
+        admin_ui.render_enrich_ui(mirror, df_books)
+        admin_ui.render_history_ui(mirror)
+
+# シートとの同期を開始する（接続済みなら何もしない）
+with tracing.span("mirror.connect"):
+    connect_mirror(mirror, library)
+
+# --- 計測 (デバッグ表示・トレース記録) ---
+trace = tracing.finish(
+    write=tracing.TRACE_ALL or st.session_state.get("trace_to_file", False),
+    authenticated=st.session_state.authenticated,
+    books=len(df_books),
+)
+if st.session_state.authenticated and trace:
+    with st.sidebar.expander(f"🩺 計測（{trace['total_ms']:.0f} ms）"):
+        if trace["spans"]:
+            st.dataframe(pd.DataFrame(trace["spans"]), hide_index=True, use_container_width=True)
+        st.json(trace["counters"])
+        layer = get_data_layer().stats()
+        st.caption(f"共有データ: {len(layer['libraries'])} 冊棚 / {layer['total'] / 2**20:.1f} MB"
+                   f"（上限 {layer['budget'] / 2**20:.0f} MB・読み込み {layer['loads']} 回・破棄 {layer['evictions']} 回）")
+        import api_gateway
+        for g in api_gateway.stats():
+            st.caption(f"API {g['name']}: 呼び出し {g['calls']} 回（相乗り {g['coalesced']}・待機 {g['throttled']} 回 {g['waited']} 秒・"
+                       f"再試行 {g['retries']}・429 {g['quota']}・失敗 {g['failed']}）")
+        st.checkbox("トレースを記録する (.cache/trace.jsonl)", key="trace_to_file")
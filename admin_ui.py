@@ -0,0 +1,356 @@
+"""ログイン時だけ使う登録・検索・一括インポート・編集の画面
+
+Google Books の検索や一括インポートの仕組みごと、閲覧だけの訪問者には読み込まない。
+"""
+import datetime
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+
+import books_api
+import bulk_import
+import tracing
+from book_search import book_search
+from book_table import CATEGORY_LIST, LANGUAGE_LIST, STATUS_LIST, rating_value
+from enrich_worker import EnrichJob
+from sheet_store import StaleRowError
+
+
+def patch_book(mirror, row, record):
+    # ローカルに反映し、シートへは同期キューから1行単位で送る（読み込み後に他で変更されていればエラー）
+    try:
+        mirror.patch(row["ID"], record, expected=row["行ハッシュ"])
+        return True
+    except StaleRowError as e:
+        st.error(f"⚠️ {e}。画面を再読み込みしてから操作してください")
+        return False
+    except Exception as e:
+        st.error(f"書き込みエラー: {e}")
+        return False
+
+
+def delete_book(mirror, row):
+    try:
+        mirror.delete(row["ID"], expected=row["行ハッシュ"])
+        return True
+    except StaleRowError as e:
+        st.error(f"⚠️ {e}。画面を再読み込みしてから操作してください")
+        return False
+    except Exception as e:
+        st.error(f"書き込みエラー: {e}")
+        return False
+
+
+def warn_duplicate(book):
+    if book:
+        when = f"（読了日: {book['読了日']}）" if book["読了日"] else ""
+        st.warning(f"⚠️ 登録済みの本と重複しているようです: 「{book['タイトル']}」{book['著者']}{when}")
+
+
+def _empty_search():
+    return {"query": "", "page": 0, "results": [], "has_more": False, "error": None, "seq": 0}
+
+
+def _fetch_candidates(state, page):
+    """state["query"] の page ページ目を取得して state の候補に足す"""
+    with tracing.span("books_api.search_page"):
+        results, errors, has_more = books_api.search_page(state["query"], page)
+    seen = {c["title"] for c in state["results"]}
+    state["results"] += [c for c in results if c["title"] not in seen]
+    state["page"] = page
+    state["has_more"] = has_more
+    state["error"] = "; ".join(f"{sq}: {e}" for sq, e in errors) or None
+
+
+@st.fragment
+def render_search():
+    """入力しながら検索する欄と候補（操作のたびにこの部分だけ再実行する）"""
+    state = st.session_state.search_state
+    event = st.session_state.get("book_search")
+    # 処理済みより古い操作（入力途中の古い検索・再実行で残っている値）は捨てる
+    if event and event.get("seq", 0) > state["seq"]:
+        state["seq"] = event["seq"]
+        if event["action"] == "query":
+            q = event.get("q", "").strip()
+            state.update(_empty_search(), query=q, seq=event["seq"])
+            st.session_state.new_book["url"] = q
+            if q:
+                _fetch_candidates(state, 0)
+        elif event["action"] == "more" and state["has_more"]:
+            _fetch_candidates(state, state["page"] + 1)
+        elif event["action"] == "select" and 0 <= event.get("index", -1) < len(state["results"]):
+            st.session_state.new_book.update(state["results"][event["index"]])
+            st.session_state.search_state = {**_empty_search(), "query": state["query"], "seq": state["seq"]}
+            # 下のフォームに反映するため全体を再実行する
+            st.rerun()
+
+    book_search(state["query"], state["results"], state["has_more"], state["seq"], state["error"], key="book_search")
+
+
+def render_registration_ui(mirror, duplicates):
+    """メイン画面に表示する登録フォーム（duplicates は登録済みの本の DuplicateIndex）"""
+    if 'new_book' not in st.session_state:
+        st.session_state.new_book = {"title": "", "authors": "", "thumbnail": "", "url": "", "isbn": ""}
+    if 'search_state' not in st.session_state:
+        st.session_state.search_state = _empty_search()
+    
+    with st.expander("➕ 新しい本を登録する", expanded=st.session_state.get('show_reg_ui', False)):
+        st.markdown("##### 1. 本を検索")
+        render_search()
+        st.divider()
+
+        st.markdown("##### 2. 詳細を入力して登録")
+        # 検索の元が Amazon の URL なら、候補に ISBN がなくても ASIN で照合できる
+        isbn = st.session_state.new_book.get("isbn") or books_api.parse_query(st.session_state.new_book["url"])[0] or ""
+        if st.session_state.new_book["title"]:
+            warn_duplicate(duplicates.find(st.session_state.new_book["title"], st.session_state.new_book["authors"], isbn))
+        with st.form("new_book_main_form"):
+            f_title = st.text_input("タイトル (必須)", value=st.session_state.new_book["title"])
+            f_author = st.text_input("著者", value=st.session_state.new_book["authors"])
+            f_img = st.text_input("画像URL", value=st.session_state.new_book["thumbnail"])
+            
+            # 画像プレビューの追加
+            if f_img and f_img.startswith("http"):
+                st.image(f_img, width=100, caption="プレビュー")
+            
+            c1, c2, c3 = st.columns(3)
+            with c1: f_cat = st.selectbox("カテゴリ", CATEGORY_LIST)
+            with c2: f_lang = st.selectbox("言語", LANGUAGE_LIST)
+            with c3: f_stat = st.selectbox("ステータス", STATUS_LIST)
+            
+            f_rate = st.select_slider("評価", options=["1", "2", "3", "4", "5"], value="3")
+            f_comment = st.text_area("コメント", placeholder="感想などを入力")
+            f_dates = st.date_input("読書期間", [datetime.date.today(), datetime.date.today()])
+            
+            st.markdown("---")
+            confirm = st.checkbox("内容を確認しました（誤操作防止）", key="reg_confirm")
+            allow_dup = st.checkbox("登録済みの本と重複していても保存する", key="reg_allow_dup")
+            
+            if st.form_submit_button("保存する", type="primary", use_container_width=True):
+                dup = duplicates.find(f_title, f_author, isbn) if f_title else None
+                if not f_title:
+                    st.error("タイトルは必須です")
+                elif not confirm:
+                    st.error("⚠️ 保存するにはチェックボックスを入れてください")
+                elif dup and not allow_dup:
+                    warn_duplicate(dup)
+                    st.error("保存しませんでした。同じ本をもう一度記録する場合はチェックボックスを入れてください")
+                else:
+                    sd = f_dates[0].strftime("%Y-%m-%d") if len(f_dates) > 0 else ""
+                    ed = f_dates[1].strftime("%Y-%m-%d") if len(f_dates) > 1 else sd
+                    record = {"タイトル": f_title, "著者": f_author, "評価": f_rate, "カテゴリ": f_cat, "言語": f_lang, "ステータス": f_stat, "コメント": f_comment, "開始日": sd, "読了日": ed, "画像URL": f_img, "ISBN": isbn}
+                    
+                    # ローカルに追記し、シートへは同期キューからまとめて送る
+                    try:
+                        mirror.append(record)
+                        st.toast("登録しました！")
+                        # フォームリセット
+                        st.session_state.new_book = {"title": "", "authors": "", "thumbnail": "", "url": "", "isbn": ""}
+                        st.session_state.show_reg_ui = False # 閉じる
+                        time.sleep(1)
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"保存エラー: {e}")
+
+
+def render_import_ui(mirror, duplicates):
+    """CSV / Goodreads / Kindle のエクスポートから一括登録する"""
+    with st.expander("📥 CSVから一括インポート"):
+        st.caption("Goodreads・Kindle のエクスポート、またはこのアプリと同じ列名のCSVに対応しています")
+        up = st.file_uploader("CSVファイル", type=["csv"], key=f"import_file_{st.session_state.get('import_reset', 0)}")
+        if up is None:
+            st.session_state.pop("import_rows", None)
+            return
+        if st.session_state.get("import_name") != up.name or "import_rows" not in st.session_state:
+            try:
+                rows = bulk_import.read_export(up)
+            except Exception as e:
+                st.error(f"読み込みエラー: {e}")
+                return
+            st.session_state.import_rows = bulk_import.flag_duplicates(rows, duplicates)
+            st.session_state.import_name = up.name
+
+        rows = st.session_state.import_rows
+        n_missing = sum(bulk_import.needs_enrichment(r) for r in rows)
+        n_dup = sum(r["重複"] for r in rows)
+        st.write(f"{len(rows)} 冊を読み込みました（表紙・著者の欠け: {n_missing} 冊 / 重複の可能性: {n_dup} 冊）")
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True, height=250)
+
+        c1, c2 = st.columns(2)
+        with c1:
+            if st.button("🔎 表紙・著者を補完", use_container_width=True, disabled=n_missing == 0):
+                bar = st.progress(0.0, text="Google Books で検索中...")
+                bulk_import.enrich(rows, progress=lambda done, total: bar.progress(done / total, text=f"検索中... {done}/{total}"))
+                st.session_state.import_rows = bulk_import.flag_duplicates(rows, duplicates)
+                st.rerun()
+        with c2:
+            skip_dup = st.checkbox("重複の可能性がある本は登録しない", value=True)
+        targets = [r for r in rows if not (skip_dup and r["重複"])]
+        if st.button(f"💾 {len(targets)} 冊を登録する", type="primary", use_container_width=True, disabled=not targets):
+            # まとめて1回で書き込む
+            mirror.append_many(targets)
+            st.session_state.pop("import_rows", None)
+            st.session_state.import_reset = st.session_state.get("import_reset", 0) + 1
+            st.toast(f"{len(targets)} 冊を登録しました！")
+            time.sleep(1)
+            st.rerun()
+
+
+@st.cache_resource
+def get_enrich_job(_mirror, worksheet):
+    # ワークシートごとに1つ（ジョブのスレッドはプロセス内で使い回す）
+    return EnrichJob(_mirror)
+
+
+def render_enrich_ui(mirror, df_books):
+    """登録済みの本のうち、表紙・著者が欠けているものを裏でまとめて補完する"""
+    job = get_enrich_job(mirror, mirror.worksheet)
+    n_missing = 0
+    if not df_books.empty:
+        n_missing = int(((df_books["画像URL"] == "") | df_books["著者"].isin(["", books_api.UNKNOWN_AUTHOR])).sum())
+    with st.expander(f"🪄 表紙・著者の自動補完（欠け {n_missing} 冊）"):
+        st.caption("Google Books で検索し、見つかった分を最後にまとめて更新します。途中で止めても、済んだ分は次回に問い合わせ直しません")
+        # 実行中だけ2秒ごとに進み具合を更新する
+        st.fragment(_enrich_progress, run_every=2 if job.running() else None)(job, n_missing)
+
+
+def _enrich_progress(job, n_missing):
+    s = job.status()
+    if s["running"]:
+        st.progress(s["done"] / s["total"] if s["total"] else 0.0,
+                    text=f"問い合わせ中... {s['done']}/{s['total']}（見つかった {s['found']} 冊）")
+        if st.button("⏹️ 止める", use_container_width=True):
+            job.stop()
+    else:
+        if s["finished_at"]:
+            msg = f"前回: {s['done']}/{s['total']} 冊を問い合わせ、{s['applied']} 冊を更新しました"
+            if s["failed"]:
+                msg += f"（失敗 {s['failed']} 冊は次回もう一度試します）"
+            st.write(msg)
+            if s["stale"]:
+                st.warning(f"補完中に他で変更された {s['stale']} 冊は更新しませんでした")
+        if st.button("▶️ 補完を開始", use_container_width=True, disabled=n_missing == 0):
+            job.start()
+            st.session_state.enrich_running = True
+            st.rerun()
+    if s["last_error"]:
+        st.caption(f"⚠️ {s['last_error']}")
+    # 終わったら全体を再実行して、本棚に反映する
+    if st.session_state.get("enrich_running") and not s["running"]:
+        st.session_state.enrich_running = False
+        st.rerun()
+
+
+HISTORY_OPS = {"append": "追加", "patch": "更新", "delete": "削除"}
+HISTORY_SOURCES = {"local": "この画面", "sheet": "シート", "rollback": "復元"}
+
+
+def _fmt_time(ts):
+    return datetime.datetime.fromtimestamp(ts).strftime("%m/%d %H:%M:%S")
+
+
+def render_history_ui(mirror):
+    """変更履歴とスナップショットから、過去の時点の内容に戻す"""
+    with st.expander("🕰️ 変更履歴と復元"):
+        snaps = mirror.snapshots()
+        latest = _fmt_time(snaps[-1][0]) if snaps else "なし"
+        st.caption(f"スナップショット {len(snaps)} 件（最新: {latest}）と、直近の変更履歴から戻せます。戻す操作もシートへ送信され、履歴に残ります")
+        if st.button("📸 今すぐスナップショットを保存", use_container_width=True):
+            st.toast("保存しました" if mirror.snapshot(force=True) else "前回から変更はありません")
+
+        history = mirror.history()
+        if history:
+            st.dataframe(pd.DataFrame({
+                "日時": [_fmt_time(h["at"]) for h in history],
+                "変更元": [HISTORY_SOURCES.get(h["source"], h["source"]) for h in history],
+                "操作": [HISTORY_OPS[h["op"]] for h in history],
+                "タイトル": [h["title"] for h in history],
+            }), use_container_width=True, hide_index=True, height=200)
+
+        # 戻せる時点: 各変更の直前と、各スナップショットの時点（新しい順）。
+        # 選択肢は変更の番号・ファイル名で持つ（時刻の小数はウィジェットの値にすると丸められる）
+        points = [(h["at"] - 1e-6, f"h{h['seq']}", f"{_fmt_time(h['at'])} の{HISTORY_OPS[h['op']]}（{h['title']}）の直前") for h in history]
+        points += [(at, f"s{os.path.basename(path)}", f"{_fmt_time(at)} のスナップショット") for at, path in snaps]
+        if not points:
+            return
+        points.sort(reverse=True)
+        labels = {key: label for _, key, label in points}
+        key = st.selectbox("戻す時点", list(labels), format_func=labels.get, key="rollback_point")
+        ts = next(at for at, k, _ in points if k == key)
+        try:
+            diff = mirror.rollback_preview(ts)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.write(f"この時点に戻すと: 追加 {diff['added']} 冊 / 変更 {diff['changed']} 冊 / 削除 {diff['removed']} 冊")
+        confirm = st.checkbox("内容を確認しました（誤操作防止）", key="rollback_confirm")
+        st.button("⏪ この時点に戻す", type="primary", use_container_width=True, disabled=not confirm or not any(diff.values()),
+                  on_click=_rollback, args=(mirror, ts))
+        done = st.session_state.pop("rolled_back", None)
+        if done:
+            st.toast(f"戻しました！（追加 {done['added']} 冊 / 変更 {done['changed']} 冊 / 削除 {done['removed']} 冊）")
+
+
+def _rollback(mirror, ts):
+    # ボタンのコールバックで戻す（再実行の前なので、本棚にもすぐ反映される）
+    st.session_state.rollback_confirm = False
+    st.session_state.rolled_back = mirror.rollback_to(ts)
+
+
+def render_edit_form(mirror, edit_data):
+    """詳細ダイアログの中に表示する編集フォーム（キャンセルはダイアログ内だけを再実行）"""
+    with st.form("edit_form"):
+        f_title = st.text_input("タイトル", value=edit_data["タイトル"])
+        f_author = st.text_input("著者", value=edit_data["著者"])
+        
+        f_img = st.text_input("画像URL", value=edit_data["画像URL"])
+        if f_img and f_img.startswith("http"):
+            st.image(f_img, width=100)
+        
+        c1, c2, c3 = st.columns(3)
+        with c1: 
+            d_cat = edit_data["カテゴリ"]
+            f_cat = st.selectbox("カテゴリ", CATEGORY_LIST, index=CATEGORY_LIST.index(d_cat) if d_cat in CATEGORY_LIST else 0)
+        with c2:
+            d_lang = edit_data["言語"]
+            f_lang = st.selectbox("言語", LANGUAGE_LIST, index=LANGUAGE_LIST.index(d_lang) if d_lang in LANGUAGE_LIST else 0)
+        with c3:
+            d_stat = edit_data["ステータス"]
+            f_stat = st.selectbox("ステータス", STATUS_LIST, index=STATUS_LIST.index(d_stat) if d_stat in STATUS_LIST else 0)
+        
+        # 1〜5の範囲に収める（未評価は3）
+        d_rate = str(max(1, rating_value(edit_data["評価"], default=3)))
+        f_rate = st.select_slider("評価", options=["1", "2", "3", "4", "5"], value=d_rate)
+        
+        f_comment = st.text_area("コメント", value=edit_data["コメント"])
+        
+        start_date = edit_data["開始日_dt"].date() if pd.notnull(edit_data["開始日_dt"]) else datetime.date.today()
+        end_date = edit_data["読了日_dt"].date() if pd.notnull(edit_data["読了日_dt"]) else datetime.date.today()
+        f_dates = st.date_input("読書期間", value=(start_date, end_date))
+        
+        st.divider()
+        confirm = st.checkbox("内容を確認しました（誤操作防止）")
+        
+        if st.form_submit_button("💾 更新を保存する", use_container_width=True):
+            if not confirm:
+                st.error("⚠️ 保存するにはチェックボックスを入れてください")
+            else:
+                # f_datesがタプルかリストかを確認
+                if isinstance(f_dates, (list, tuple)) and len(f_dates) >= 2:
+                    sd = f_dates[0].strftime("%Y-%m-%d")
+                    ed = f_dates[1].strftime("%Y-%m-%d")
+                else:
+                    sd = f_dates.strftime("%Y-%m-%d") if hasattr(f_dates, 'strftime') else str(datetime.date.today())
+                    ed = sd
+                record = {"タイトル": f_title, "著者": f_author, "評価": f_rate, "カテゴリ": f_cat, "言語": f_lang, "ステータス": f_stat, "コメント": f_comment, "開始日": sd, "読了日": ed, "画像URL": f_img, "ISBN": edit_data.get("ISBN", "")}
+                if patch_book(mirror, edit_data, record):
+                    st.toast("データが正常に更新されました！", icon="✅")
+                    time.sleep(1.5)
+                    st.session_state.detail_mode = "view"
+                    st.rerun()
+    
+    if st.button("❌ 編集をキャンセル", use_container_width=True):
+        st.session_state.detail_mode = "view"
+        st.rerun(scope="fragment")
@@ -0,0 +1,163 @@
+"""外部 API（Google Books / Google Sheets）への呼び出しの窓口
+
+API ごとに1つの Gateway をプロセス内で共有し、どのセッション・スレッドからの呼び出しも通す:
+  - 同じキーの呼び出しが実行中なら、新しく投げずにその結果を待って受け取る（singleflight）
+  - トークンバケットで毎秒の回数を抑える（一時的な集中はバケットの容量まで許す）
+  - 429 / 5xx / 接続エラーは、ゆらぎを入れた指数バックオフで再試行する。429 のときは
+    その API への呼び出し全体を少し止める（Retry-After があればそれに従う）
+"""
+import random
+import threading
+import time
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def status_code(exc):
+    """HTTP エラーのステータスコード（requests / gspread の例外は response を持つ）"""
+    return getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def retry_after(exc):
+    """Retry-After ヘッダーの秒数（なければ None）"""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc, idempotent=True):
+    """再試行してよい失敗か（冪等でない呼び出しは、確実に処理されていない 429 だけ）"""
+    status = status_code(exc)
+    if status == 429:
+        return True
+    if not idempotent:
+        return False
+    if status is not None:
+        return status in RETRY_STATUS
+    # 失敗したときだけ読み込む（シートの読み込みだけなら requests を起動時に読み込まない）
+    import requests
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+class TokenBucket:
+    """毎秒 rate 個ずつ、最大 burst 個まで貯まるトークン（複数スレッドから共有）"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1つ取る（なければ貯まるまで待つ）。待った秒数を返す"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # 足りない分は先取りして負にし、後から来た呼び出しはさらに後ろで待つ
+            self.tokens -= 1
+            wait = max(0.0, -self.tokens / self.rate, self.paused_until - now)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """429 を受けたとき、しばらく誰にもトークンを渡さない"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class Gateway:
+    def __init__(self, name, rate, burst, max_tries=4, base_delay=0.5, max_delay=20):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_tries = max_tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self._flights = {}
+        self.counts = {"calls": 0, "coalesced": 0, "throttled": 0, "retries": 0, "quota": 0, "failed": 0}
+        self.waited = 0.0
+
+    def call(self, fn, key=None, idempotent=True):
+        """fn() を回数制限・再試行付きで呼び、結果を返す（失敗は最後の例外を送出）
+
+        key を渡すと、同じキーで実行中の呼び出しがあればその結果を共有する（読み込みだけに使う）。
+        """
+        if key is None:
+            return self._call(fn, idempotent)
+        with self.lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.counts["coalesced"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._call(fn, idempotent)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        with self.lock:
+            return {"name": self.name, **self.counts, "waited": round(self.waited, 2), "in_flight": len(self._flights)}
+
+    def _call(self, fn, idempotent):
+        for attempt in range(self.max_tries):
+            waited = self.bucket.acquire()
+            with self.lock:
+                self.counts["calls"] += 1
+                if waited:
+                    self.counts["throttled"] += 1
+                    self.waited += waited
+            try:
+                return fn()
+            except Exception as e:
+                last = attempt == self.max_tries - 1
+                if last or not is_retryable(e, idempotent):
+                    with self.lock:
+                        self.counts["failed"] += 1
+                    raise
+                # full jitter: 0〜(base × 2^回数) のどこかまで待つ（同時に失敗した呼び出しがずれる）
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                with self.lock:
+                    self.counts["retries"] += 1
+                if status_code(e) == 429:
+                    with self.lock:
+                        self.counts["quota"] += 1
+                    delay = max(delay, retry_after(e) or 0)
+                    self.bucket.pause(delay)
+                time.sleep(delay)
+
+
+# Google Books: キーなしの割り当ては小さく、超えると 429 になる（登録フォーム・一括インポート・補完ジョブで共有）
+BOOKS = Gateway("books", rate=15, burst=15)
+# Google Sheets: 読み込み・書き込みとも1ユーザーあたり毎分60回（サービスアカウントは全本棚で共有）
+SHEETS = Gateway("sheets", rate=1, burst=20, max_tries=5, base_delay=1, max_delay=60)
+GATEWAYS = [BOOKS, SHEETS]
+
+
+def stats():
+    return [g.stats() for g in GATEWAYS]
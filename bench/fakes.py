@@ -0,0 +1,255 @@
+"""ベンチマーク・負荷試験用の偽 Google Sheets 接続・Google Books API と、合成の読書記録"""
+import datetime
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from streamlit.connections import BaseConnection
+
+HEADER = ["タイトル", "著者", "評価", "カテゴリ", "言語", "ステータス", "コメント", "開始日", "読了日", "画像URL", "ISBN", "ID"]
+
+JA_WORDS = ["夜", "海", "猫", "記憶", "旅", "図書館", "東京", "雪国", "月", "羊", "森", "時計", "手紙", "約束", "風", "春", "影", "街", "星", "物語"]
+JA_PARTS = ["の", "と", "を探して", "のない", "をめぐる冒険", "の向こうに", "が消えた日"]
+EN_WORDS = ["Silent", "River", "Stoic", "Mind", "Deep", "Work", "Atomic", "Habits", "Night", "Garden", "Ghost", "Machine", "Learning", "Empire", "Letters", "Clear", "Thinking", "Lost", "City", "Courage"]
+JA_AUTHORS = ["村上春樹", "夏目漱石", "川端康成", "宮部みゆき", "東野圭吾", "吉本ばなな", "三島由紀夫", "太宰治"]
+EN_AUTHORS = ["Ryan Holiday", "Cal Newport", "James Clear", "Kazuo Ishiguro", "Marcus Aurelius", "Seneca", "Yuval Noah Harari", "Ted Chiang"]
+COMMENTS = ["面白かった", "もう一度読みたい", "Great read.", "", "", "後半の展開が意外だった", "Slow start but worth it."]
+CATEGORIES = ["小説", "Stoicism", "語学", "キャリア", "AI", "ビジネス", "ノンフィクション", "エッセイ", "その他"]
+
+
+def synthetic_rows(n, seed=0):
+    """ヘッダー付きの合成データ（シートの get_all_values と同じ形）を返す"""
+    rnd = random.Random(seed)
+    rows = [list(HEADER)]
+    start = datetime.date.today() - datetime.timedelta(days=365 * 10)
+    for i in range(n):
+        ja = rnd.random() < 0.6
+        if ja:
+            title = rnd.choice(JA_WORDS) + rnd.choice(JA_PARTS) + rnd.choice(JA_WORDS)
+            author = rnd.choice(JA_AUTHORS)
+        else:
+            title = " ".join(rnd.sample(EN_WORDS, rnd.randint(2, 4)))
+            author = rnd.choice(EN_AUTHORS)
+        end = start + datetime.timedelta(days=rnd.randint(0, 3650))
+        begin = end - datetime.timedelta(days=rnd.randint(1, 60))
+        status = rnd.choices(["読了", "読書中", "読みたい", "断念"], weights=[80, 5, 12, 3])[0]
+        rows.append([
+            title,
+            author if rnd.random() > 0.05 else "",
+            str(rnd.randint(1, 5)) if rnd.random() > 0.1 else "",
+            rnd.choice(CATEGORIES),
+            "日本語" if ja else rnd.choice(["英語", "英語", "スペイン語"]),
+            status,
+            rnd.choice(COMMENTS),
+            begin.isoformat(),
+            end.isoformat() if status == "読了" else "",
+            f"https://books.google.com/books/content?id=bench{i}&zoom=1" if rnd.random() > 0.15 else "",
+            f"978{zlib.crc32(title.encode()):010d}" if rnd.random() > 0.3 else "",
+            f"b{i:08d}",
+        ])
+    return rows
+
+
+class FakeWorksheet:
+    """gspread.Worksheet のうち SheetStore が使うメソッドだけをメモリ上で再現する"""
+
+    def __init__(self, rows, latency=0.0):
+        self.values = [list(r) for r in rows]
+        self.latency = latency  # 1回のAPI呼び出しにかかる秒数（通信の代わり）
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _call(self, name):
+        self.calls.append(name)
+        if self.latency:
+            threading.Event().wait(self.latency)
+
+    def get_all_values(self, **kwargs):
+        self._call("get_all_values")
+        with self.lock:
+            return [list(r) for r in self.values]
+
+    def row_values(self, row, **kwargs):
+        self._call("row_values")
+        with self.lock:
+            r = list(self.values[row - 1]) if row - 1 < len(self.values) else []
+        while r and r[-1] == "":
+            r.pop()
+        return r
+
+    def col_values(self, col, **kwargs):
+        self._call("col_values")
+        with self.lock:
+            return [r[col - 1] if col - 1 < len(r) else "" for r in self.values]
+
+    def batch_get(self, ranges, **kwargs):
+        self._call("batch_get")
+        with self.lock:
+            out = []
+            for rng in ranges:
+                row, _ = _a1(rng.split(":")[0])
+                out.append([list(self.values[row - 1])] if row - 1 < len(self.values) else [])
+            return out
+
+    def batch_update(self, data, **kwargs):
+        self._call("batch_update")
+        with self.lock:
+            for d in data:
+                row, col = _a1(d["range"].split(":")[0])
+                for i, vals in enumerate(d["values"]):
+                    while len(self.values) < row + i:
+                        self.values.append([])
+                    target = self.values[row + i - 1]
+                    for j, v in enumerate(vals):
+                        while len(target) < col + j:
+                            target.append("")
+                        target[col + j - 1] = str(v)
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        self._call("append_rows")
+        with self.lock:
+            first = len(self.values) + 1
+            self.values.extend([str(v) for v in row] for row in values)
+            return {"updates": {"updatedRange": f"Sheet1!A{first}:K{len(self.values)}"}}
+
+    def delete_rows(self, start_index, end_index=None):
+        self._call("delete_rows")
+        with self.lock:
+            del self.values[start_index - 1:(end_index or start_index)]
+
+
+def _a1(cell):
+    m = re.match(r"([A-Z]+)(\d+)", cell)
+    col = 0
+    for ch in m.group(1):
+        col = col * 26 + ord(ch) - 64
+    return int(m.group(2)), col
+
+
+# ワークシート名 -> FakeWorksheet（ベンチマーク側で差し替える）
+WORKSHEETS = {}
+
+
+class _FakeClient:
+    def _select_worksheet(self, worksheet=None, **kwargs):
+        return WORKSHEETS[worksheet or "Sheet1"]
+
+
+class FakeGSheetsConnection(BaseConnection):
+    """st.connection("gsheets", type=...) に渡せる GSheetsConnection の代わり"""
+
+    def _connect(self, **kwargs):
+        return _FakeClient()
+
+    @property
+    def client(self):
+        return self._instance
+
+
+def _set_worksheets(rows_by_sheet, latency):
+    WORKSHEETS.clear()
+    for name, rows in rows_by_sheet.items():
+        WORKSHEETS[name] = FakeWorksheet(rows, latency=latency)
+
+
+def install(rows_by_sheet, latency=0.0):
+    """streamlit_gsheets.GSheetsConnection を偽物に差し替える（アプリの実行前に呼ぶ）"""
+    import streamlit_gsheets
+
+    _set_worksheets(rows_by_sheet, latency)
+    streamlit_gsheets.GSheetsConnection = FakeGSheetsConnection
+
+
+def install_connection(rows_by_sheet, latency=0.0):
+    """st.connection が作る接続だけを偽物にする
+
+    streamlit_gsheets は読み込まないので、アプリがそれを読み込む時間も起動時間の測定に含まれる。
+    """
+    import streamlit as st
+
+    _set_worksheets(rows_by_sheet, latency)
+    real_connection = st.connection
+
+    def connection(name, type=None, **kwargs):
+        return real_connection(name, type=FakeGSheetsConnection, **kwargs)
+
+    st.connection = connection
+
+
+class BooksStub:
+    """Google Books の volumes API の代わりにローカルで応答する HTTP サーバー
+
+    books_api.API_URL を url に向けて使う。latency 秒待ってから応答し、quota_rate の割合で
+    429（Retry-After 付き）を返す。start() で別スレッドで起動し、stop() で止める。
+    """
+
+    def __init__(self, latency=0.0, quota_rate=0.0, total=40, seed=0):
+        self.latency = latency
+        self.quota_rate = quota_rate
+        self.total = total  # 1つの検索語に対する件数
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.quota = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/books/v1/volumes"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handle(self, handler):
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(handler.path).query)
+        with self.lock:
+            self.requests += 1
+            limited = self.random.random() < self.quota_rate
+            if limited:
+                self.quota += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if limited:
+            handler.send_response(429)
+            handler.send_header("Retry-After", "1")
+            handler.end_headers()
+            return
+        q = params.get("q", [""])[0]
+        start = int(params.get("startIndex", ["0"])[0])
+        count = max(0, min(int(params.get("maxResults", ["10"])[0]), self.total - start))
+        items = [{"volumeInfo": _volume(q, start + i)} for i in range(count)]
+        body = json.dumps({"totalItems": self.total, "items": items}, ensure_ascii=False).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+def _volume(q, i):
+    return {
+        "title": f"{q} {i + 1}",
+        "authors": [EN_AUTHORS[i % len(EN_AUTHORS)]],
+        "industryIdentifiers": [{"type": "ISBN_13", "identifier": f"978{zlib.crc32(f'{q}|{i}'.encode()):010d}"}],
+        "imageLinks": {"thumbnail": f"http://books.google.com/books/content?id=stub{i}&zoom=1"},
+    }
@@ -0,0 +1,604 @@
+"""同時アクセスの負荷試験（偽の Google Sheets 接続と、ローカルの Google Books API の代わりを使う）
+
+使い方:
+    python bench/load_test.py                                  # 20 セッション・60 秒・1万冊
+    python bench/load_test.py --sessions 50 --editors 5 --check
+    python bench/load_test.py --sheets-latency 0.3 --books-latency 0.2 --books-429 0.05
+
+アプリは別プロセスの本物の Streamlit サーバー（streamlit run と同じ起動）で動かし、偽の Sheets 接続・
+Books API のスタブ・一時ディレクトリのキャッシュはそのプロセスの中で差し替える。
+各セッションはブラウザと同じく WebSocket（/_stcore/stream）でつなぎ、ウィジェットの値を BackMsg で
+送って、ForwardMsg の script_finished が届くまでを再実行の秒数として測る。
+閲覧のセッションは本棚を見る・絞り込む・詳細を開くを平均 think 秒の間を空けて繰り返し、
+編集のセッション（--editors）はパスワードでログインし、ときどき本を検索して登録するか、
+詳細ダイアログを編集に切り替えてコメントを変えて保存する。
+
+再実行にかかった秒数のパーセンタイル（操作ごと・全体）、毎秒の再実行数、サーバーのプロセスの RSS を
+表示し、結果を bench/results/load.jsonl に追記する。閲覧の操作の p95 / p99・エラー数・RSS の最大が
+THRESHOLDS（--max-* で変更）を超えたら表示し、--check なら終了コード1。
+登録・編集は保存後に少し待つ作りなので、その秒数は表示だけで判定には使わない（エラーは数える）。
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import fakes  # noqa: E402
+
+APP = os.path.join(ROOT, "251225_streamlit_app.py")
+RESULTS = os.path.join(ROOT, "bench", "results", "load.jsonl")
+# 閲覧の操作に対する合格の基準（秒・MB・件）
+THRESHOLDS = {"p95": 1.5, "p99": 3.0, "errors": 0, "rss_mb": 1500}
+VIEW_ACTIONS = ["browse", "more", "filter", "search", "detail"]
+KEYWORDS = ["夜", "猫", "Stoic", "Habits", "村上", "図書館", "Deep Work", "旅"]
+
+
+def rss_mb(pid="self"):
+    """プロセスの常駐メモリ（MB）"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return 0.0
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(values):
+    return {"n": len(values), **{f"p{p}": percentile(values, p) for p in (50, 90, 95, 99)},
+            "max": max(values) if values else None}
+
+
+class Recorder:
+    """全セッションの再実行の秒数とエラーを集める"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []   # (操作, 秒数)
+        self.errors = []    # (操作, メッセージ)
+
+    def add(self, action, seconds, error=None):
+        with self.lock:
+            self.samples.append((action, seconds))
+            if error:
+                self.errors.append((action, error))
+
+    def by_action(self):
+        with self.lock:
+            out = {}
+            for action, seconds in self.samples:
+                out.setdefault(action, []).append(seconds)
+            return out
+
+
+class Browser:
+    """WebSocket でサーバーにつなぎ、ブラウザの代わりに再実行を頼む
+
+    画面の要素は ForwardMsg の delta から delta_path ごとに持ち、再実行のたびに届かなかった要素を
+    消す（フラグメントだけの再実行では、そのフラグメントの要素だけ）。ウィジェットの値は変えたものを
+    覚えておき、ブラウザと同じく以後の再実行でも送る。
+    """
+
+    def __init__(self, url, timeout):
+        from websockets.sync.client import connect
+
+        self.stack = contextlib.ExitStack()
+        self.ws = self.stack.enter_context(connect(url, subprotocols=["streamlit"], max_size=None, open_timeout=timeout))
+        self.timeout = timeout
+        self.elements = {}   # delta_path -> (種類, proto, fragment_id)
+        self.values = {}     # ウィジェットの id -> WidgetState
+        self.page_hash = ""
+
+    def close(self):
+        self.stack.close()
+
+    # --- 画面の要素 ---
+    def find(self, kind, label=None, prefix=None, form=None):
+        """種類とラベル（または先頭の文字列）が一致する要素の proto を返す（なければ None）
+
+        同じラベルのウィジェットが複数のフォームにあるときは form（フォームのキー）で区別する。
+        """
+        for k, proto, _ in self.elements.values():
+            if k != kind or (form is not None and getattr(proto, "form_id", "") != form):
+                continue
+            name = getattr(proto, "label", None)
+            if label is not None and name != label:
+                continue
+            if prefix is not None and not (name or "").startswith(prefix):
+                continue
+            return proto
+        return None
+
+    def component(self, name):
+        for k, proto, _ in self.elements.values():
+            if k == "component_instance" and name in proto.component_name:
+                return proto
+        return None
+
+    def errors(self):
+        return [proto.message for k, proto, _ in self.elements.values() if k == "exception"]
+
+    # --- 操作 ---
+    def interact(self, *changes, click=None):
+        """ウィジェットの値を変えて（click はボタンの proto）再実行し、かかった秒数を返す
+
+        changes は (proto, 値の種類, 値)。操作したウィジェットがフラグメントの中ならそのフラグメントだけを
+        再実行する（ブラウザと同じ）。
+        """
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        protos = [p for p, _, _ in changes] + ([click] if click is not None else [])
+        for proto, field, value in changes:
+            ws = WidgetState(id=proto.id)
+            setattr(ws, field, value)
+            self.values[proto.id] = ws
+        trigger = WidgetState(id=click.id, trigger_value=True) if click is not None else None
+        fragments = {self._fragment_of(p.id) for p in protos}
+        return self.rerun(trigger, fragments.pop() if len(fragments) == 1 else "")
+
+    def rerun(self, trigger=None, fragment_id=""):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        live = {proto.id for _, proto, _ in self.elements.values() if getattr(proto, "id", "")}
+        msg = BackMsg()
+        client = msg.rerun_script
+        client.page_script_hash = self.page_hash
+        client.fragment_id = fragment_id
+        for wid, state in self.values.items():
+            if wid in live:
+                client.widget_states.widgets.append(state)
+        if trigger is not None:
+            client.widget_states.widgets.append(trigger)
+        t = time.perf_counter()
+        self.ws.send(msg.SerializeToString())
+        self._receive()
+        return time.perf_counter() - t
+
+    # --- 内部処理 ---
+    def _fragment_of(self, widget_id):
+        for _, proto, fragment_id in self.elements.values():
+            if getattr(proto, "id", "") == widget_id:
+                return fragment_id
+        return ""
+
+    def _receive(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        touched, fragments = set(), None
+        deadline = time.monotonic() + self.timeout
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(self.ws.recv(timeout=max(0.1, deadline - time.monotonic())))
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                # 再実行の始まり（フラグメントだけの再実行なら、その ID が入っている）
+                self.page_hash = self.page_hash or msg.new_session.page_script_hash
+                touched, fragments = set(), set(msg.new_session.fragment_ids_this_run) or None
+            elif kind == "delta":
+                path = tuple(msg.metadata.delta_path)
+                touched.add(path)
+                delta = msg.delta
+                if delta.WhichOneof("type") == "new_element":
+                    element = delta.new_element
+                    name = element.WhichOneof("type")
+                    self.elements[path] = (name, getattr(element, name), delta.fragment_id)
+                elif delta.WhichOneof("type") == "add_block":
+                    self.elements[path] = ("block", delta.add_block, delta.fragment_id)
+            elif kind == "script_finished":
+                status = msg.script_finished
+                if status == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("スクリプトをコンパイルできません")
+                # 今回の再実行で届かなかった要素を消す
+                for path in list(self.elements):
+                    if path in touched:
+                        continue
+                    if fragments is None or self.elements[path][2] in fragments:
+                        del self.elements[path]
+                return
+
+
+class Session:
+    """1人の訪問者"""
+
+    def __init__(self, url, recorder, rnd, editor=False, think=3.0, timeout=120, password=""):
+        self.browser = Browser(url, timeout)
+        self.recorder = recorder
+        self.rnd = rnd
+        self.editor = editor
+        self.think = think
+        self.password = password
+        self.seq = 0
+        self.nonce = 0
+
+    def run(self, action, *changes, click=None):
+        t = time.perf_counter()
+        error = None
+        try:
+            self.browser.interact(*changes, click=click)
+            errors = self.browser.errors()
+            if errors:
+                error = errors[0]
+        except Exception as e:  # タイムアウト・切断など
+            error = f"{type(e).__name__}: {e}"
+        self.recorder.add(action, time.perf_counter() - t, error)
+        return error is None
+
+    def loop(self, stop_at, registrations):
+        try:
+            if not self.run("first"):
+                return
+            if self.editor and not self.login():
+                return
+            while time.monotonic() < stop_at:
+                time.sleep(self.rnd.uniform(0, 2 * self.think))
+                if self.editor and self.rnd.random() < 0.15:
+                    if self.rnd.random() < 0.5:
+                        self.register(registrations)
+                    else:
+                        self.edit()
+                else:
+                    self.view()
+        finally:
+            self.browser.close()
+
+    def login(self):
+        box = self.browser.find("text_input", "パスワードを入力")
+        if box is None or not self.run("login", (box, "string_value", self.password)):
+            return False
+        if self.browser.find("button", "ログアウト") is None:
+            self.recorder.add("login", 0.0, "ログインできません（--password を確認）")
+            return False
+        return True
+
+    # --- 閲覧 ---
+    def view(self):
+        r = self.rnd.random()
+        if r < 0.25:
+            self.browse()
+        elif r < 0.55:
+            self.filter()
+        elif r < 0.7:
+            self.search()
+        else:
+            self.detail()
+
+    def browse(self):
+        more = self.browser.find("button", prefix="⬇️ さらに表示")
+        if more is not None and self.rnd.random() < 0.5:
+            self.run("more", click=more)
+            return
+        radio = self.browser.find("radio", "🖼️ 表示スタイル")
+        if radio is None:
+            self.run("browse")
+            return
+        # 統計・タイムラインはときどき（本棚の表示が中心）
+        current = self._value(radio)
+        options = [o for o in radio.options if o != current]
+        weights = [4 if o in ("PC向け", "スマホ向け") else 1 for o in options]
+        self.run("browse", (radio, "string_value", self.rnd.choices(options, weights)[0]))
+
+    def filter(self):
+        if self.rnd.random() < 0.3:
+            widget = self.browser.find("radio", "📚 表示切替", form="")
+        else:
+            # 登録・編集のフォームにも同じラベルの選択肢があるので、フォームの外のものを選ぶ
+            widget = self.browser.find("selectbox", self.rnd.choice(["カテゴリ", "言語", "読了年", "並び替え"]), form="")
+        if widget is None or not widget.options:
+            self.run("filter")
+            return
+        self.run("filter", (widget, "string_value", self.rnd.choice(widget.options)))
+
+    def search(self):
+        box = self.browser.find("text_input", "キーワード検索", form="")
+        if box is None:
+            self.run("search")
+            return
+        self.run("search", (box, "string_value", "" if self._value(box) else self.rnd.choice(KEYWORDS)))
+
+    def detail(self):
+        """本棚の本をクリックして詳細ダイアログを開く（本棚のフラグメントだけの再実行）"""
+        shelf = self.browser.component("bookshelf")
+        books = json.loads(shelf.json_args).get("books", []) if shelf is not None else []
+        if not books:
+            self.browse()
+            return False
+        self.nonce += 1
+        clicked = json.dumps({"id": self.rnd.choice(books)["id"], "nonce": self.nonce})
+        return self.run("detail", (shelf, "json_value", clicked))
+
+    # --- 編集 ---
+    def register(self, registrations):
+        """Books API で検索して候補を選び、フォームから保存する"""
+        if not self._search_event("books_search", {"action": "query", "q": self.rnd.choice(KEYWORDS)}):
+            return
+        if not self._search_event("books_select", {"action": "select", "index": 0}):
+            return
+        form = "new_book_main_form"
+        title = self.browser.find("text_input", "タイトル (必須)", form=form)
+        confirm = self.browser.find("checkbox", "内容を確認しました（誤操作防止）", form=form)
+        allow_dup = self.browser.find("checkbox", "登録済みの本と重複していても保存する", form=form)
+        submit = self.browser.find("button", "保存する", form=form)
+        if None in (title, confirm, allow_dup, submit):
+            return
+        with registrations["lock"]:
+            registrations["count"] += 1
+            n = registrations["count"]
+        # フォームの値は送信ボタンと一緒に送る（ブラウザと同じ）
+        self.run("register", (title, "string_value", f"{self._value(title)} (負荷試験 {n})"),
+                 (confirm, "bool_value", True), (allow_dup, "bool_value", True), click=submit)
+
+    def edit(self):
+        """詳細ダイアログを開いて編集に切り替え、コメントを変えて保存する"""
+        if not self.detail():
+            return
+        button = self.browser.find("button", "✏️ この情報を更新する")
+        if button is None or not self.run("edit_open", click=button):
+            return
+        comment = self.browser.find("text_area", "コメント", form="edit_form")
+        confirm = self.browser.find("checkbox", "内容を確認しました（誤操作防止）", form="edit_form")
+        submit = self.browser.find("button", "💾 更新を保存する", form="edit_form")
+        if None in (comment, confirm, submit):
+            self.recorder.add("edit_open", 0.0, "編集フォームが表示されません")
+            return
+        self.run("edit_save", (comment, "string_value", f"負荷試験 {time.time():.3f}"),
+                 (confirm, "bool_value", True), click=submit)
+
+    # --- 内部処理 ---
+    def _value(self, proto):
+        state = self.browser.values.get(proto.id)
+        if state is not None:
+            return getattr(state, state.WhichOneof("value"))
+        if hasattr(proto, "options"):
+            return proto.options[proto.default] if proto.options else None
+        return proto.default
+
+    def _search_event(self, action, event):
+        box = self.browser.component("book_search")
+        if box is None:
+            return False
+        self.seq += 1
+        return self.run(action, (box, "json_value", json.dumps({**event, "seq": self.seq})))
+
+
+def serve(args):
+    """--serve: 偽の接続とスタブを差し替えてから、このプロセスで streamlit run と同じくサーバーを起動する"""
+    import books_api
+    import cover_cache
+    import local_mirror
+    from streamlit.web import cli as stcli
+
+    fakes.install({"Sheet1": fakes.synthetic_rows(args.books, seed=args.seed)}, latency=args.sheets_latency)
+    cover_cache.prefetch = lambda url: None
+    local_mirror.CACHE_DIR = os.path.join(args.tmp, "mirror")
+    books_api.CACHE_PATH = os.path.join(args.tmp, "books_api.sqlite3")
+    books_api.API_URL = args.books_url
+    sys.argv = ["streamlit", "run", APP, "--server.port", str(args.serve), "--server.address", "127.0.0.1",
+                "--server.headless", "true", "--server.fileWatcherType", "none",
+                "--browser.gatherUsageStats", "false", "--logger.level", "error"]
+    sys.exit(stcli.main())
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, tmp, books_url):
+    """サーバーのプロセスを起動し、応答するようになるまで待つ。(Popen, ポート, ログのパス) を返す"""
+    port = free_port()
+    log = os.path.join(tmp, "server.log")
+    cmd = [sys.executable, os.path.abspath(__file__), "--serve", str(port), "--tmp", tmp, "--books-url", books_url,
+           "--books", str(args.books), "--seed", str(args.seed), "--sheets-latency", str(args.sheets_latency)]
+    with open(log, "w") as out:
+        proc = subprocess.Popen(cmd, cwd=ROOT, stdout=out, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as res:
+                if res.status == 200:
+                    return proc, port, log
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    with open(log, encoding="utf-8", errors="replace") as f:
+        raise RuntimeError("サーバーが起動しませんでした:\n" + f.read()[-2000:])
+
+
+def run_load(args):
+    tmp = tempfile.mkdtemp()
+    stub = fakes.BooksStub(latency=args.books_latency, quota_rate=args.books_429, seed=args.seed).start()
+    proc = None
+    recorder = Recorder()
+    try:
+        proc, port, _ = start_server(args, tmp, stub.url)
+        url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        rss = {"start": rss_mb(proc.pid), "peak": 0.0}
+
+        # 最初の1人（共有データの読み込み・キャッシュの作成を含む）
+        first = Session(url, Recorder(), random.Random(args.seed), timeout=args.timeout)
+        t = time.perf_counter()
+        first.run("first")
+        cold_start = time.perf_counter() - t
+        first.browser.close()
+        if first.recorder.errors:
+            raise RuntimeError(first.recorder.errors[0][1])
+        rss["warm"] = rss_mb(proc.pid)
+
+        registrations = {"lock": threading.Lock(), "count": 0}
+        stop_at = time.monotonic() + args.ramp + args.duration
+        threads = []
+
+        def start(i):
+            time.sleep(args.ramp * i / max(args.sessions, 1))
+            try:
+                session = Session(url, recorder, random.Random(args.seed + i + 1), editor=i < args.editors,
+                                  think=args.think, timeout=args.timeout, password=args.password)
+                session.loop(stop_at, registrations)
+            except Exception as e:
+                recorder.add("session", 0.0, f"{type(e).__name__}: {e}")
+
+        started = time.perf_counter()
+        for i in range(args.sessions):
+            th = threading.Thread(target=start, args=(i,), daemon=True)
+            th.start()
+            threads.append(th)
+        while any(th.is_alive() for th in threads):
+            rss["peak"] = max(rss["peak"], rss_mb(proc.pid))
+            time.sleep(0.2)
+        elapsed = time.perf_counter() - started
+        rss["end"] = rss_mb(proc.pid)
+        rss["peak"] = max(rss["peak"], rss["end"])
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        stub.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    by_action = recorder.by_action()
+    views = [s for a in VIEW_ACTIONS for s in by_action.get(a, [])]
+    total = sum(len(v) for v in by_action.values())
+    return {
+        "cold_start": cold_start,
+        "elapsed": elapsed,
+        "reruns": total,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "view": summarize(views),
+        "actions": {a: summarize(v) for a, v in sorted(by_action.items())},
+        "errors": len(recorder.errors),
+        "error_samples": sorted({f"{a}: {m}" for a, m in recorder.errors})[:5],
+        "registrations": registrations["count"],
+        "rss_mb": {k: round(v, 1) for k, v in rss.items()},
+        "books_stub": {"requests": stub.requests, "429": stub.quota},
+    }
+
+
+def check(results, thresholds):
+    """基準を超えた項目のリスト"""
+    failures = []
+    view = results["view"]
+    for p in ("p95", "p99"):
+        if view[p] is not None and view[p] > thresholds[p]:
+            failures.append(f"閲覧の {p}: {view[p]:.2f}s > {thresholds[p]}s")
+    if results["errors"] > thresholds["errors"]:
+        failures.append(f"エラー: {results['errors']} 件 > {thresholds['errors']} 件")
+    if results["rss_mb"]["peak"] > thresholds["rss_mb"]:
+        failures.append(f"RSS: {results['rss_mb']['peak']:.0f} MB > {thresholds['rss_mb']} MB")
+    return failures
+
+
+def report(args, results):
+    print(f"\n== {args.sessions} セッション（編集 {args.editors}）/ {args.duration:.0f} 秒 / {args.books:,} 冊 ==")
+    print(f"  最初の表示        {results['cold_start']:8.2f} s")
+    print(f"  再実行            {results['reruns']:8d} 回   {results['throughput']:.1f} 回/秒")
+    print(f"  {'操作':<16}{'回数':>6}{'p50':>8}{'p90':>8}{'p95':>8}{'p99':>8}{'max':>8}")
+    for name, s in [("閲覧（全体）", results["view"]), *results["actions"].items()]:
+        if not s["n"]:
+            continue
+        print(f"  {name:<16}{s['n']:>6}" + "".join(f"{s[k]:>8.3f}" for k in ("p50", "p90", "p95", "p99", "max")))
+    rss = results["rss_mb"]
+    print(f"  サーバーの RSS    開始 {rss['start']:.0f} MB / 初回後 {rss['warm']:.0f} MB / 最大 {rss['peak']:.0f} MB / 終了 {rss['end']:.0f} MB")
+    print(f"  登録              {results['registrations']} 冊（Books スタブへの要求 {results['books_stub']['requests']} 回・429 {results['books_stub']['429']} 回）")
+    if results["errors"]:
+        print(f"  エラー            {results['errors']} 件")
+        for e in results["error_samples"]:
+            print("    " + e)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    from libraries import DEFAULT_PASSWORD
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=20, help="同時に使うセッション数")
+    ap.add_argument("--editors", type=int, default=2, help="そのうちログインして登録・編集もするセッション数")
+    ap.add_argument("--duration", type=float, default=60, help="全員がそろってから続ける秒数")
+    ap.add_argument("--ramp", type=float, default=10, help="全員がそろうまでの秒数")
+    ap.add_argument("--books", type=int, default=10000, help="シートの冊数")
+    ap.add_argument("--think", type=float, default=3.0, help="操作の間隔の平均秒数")
+    ap.add_argument("--sheets-latency", type=float, default=0.05, help="Sheets API 1回の秒数")
+    ap.add_argument("--books-latency", type=float, default=0.1, help="Books API 1回の秒数")
+    ap.add_argument("--books-429", type=float, default=0.0, help="Books API が 429 を返す割合")
+    ap.add_argument("--timeout", type=float, default=120, help="サーバーの起動・1回の再実行の上限秒数")
+    ap.add_argument("--password", default=DEFAULT_PASSWORD, help="編集のセッションがログインするパスワード")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-p95", type=float, default=THRESHOLDS["p95"])
+    ap.add_argument("--max-p99", type=float, default=THRESHOLDS["p99"])
+    ap.add_argument("--max-errors", type=int, default=THRESHOLDS["errors"])
+    ap.add_argument("--max-rss", type=float, default=THRESHOLDS["rss_mb"], help="サーバーの RSS の最大（MB）")
+    ap.add_argument("--check", action="store_true", help="基準を超えたら終了コード1")
+    # サーバーのプロセスとして起動されたとき（内部用）
+    ap.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    ap.add_argument("--tmp", help=argparse.SUPPRESS)
+    ap.add_argument("--books-url", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.serve:
+        serve(args)
+        return
+    args.editors = min(args.editors, args.sessions)
+
+    results = run_load(args)
+    report(args, results)
+    thresholds = {"p95": args.max_p95, "p99": args.max_p99, "errors": args.max_errors, "rss_mb": args.max_rss}
+    failures = check(results, thresholds)
+
+    os.makedirs(os.path.dirname(RESULTS), exist_ok=True)
+    with open(RESULTS, "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("check", "password", "serve", "tmp", "books_url")},
+            "thresholds": thresholds,
+            "results": results,
+            "passed": not failures,
+        }, ensure_ascii=False) + "\n")
+
+    if failures:
+        print("\n⚠️ 基準を超えた項目:")
+        for f in failures:
+            print("  " + f)
+        if args.check:
+            sys.exit(1)
+    else:
+        print("\n✅ すべての基準を満たしています")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""合成データでの性能測定（読み込み・日付変換・フィルタ・並び替え・描画）
+
+使い方:
+    python bench/run_bench.py                     # 1k / 10k / 100k 冊
+    python bench/run_bench.py --sizes 1000 --check
+
+startup_* は新しいプロセスでの匿名の初回表示（empty: ミラーが空 / warm: 保存済みのミラーあり /
+snapshot: ミラーと最新のスナップショットあり）。
+shelf_ready は本棚の描画が終わるまで、heavy_modules は STARTUP_MODULES のうち読み込まれた数。
+
+結果は bench/results/history.jsonl に追記し、前回（別コミット）の結果より
+REGRESSION_RATIO 倍以上遅くなった段階を表示する（--check なら終了コード1）。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+from bench import fakes  # noqa: E402
+
+APP = os.path.join(ROOT, "251225_streamlit_app.py")
+RESULTS = os.path.join(ROOT, "bench", "results", "history.jsonl")
+REGRESSION_RATIO = 1.25
+# 閲覧だけの訪問者には不要なはずの重いモジュール
+STARTUP_MODULES = ["streamlit_gsheets", "books_api", "bulk_import", "requests", "PIL"]
+
+
+def measure(fn, repeat):
+    """(中央値の秒数, tracemalloc のピークMB, 最後の戻り値)"""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak / 1e6, out
+
+
+def bench_pipeline(rows, repeat):
+    """アプリの各段階を同じ関数で直接測る"""
+    from book_table import apply_filters, normalize_books, sort_books
+    from local_mirror import LocalMirror
+    from search_index import SearchIndex
+    from sheet_store import SheetStore
+
+    results = {}
+    ws = fakes.FakeWorksheet(rows)
+    results["sheet_read"], mem, raw = measure(lambda: SheetStore(ws).read(), repeat)
+    results["sheet_read_mem"] = mem
+
+    tmp = tempfile.mkdtemp()
+    try:
+        def pull():
+            m = LocalMirror(path=os.path.join(tmp, f"m{time.time_ns()}.sqlite3"))
+            m.store = SheetStore(ws)
+            m.pull_blocking()
+            return m
+        results["mirror_pull"], results["mirror_pull_mem"], mirror = measure(pull, 1)
+        results["mirror_read"], results["mirror_read_mem"], raw = measure(mirror.read, repeat)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    results["normalize"], results["normalize_mem"], (df, _) = measure(lambda: normalize_books(raw), repeat)
+    results["parse_読了日_dt"], results["parse_読了日_dt_mem"], _ = measure(
+        lambda: pd.to_datetime(raw["読了日"], errors="coerce", format="mixed"), repeat)
+    results["search_index_build"], results["search_index_build_mem"], index = measure(lambda: SearchIndex(df), 1)
+    results["filters"], results["filters_mem"], df_f = measure(
+        lambda: apply_filters(df, "読了", "夜", "小説", "日本語", "すべて", search_index=index), repeat)
+    results["filters_no_query"], _, df_all = measure(lambda: apply_filters(df, "読了"), repeat)
+    results["sort_values"], results["sort_values_mem"], _ = measure(lambda: sort_books(df_all, "新しい順"), repeat)
+    return results
+
+
+def bench_render(rows, repeat):
+    """AppTest でアプリ全体を実行し、表示スタイルごとの再実行時間を測る"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    import cover_cache
+    import local_mirror
+
+    fakes.install({"Sheet1": rows})
+    cover_cache.prefetch = lambda url: None  # 書影の取得（通信）はしない
+    tmp = tempfile.mkdtemp()
+    local_mirror.CACHE_DIR = tmp
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    results = {}
+    try:
+        at = AppTest.from_file(APP, default_timeout=600)
+        t = time.perf_counter()
+        at.run()
+        results["app_cold_start"] = time.perf_counter() - t
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        for label, key in (("PC向け", "render_grid"), ("スマホ向け", "render_list")):
+            at.sidebar.radio(key=at.sidebar.radio[0].key).set_value(label)
+            at.run()
+            results[key], results[f"{key}_mem"], _ = measure(at.run, repeat)
+            results[f"{key}_elements"] = sum(1 for _ in _walk(at._tree))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def bench_startup(rows_count):
+    """新しいプロセスで匿名の初回表示と再実行を測る"""
+    results = {}
+    for scenario in ("empty", "warm", "snapshot"):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--startup-child", str(rows_count), scenario],
+                             cwd=ROOT, capture_output=True, text=True)
+        if out.returncode:
+            raise RuntimeError(out.stderr[-2000:])
+        for key, value in json.loads(out.stdout.strip().splitlines()[-1]).items():
+            results[f"startup_{scenario}_{key}"] = value
+    return results
+
+
+def startup_child(rows_count, scenario):
+    """bench_startup から別プロセスで呼ばれる（結果を1行のJSONで出力）"""
+    from streamlit.testing.v1 import AppTest
+
+    import cover_cache
+    import local_mirror
+    import tracing
+
+    rows = fakes.synthetic_rows(rows_count)
+    fakes.install_connection({"Sheet1": rows})
+    cover_cache.prefetch = lambda url: None
+    tmp = tempfile.mkdtemp()
+    local_mirror.CACHE_DIR = tmp
+    tracing.TRACE_PATH = os.path.join(tmp, "trace.jsonl")
+    tracing.TRACE_ALL = True
+    if scenario in ("warm", "snapshot"):
+        from sheet_store import SheetStore
+
+        m = local_mirror.LocalMirror()
+        m.store = SheetStore(fakes.FakeWorksheet(rows))
+        m.pull_blocking()
+        if scenario == "snapshot":
+            m.snapshot(force=True)
+        m.db.close()
+
+    try:
+        at = AppTest.from_file(APP, default_timeout=600)
+        t = time.perf_counter()
+        at.run()
+        first_run = time.perf_counter() - t
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        t = time.perf_counter()
+        at.run()
+        rerun = time.perf_counter() - t
+        with open(tracing.TRACE_PATH, encoding="utf-8") as f:
+            trace = json.loads(f.readline())
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    # 計測はスクリプトの先頭の import より後から始まるので、描画後の残り時間を差し引いて求める
+    render = next(s for s in trace["spans"] if s["name"].startswith("render_"))
+    after_render = (trace["total_ms"] - render["start_ms"] - render["ms"]) / 1000
+    print(json.dumps({
+        "first_run": first_run,
+        "shelf_ready": first_run - after_render,
+        "rerun": rerun,
+        "heavy_modules": sum(m in sys.modules for m in STARTUP_MODULES),
+    }))
+
+
+def _walk(node):
+    for child in getattr(node, "children", {}).values():
+        yield child
+        yield from _walk(child)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def load_history():
+    if not os.path.exists(RESULTS):
+        return []
+    with open(RESULTS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--no-render", action="store_true", help="AppTest での描画測定を省く")
+    ap.add_argument("--check", action="store_true", help="性能が落ちた段階があれば終了コード1")
+    ap.add_argument("--startup-child", nargs=2, metavar=("ROWS", "SCENARIO"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.startup_child:
+        startup_child(int(args.startup_child[0]), args.startup_child[1])
+        return
+
+    commit = git_commit()
+    history = load_history()
+    run = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+    }
+    regressions = []
+    os.makedirs(os.path.dirname(RESULTS), exist_ok=True)
+    for n in args.sizes:
+        rows = fakes.synthetic_rows(n)
+        results = bench_pipeline(rows, args.repeat)
+        if not args.no_render:
+            results.update(bench_startup(n))
+            results.update(bench_render(rows, args.repeat))
+
+        print(f"\n== {n:,} 冊 ==")
+        previous = [h for h in history if h["size"] == n and h["commit"] != commit]
+        for stage, value in results.items():
+            unit = "MB" if stage.endswith("_mem") else ("" if stage.endswith(("_elements", "_modules")) else "s")
+            line = f"  {stage:<24} {value:10.4f} {unit}"
+            if unit == "s" and previous and stage in previous[-1]["results"]:
+                before = previous[-1]["results"][stage]
+                ratio = value / before if before else 1.0
+                line += f"   ({ratio:.2f}x vs {previous[-1]['commit']})"
+                if ratio >= REGRESSION_RATIO and value - before > 0.005:
+                    regressions.append(f"{n:,} 冊 / {stage}: {before:.4f}s -> {value:.4f}s")
+            print(line)
+        with open(RESULTS, "a", encoding="utf-8") as f:
+            f.write(json.dumps({**run, "size": n, "results": results}, ensure_ascii=False) + "\n")
+
+    if regressions:
+        print("\n⚠️ 前回より遅くなった段階:")
+        for r in regressions:
+            print("  " + r)
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
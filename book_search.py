@@ -0,0 +1,17 @@
+"""登録フォームの「入力しながら検索」コンポーネント
+
+入力の待ち合わせ（デバウンス）と候補の表示はブラウザ側で行い、Python には
+{"action": "query" | "more" | "select", "seq": 番号, ...} の操作だけを返す。
+"""
+import os
+
+import streamlit.components.v1 as components
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book_search_frontend")
+
+_component = components.declare_component("book_search", path=FRONTEND_DIR)
+
+
+def book_search(query, results, has_more, seq, error=None, key=None):
+    """検索欄と候補を表示する（seq は処理済みの最後の操作の番号）"""
+    return _component(query=query, results=results, has_more=has_more, seq=seq, error=error, key=key, default=None)
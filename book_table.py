@@ -0,0 +1,89 @@
+"""読書記録の列定義と、読み込み時の正規化（型付け）"""
+import hashlib
+
+import pandas as pd
+
+from sheet_store import row_fingerprints
+
+# --- 設定 ---
+CATEGORY_LIST = ["小説", "Stoicism", "語学", "キャリア", "AI", "ビジネス", "ノンフィクション", "エッセイ", "その他"]
+LANGUAGE_LIST = ["日本語", "英語", "スペイン語"]
+STATUS_LIST = ["読了", "読書中", "読みたい", "断念"]
+
+TEXT_COLUMNS = ["タイトル", "著者", "コメント", "開始日", "読了日", "画像URL"]
+# 空欄のときの既定値
+CATEGORY_DEFAULTS = {"カテゴリ": "その他", "言語": "日本語", "ステータス": "読了"}
+CATEGORY_CHOICES = {"カテゴリ": CATEGORY_LIST, "言語": LANGUAGE_LIST, "ステータス": STATUS_LIST}
+
+
+def _clean_text(s):
+    return s.fillna("").astype(str).str.strip().replace("nan", "")
+
+
+def normalize_books(raw):
+    """シートの生データを型付きの表に変換し、(表, データバージョン) を返す
+
+    追加される列:
+      開始日_dt / 読了日_dt … datetime64（不正な日付は NaT）
+      月ラベル … 「2024年 05月」形式（日付なしは「日付なし」）
+      行ハッシュ … 読み込み時点の行内容（書き込み時の競合検出用）
+    評価は Int64（nullable）、カテゴリ・言語・ステータスは category 型になる。
+    """
+    if raw.empty:
+        return raw, "empty"
+    df = pd.DataFrame(index=raw.index)
+    fps = row_fingerprints(raw, list(raw.columns))
+
+    for col in raw.columns:
+        df[col] = raw[col]
+    for col in TEXT_COLUMNS:
+        df[col] = _clean_text(raw[col]) if col in raw.columns else ""
+
+    for col, choices in CATEGORY_CHOICES.items():
+        s = _clean_text(raw[col]) if col in raw.columns else pd.Series("", index=raw.index)
+        s = s.mask(s == "", CATEGORY_DEFAULTS[col])
+        extra = sorted(set(s.unique()) - set(choices))
+        df[col] = pd.Categorical(s, categories=choices + extra)
+
+    rating = pd.to_numeric(raw["評価"], errors="coerce") if "評価" in raw.columns else pd.Series(pd.NA, index=raw.index)
+    df["評価"] = rating.round().astype("Int64")
+
+    # 「2024-01-05」と「2024/01/05」が混在していても読めるようにする
+    df["開始日_dt"] = pd.to_datetime(df["開始日"], errors="coerce", format="mixed")
+    df["読了日_dt"] = pd.to_datetime(df["読了日"], errors="coerce", format="mixed")
+    # strftime は行ごとに書式化して遅いので、年月ごとに1回だけ書式化する
+    month = df["読了日_dt"].dt.year * 100 + df["読了日_dt"].dt.month
+    labels = {m: f"{int(m) // 100}年 {int(m) % 100:02d}月" for m in month.dropna().unique()}
+    df["月ラベル"] = month.map(labels).fillna("日付なし")
+    df["行ハッシュ"] = fps
+
+    version = hashlib.sha1("".join(fps).encode("ascii")).hexdigest()[:16]
+    return df, version
+
+
+def apply_filters(df, status_group, q="", f_cat="すべて", f_lang="すべて", f_year="すべて", search_index=None):
+    """サイドバーの条件で絞り込む（キーワードは search_index で検索し、関連度順に並べる）"""
+    # ステータスグループによるフィルタ
+    if status_group == "読了":
+        df = df[df["ステータス"] == "読了"]
+    else:  # 「読みたい・読書中」
+        df = df[df["ステータス"].isin(["読みたい", "読書中"])]
+
+    if q and search_index is not None:
+        hits = pd.Index(search_index.search(q))
+        df = df.loc[hits[hits.isin(df.index)]]
+    if f_cat != "すべて": df = df[df["カテゴリ"] == f_cat]
+    if f_lang != "すべて": df = df[df["言語"] == f_lang]
+    if f_year != "すべて": df = df[df["読了日_dt"].dt.year == int(f_year)]
+    return df
+
+
+def sort_books(df, sort_order="新しい順"):
+    return df.sort_values(["読了日_dt"], ascending=(sort_order == "古い順"))
+
+
+def rating_value(v, default=0):
+    """Int64 の評価を 0〜5 の int にする（欠損は default）"""
+    if pd.isna(v):
+        return default
+    return max(0, min(5, int(v)))
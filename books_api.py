@@ -0,0 +1,191 @@
+"""Google Books 検索（接続プール・並列実行・ディスクキャッシュ付き。呼び出しは api_gateway 経由）"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import api_gateway
+
+API_URL = "https://www.googleapis.com/books/v1/volumes"
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "books_api.sqlite3")
+CACHE_TTL = 7 * 24 * 3600  # 秒
+CACHE_MAX_ENTRIES = 2000
+TIMEOUT = 10
+PAGE_SIZE = 9  # 登録フォームの候補1ページ分（3列×3行）
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json",
+    "Accept-Language": "ja,en-US;q=0.9,en;q=0.8",
+    "Referer": "https://www.google.com/"
+}
+UNKNOWN_AUTHOR = "不明な著者"
+SLUG_STOPWORDS = ["novel", "english", "ebook", "kindle", "edition", "paperback", "hardcover", "psychological", "thriller"]
+
+# --- 共有リソース（プロセス内で使い回す） ---
+_session = requests.Session()
+_session.headers.update(HEADERS)
+# 再試行は api_gateway.BOOKS がまとめて行う（ここでも再試行すると回数が掛け算になる）
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="books_api")
+_cache_lock = threading.Lock()
+_cache_conn = None
+
+
+def parse_query(query):
+    """入力（Amazon URL またはキーワード）から (ASIN, キーワード) を取り出す"""
+    # ASIN/ISBNの抽出（URLの場合）
+    asin_match = re.search(r"/(?:dp|product|ASID|ASIN|ebook)/([A-Z0-9]{10,13})", query)
+    asin_q = asin_match.group(1) if asin_match else None
+
+    # URLからタイトルのヒント（スラグ）を抽出
+    keyword_q = None
+    slug_match = re.search(r"jp/([^/]+)/(?:dp|product|ebook|ASID|ASIN)", query)
+    if slug_match:
+        decoded = urllib.parse.unquote(slug_match.group(1))
+        # ハイフンやアンダースコアも区切りとして扱う
+        raw_words = re.findall(r"[\wéàèùâêîôûëïü]+", decoded.replace("-", " ").replace("_", " "))
+        keyword_q = " ".join([w for w in raw_words if w.lower() not in SLUG_STOPWORDS])
+
+    # ASINがない場合は入力クエリそのものをキーワードとする
+    if not asin_q and not keyword_q:
+        keyword_q = query
+    return asin_q, keyword_q
+
+
+def normalize_query(text):
+    if not text:
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def fetch_volumes(q, max_results=10, start_index=0):
+    """1クエリ分の volumeInfo のリストを返す（回数制限・再試行は api_gateway。失敗は例外のまま）"""
+    params = {"q": q, "country": "JP", "maxResults": max_results, "startIndex": start_index}
+
+    def get():
+        res = _session.get(API_URL, params=params, timeout=TIMEOUT)
+        res.raise_for_status()
+        return [item.get("volumeInfo", {}) for item in res.json().get("items", [])]
+    # 同じ検索が同時に来たら（複数の画面・一括処理）、問い合わせは1回にまとめる
+    return api_gateway.BOOKS.call(get, key=(q, max_results, start_index))
+
+
+def to_candidate(v):
+    # 候補のプレビューは元の URL を直接表示するので、縮小版（zoom=1）のまま使う（本棚では cover_cache が縮小して配信する）
+    img = v.get("imageLinks", {}).get("thumbnail", "")
+    if img:
+        img = img.replace("http://", "https://")
+    # ISBN-13 を優先し、なければ ISBN-10（重複チェックに使う）
+    ids = {i.get("type"): i.get("identifier", "") for i in v.get("industryIdentifiers", [])}
+    return {
+        "title": v.get("title", "不明なタイトル"),
+        "authors": ", ".join(v.get("authors", [UNKNOWN_AUTHOR])),
+        "thumbnail": img,
+        "isbn": ids.get("ISBN_13") or ids.get("ISBN_10", "")
+    }
+
+
+def search(query):
+    """検索候補のリストとエラーのリストを返す（1ページ目の10件まで）"""
+    results, errors, _ = search_page(query, 0, page_size=10)
+    return results, errors
+
+
+def search_page(query, page=0, page_size=PAGE_SIZE):
+    """検索候補の1ページ分を (候補, エラー, 続きがありそうか) で返す
+
+    1ページ目は ASIN とキーワードの2クエリを並列に投げ、2ページ目以降はキーワードだけを
+    startIndex をずらして取得する。結果はページごとにディスクにキャッシュする。
+    """
+    asin_q, keyword_q = parse_query(query)
+    key = f"{asin_q or ''}|{normalize_query(keyword_q)}|{page}|{page_size}"
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached["results"], [], cached["has_more"]
+
+    search_queries = [(sq, 0) for sq in (asin_q,) if sq and page == 0]
+    if keyword_q:
+        search_queries.append((keyword_q, page * page_size))
+    futures = [(sq, _executor.submit(fetch_volumes, sq, page_size, start)) for sq, start in search_queries]
+
+    results, errors = [], []
+    has_more = False
+    seen_titles = set()
+    for sq, fut in futures:
+        try:
+            volumes = fut.result()
+        except Exception as e:
+            errors.append((sq, e))
+            continue
+        if sq == keyword_q and len(volumes) >= page_size:
+            has_more = True
+        for v in volumes:
+            cand = to_candidate(v)
+            # 重複排除
+            if cand["title"] in seen_titles: continue
+            seen_titles.add(cand["title"])
+            results.append(cand)
+
+    if not errors:
+        _cache_put(key, {"results": results, "has_more": has_more})
+    return results, errors, has_more
+
+
+# --- ディスクキャッシュ (SQLite) ---
+def _cache():
+    global _cache_conn
+    if _cache_conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        _cache_conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)"
+        )
+    return _cache_conn
+
+
+def _cache_get(key):
+    now = time.time()
+    try:
+        with _cache_lock:
+            db = _cache()
+            row = db.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > CACHE_TTL:
+                db.execute("DELETE FROM results WHERE key = ?", (key,))
+                db.commit()
+                return None
+            db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            db.commit()
+        return json.loads(row[0])
+    except sqlite3.Error:
+        return None
+
+
+def _cache_put(key, value):
+    now = time.time()
+    try:
+        with _cache_lock:
+            db = _cache()
+            db.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            # 期限切れと、上限を超えた古いもの（最終アクセス順）を削除
+            db.execute("DELETE FROM results WHERE created < ?", (now - CACHE_TTL,))
+            db.execute(
+                "DELETE FROM results WHERE key NOT IN (SELECT key FROM results ORDER BY accessed DESC LIMIT ?)",
+                (CACHE_MAX_ENTRIES,)
+            )
+            db.commit()
+    except sqlite3.Error:
+        pass
@@ -0,0 +1,46 @@
+"""本棚（グリッド・リスト）を1つのHTMLコンポーネントとして描く
+
+表示中の本をまとめて渡し、月ごとの見出しとカードはブラウザ側で組み立てる。
+Python に返すのはクリックされた本のIDだけ。
+"""
+import os
+
+import streamlit.components.v1 as components
+
+from book_table import rating_value
+from cover_cache import cover_url
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bookshelf_frontend")
+COMMENT_CHARS = 60  # リストに出すコメントの文字数
+
+_component = components.declare_component("bookshelf", path=FRONTEND_DIR)
+
+
+def shelf_books(df, mode):
+    """コンポーネントに渡す本のリスト（mode は "grid" か "list"）"""
+    books = []
+    for row in df.to_dict("records"):
+        img = row["画像URL"]
+        comment = row["コメント"]
+        if len(comment) > COMMENT_CHARS:
+            comment = comment[:COMMENT_CHARS] + "..."
+        books.append({
+            "id": row["ID"],
+            "month": row["月ラベル"],
+            "title": row["タイトル"],
+            "author": row["著者"] or "不明な著者",
+            # グリッドは画像なしを「No Cover」で、リストはダミー画像で表示する
+            "cover": cover_url(img, mode) if img or mode == "list" else "",
+            "rating": rating_value(row["評価"]),
+            "category": str(row["カテゴリ"]),
+            "language": str(row["言語"]),
+            "status": str(row["ステータス"]),
+            "comment": comment,
+            "date": row["読了日"],
+        })
+    return books
+
+
+def bookshelf(books, mode, key=None):
+    """本棚を表示し、クリックされた本の {"id", "nonce"} を返す（まだなければ None）"""
+    return _component(books=books, mode=mode, key=key, default=None)
@@ -0,0 +1,74 @@
+// 本棚（グリッド・リスト）の組み立て。コンポーネントと静的書き出し（static_export.py）で共有する
+// 書影の URL は resolve(url) で、本を開く操作は open(id) で呼び出し側が決める
+
+function el(tag, className, text) {
+    const node = document.createElement(tag);
+    if (className) node.className = className;
+    if (text !== undefined) node.textContent = text;
+    return node;
+}
+
+function openButton(id, open) {
+    const btn = el("button", "open-btn", "➕");
+    btn.title = "詳細を見る";
+    btn.addEventListener("click", (e) => { e.stopPropagation(); open(id); });
+    return btn;
+}
+
+function gridCard(book, open, resolve) {
+    const card = el("div", "book");
+    if (book.cover) {
+        const img = el("img", "book-cover");
+        img.src = resolve(book.cover);
+        img.loading = "lazy";
+        img.alt = book.title;
+        card.appendChild(img);
+    } else {
+        card.appendChild(el("div", "book-cover no-cover", "No Cover"));
+    }
+    card.appendChild(openButton(book.id, open));
+    card.addEventListener("click", () => open(book.id));
+    return card;
+}
+
+function listCard(book, open, resolve) {
+    const card = el("div", "notion-list-item");
+    const img = el("img", "notion-cover");
+    img.src = resolve(book.cover);
+    img.loading = "lazy";
+    img.alt = book.title;
+    card.appendChild(img);
+
+    const content = el("div", "notion-content");
+    content.appendChild(el("div", "notion-title", book.title));
+    content.appendChild(el("div", "notion-author", book.author));
+    content.appendChild(el("div", "notion-rating", "★".repeat(book.rating) + "☆".repeat(5 - book.rating)));
+    const meta = el("div", "notion-meta-row");
+    for (const tag of [book.category, book.language, book.status]) {
+        meta.appendChild(el("span", "notion-tag", tag));
+    }
+    content.appendChild(meta);
+    if (book.comment) content.appendChild(el("div", "notion-comment", book.comment));
+    content.appendChild(el("div", "notion-footer", "📅 " + book.date));
+    card.appendChild(content);
+
+    card.appendChild(openButton(book.id, open));
+    card.addEventListener("click", () => open(book.id));
+    return card;
+}
+
+// 月ごとの見出しを付けて root に描く（books は並び替え済み）
+function renderShelf(root, books, mode, open, resolve) {
+    root.replaceChildren();
+    const grid = mode === "grid";
+    let month = null;
+    let box = null;
+    for (const book of books) {
+        if (book.month !== month) {
+            month = book.month;
+            root.appendChild(el(grid ? "h3" : "h4", null, "🗓️ " + month));
+            box = root.appendChild(el("div", grid ? "grid" : "list"));
+        }
+        box.appendChild(grid ? gridCard(book, open, resolve) : listCard(book, open, resolve));
+    }
+}
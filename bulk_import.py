@@ -0,0 +1,153 @@
+"""CSV / Goodreads / Kindle のエクスポートから一括インポートする"""
+import codecs
+import csv
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import books_api
+from book_table import CATEGORY_LIST, LANGUAGE_LIST, STATUS_LIST
+from dup_index import DuplicateIndex
+
+# 取り込み先の列 -> エクスポート側で使われる列名（先に見つかったものを使う）
+COLUMN_ALIASES = {
+    "タイトル": ["タイトル", "Title", "title", "書名", "Book Title"],
+    "著者": ["著者", "Author", "Authors", "Author(s)", "author", "著者名"],
+    "評価": ["評価", "My Rating", "Rating", "rating"],
+    "カテゴリ": ["カテゴリ", "Category", "Genre"],
+    "言語": ["言語", "Language"],
+    "ステータス": ["ステータス", "Exclusive Shelf", "Read Status", "Status", "Shelf"],
+    "コメント": ["コメント", "My Review", "Review", "Notes", "Private Notes"],
+    "開始日": ["開始日", "Date Started", "Start Date", "Started"],
+    "読了日": ["読了日", "Date Read", "Finished", "End Date", "Date Finished"],
+    "画像URL": ["画像URL", "Cover", "Cover URL", "Image URL"],
+    "ISBN": ["ISBN13", "ISBN", "ASIN", "isbn"],
+}
+STATUS_ALIASES = {
+    "read": "読了", "finished": "読了",
+    "currently-reading": "読書中", "reading": "読書中",
+    "to-read": "読みたい", "want to read": "読みたい", "unread": "読みたい",
+    "did-not-finish": "断念", "dnf": "断念", "abandoned": "断念",
+}
+ENRICH_WORKERS = 8       # 問い合わせの並列数（毎秒の回数は api_gateway.BOOKS で抑える）
+_JAPANESE = re.compile(r"[぀-ヿ一-鿿]")
+
+
+def read_export(file):
+    """アップロードされたCSVを1行ずつ読み、こちらの列に対応付けたレコードのリストを返す"""
+    reader = csv.DictReader(codecs.getreader("utf-8-sig")(file))
+    fields = reader.fieldnames or []
+    mapping = {}
+    for target, aliases in COLUMN_ALIASES.items():
+        for a in aliases:
+            if a in fields:
+                mapping[target] = a
+                break
+    if "タイトル" not in mapping:
+        raise ValueError("タイトルの列が見つかりません（Title / タイトル）")
+
+    records = []
+    for raw in reader:
+        rec = map_record({t: raw.get(src, "") for t, src in mapping.items()})
+        if rec["タイトル"]:
+            records.append(rec)
+    return records
+
+
+def map_record(src):
+    """1行分の値をこちらの形式（文字列）に整える"""
+    title = (src.get("タイトル") or "").strip()
+    isbn = re.sub(r"[^0-9A-Za-z]", "", src.get("ISBN") or "")  # Goodreads は ="978..." 形式
+
+    rating = (src.get("評価") or "").strip()
+    try:
+        r = int(float(rating))
+        rating = str(r) if 1 <= r <= 5 else ""  # Goodreads の 0 は未評価
+    except ValueError:
+        rating = ""
+
+    status = (src.get("ステータス") or "").strip()
+    status = status if status in STATUS_LIST else STATUS_ALIASES.get(status.lower(), "読了")
+    cat = (src.get("カテゴリ") or "").strip()
+    lang = (src.get("言語") or "").strip()
+    if lang not in LANGUAGE_LIST:
+        lang = "日本語" if _JAPANESE.search(title) else "英語"
+
+    end = _date(src.get("読了日"))
+    start = _date(src.get("開始日")) or end
+    return {
+        "タイトル": title,
+        "著者": (src.get("著者") or "").strip(),
+        "評価": rating,
+        "カテゴリ": cat if cat in CATEGORY_LIST else "その他",
+        "言語": lang,
+        "ステータス": status,
+        "コメント": (src.get("コメント") or "").strip(),
+        "開始日": start,
+        "読了日": end,
+        "画像URL": (src.get("画像URL") or "").strip(),
+        "ISBN": isbn,
+    }
+
+
+def _date(value):
+    value = (value or "").strip()
+    if not value:
+        return ""
+    d = pd.to_datetime(value, errors="coerce")
+    return "" if pd.isna(d) else d.strftime("%Y-%m-%d")
+
+
+def needs_enrichment(rec):
+    return not rec["画像URL"] or rec["著者"] in ("", books_api.UNKNOWN_AUTHOR)
+
+
+def lookup_query(rec):
+    """補完のための検索文字列（ISBN / ASIN があればそれで、なければタイトルと著者で）"""
+    isbn = rec.get("ISBN") or ""
+    if isbn:
+        return f"isbn:{isbn}" if isbn.isdigit() else isbn
+    author = "" if rec["著者"] == books_api.UNKNOWN_AUTHOR else rec["著者"]
+    return f"{rec['タイトル']} {author}".strip()
+
+
+def fill_from_hit(rec, hit):
+    """欠けている表紙・著者を検索結果で埋め（rec を直接更新）、変えた列の dict を返す"""
+    changes = {}
+    if not rec["画像URL"] and hit["thumbnail"]:
+        changes["画像URL"] = hit["thumbnail"]
+    if rec["著者"] in ("", books_api.UNKNOWN_AUTHOR) and hit["authors"] != books_api.UNKNOWN_AUTHOR:
+        changes["著者"] = hit["authors"]
+    rec.update(changes)
+    return changes
+
+
+def enrich(records, progress=None):
+    """表紙・著者が欠けているレコードを Google Books で並列に補完する（records を直接更新）"""
+    targets = [r for r in records if needs_enrichment(r)]
+
+    def lookup(rec):
+        results, _ = books_api.search(lookup_query(rec))
+        return rec, results[0] if results else None
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=ENRICH_WORKERS) as ex:
+        for fut in as_completed([ex.submit(lookup, r) for r in targets]):
+            rec, hit = fut.result()
+            if hit:
+                fill_from_hit(rec, hit)
+            done += 1
+            if progress:
+                progress(done, len(targets))
+    return records
+
+
+def flag_duplicates(records, index):
+    """登録済み（index に一致）、またはファイル内で重複している行に「重複」を付ける"""
+    batch = DuplicateIndex()
+    for rec in records:
+        args = (rec["タイトル"], rec["著者"], rec.get("ISBN", ""))
+        rec["重複"] = index.find(*args) is not None or batch.find(*args) is not None
+        batch.add(rec)
+    return records
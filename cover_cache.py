@@ -0,0 +1,119 @@
+"""書影のローカルキャッシュ（一度だけ取得し、表示サイズごとに縮小して保存）"""
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+COVER_DIR = os.path.join(STATIC_DIR, "covers")
+# static/ 以下は Streamlit の静的配信で app/static/ から参照できる
+STATIC_URL = "app/static"
+PLACEHOLDER_URL = f"{STATIC_URL}/no_cover.svg"
+PLACEHOLDER_PATH = os.path.join(STATIC_DIR, "no_cover.svg")
+
+# 表示ごとの最大サイズ（高解像度画面向けに表示サイズの約2倍）
+SIZES = {"grid": (240, 360), "list": (160, 220), "detail": (480, 720)}
+RETRY_AFTER = 3600  # 取得に失敗したURLを再試行するまでの秒数
+
+_session = None     # 初めて取得するときに作る（requests と Pillow は本棚の表示だけなら読み込まない）
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cover_cache")
+_lock = threading.Lock()
+_ready = set()      # 縮小版が揃っているキー
+_pending = set()    # 取得中のキー
+_failed = {}        # キー -> 失敗した時刻
+
+
+def _key(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+
+
+def _path(key, size):
+    return os.path.join(COVER_DIR, f"{key}_{size}.webp")
+
+
+def _is_ready(key):
+    if key in _ready:
+        return True
+    if all(os.path.exists(_path(key, size)) for size in SIZES):
+        _ready.add(key)
+        return True
+    return False
+
+
+def _http():
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            _session = requests.Session()
+    return _session
+
+
+def _fetch(url, key):
+    try:
+        from PIL import Image
+
+        res = _http().get(url.replace("http://", "https://"), timeout=10)
+        res.raise_for_status()
+        img = Image.open(io.BytesIO(res.content)).convert("RGB")
+        os.makedirs(COVER_DIR, exist_ok=True)
+        for size, box in SIZES.items():
+            variant = img.copy()
+            variant.thumbnail(box)
+            tmp = _path(key, size) + ".tmp"
+            variant.save(tmp, "WEBP", quality=80)
+            os.replace(tmp, _path(key, size))
+        with _lock:
+            _ready.add(key)
+    except Exception:
+        with _lock:
+            _failed[key] = time.time()
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def prefetch(url):
+    """未取得なら裏で取得を始める（すでに取得済み・取得中なら何もしない）"""
+    if not url:
+        return
+    key = _key(url)
+    with _lock:
+        if key in _pending or _is_ready(key):
+            return
+        if time.time() - _failed.get(key, 0) < RETRY_AFTER:
+            return
+        _pending.add(key)
+    _executor.submit(_fetch, url, key)
+
+
+def cover_url(url, size="grid"):
+    """<img> に使うURL。キャッシュ済みならローカル配信、未取得の間は元のURLを返す"""
+    if not url:
+        return PLACEHOLDER_URL
+    key = _key(url)
+    if _is_ready(key):
+        return f"{STATIC_URL}/covers/{key}_{size}.webp"
+    prefetch(url)
+    return url
+
+
+def cover_path(url, size="detail"):
+    """st.image に渡すファイルパス（未取得なら元のURL、画像なしならプレースホルダー）"""
+    if not url:
+        return PLACEHOLDER_PATH
+    key = _key(url)
+    if _is_ready(key):
+        return _path(key, size)
+    prefetch(url)
+    return url
+
+
+def cached_path(url, size):
+    """取得済みの縮小版のファイルパス（未取得・画像なしなら None。取得は始めない）"""
+    if not url:
+        return None
+    key = _key(url)
+    return _path(key, size) if _is_ready(key) else None
@@ -0,0 +1,126 @@
+"""ライブラリごとの本の表と派生データ（検索インデックスなど）をプロセス内で共有する
+
+どのセッションから開いても、1つのライブラリにつき表は1つだけ持つ（st.cache_data のように
+呼び出しごとに複製しない）。合計がメモリの目安を超えたら、最近開かれていないライブラリから捨て、
+次に開かれたときにローカルミラーから読み直す。
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MEMORY_BUDGET_MB = int(os.environ.get("READING_LOG_MEMORY_MB", "512"))
+
+
+def approx_size(obj, _seen=None):
+    """オブジェクトがおおよそ使っているメモリ（バイト）"""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, seen) + approx_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(v, seen) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        size += approx_size(vars(obj), seen)
+    return size
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None       # 読み込んだときの mirror.version
+        self.df = None
+        self.data_version = None
+        self.derived = {}         # 種類 -> data_version から作ったもの
+        self.previous = {}        # 種類 -> 1つ前の data_version から作ったもの（更新して使えるもの）
+        self.sizes = {}           # "books" / 種類 / "previous:種類" -> バイト数
+
+    @property
+    def nbytes(self):
+        return sum(self.sizes.values())
+
+
+class DataLayer:
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB):
+        self.budget = budget_mb * 2**20
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # ライブラリ名 -> _Entry（最近開かれたものが後ろ）
+        self.loads = 0
+        self.evictions = 0
+
+    def books(self, name, mirror, load):
+        """(本の表, data_version) を返す。mirror.version が変わっていれば load(mirror) で読み直す
+
+        同じライブラリを複数のセッションが同時に開いても、読み込みは1回だけ行う。
+        """
+        entry = self._entry(name)
+        with entry.lock:
+            version = mirror.version
+            if entry.version != version:
+                df, data_version = load(mirror)
+                if data_version != entry.data_version:
+                    # 更新に使うまで残す前のものも、メモリの上限の計算に含める
+                    entry.previous = entry.derived
+                    entry.derived = {}
+                    entry.sizes = {f"previous:{kind}": entry.sizes[kind] for kind in entry.previous if kind in entry.sizes}
+                entry.version, entry.df, entry.data_version = version, df, data_version
+                entry.sizes["books"] = approx_size(df)
+                self.loads += 1
+            df, data_version = entry.df, entry.data_version
+        self._evict()
+        return df, data_version
+
+    def derived(self, name, data_version, kind, build, update=None):
+        """本の表から作るもの（build()）を、ライブラリ・data_version・種類ごとに1つだけ作る
+
+        update を渡すと、1つ前の data_version のものがあれば作り直さずに update(前のもの) を使う。
+        """
+        entry = self._entry(name)
+        with entry.lock:
+            if entry.data_version != data_version:
+                # 読み込みより古い表からの呼び出し（共有はしない）
+                return build()
+            if kind not in entry.derived:
+                previous = entry.previous.pop(kind, None)
+                entry.sizes.pop(f"previous:{kind}", None)
+                entry.derived[kind] = update(previous) if update and previous is not None else build()
+                entry.sizes[kind] = approx_size(entry.derived[kind])
+            value = entry.derived[kind]
+        self._evict()
+        return value
+
+    def stats(self):
+        """[(ライブラリ名, バイト数, 冊数)]（最近開かれた順）と合計・上限"""
+        with self.lock:
+            items = [(name, e.nbytes, 0 if e.df is None else len(e.df)) for name, e in reversed(self.entries.items())]
+        return {"libraries": items, "total": sum(i[1] for i in items), "budget": self.budget,
+                "loads": self.loads, "evictions": self.evictions}
+
+    def _entry(self, name):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                entry = self.entries[name] = _Entry()
+            self.entries.move_to_end(name)
+            return entry
+
+    def _evict(self):
+        # 直近に開かれた1つは、上限を超えていても残す
+        with self.lock:
+            total = sum(e.nbytes for e in self.entries.values())
+            while total > self.budget and len(self.entries) > 1:
+                _, entry = self.entries.popitem(last=False)
+                total -= entry.nbytes
+                self.evictions += 1
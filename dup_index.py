@@ -0,0 +1,66 @@
+"""登録済みの本の重複チェック用インデックス
+
+正規化したタイトル（+著者）と ISBN/ASIN をキーにした辞書なので、1冊の確認は一定時間で済む。
+"""
+import re
+
+from books_api import UNKNOWN_AUTHOR
+from search_index import normalize_text
+
+_PUNCT = re.compile(r"[\W_]+")
+
+
+def title_key(title):
+    """表記ゆれ（全角/半角・カタカナ/ひらがな・記号や空白）を除いたタイトル"""
+    return _PUNCT.sub("", normalize_text(title))
+
+
+def author_key(author):
+    author = str(author or "")
+    return "" if author == UNKNOWN_AUTHOR else _PUNCT.sub("", normalize_text(author))
+
+
+def normalize_isbn(value):
+    """ISBN-10 は ISBN-13 に揃える（ASIN などはそのまま大文字に）"""
+    code = re.sub(r"[^0-9A-Za-z]", "", str(value or "")).upper()
+    if len(code) == 10 and code[:9].isdigit():
+        body = "978" + code[:9]
+        check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body)) % 10) % 10
+        return body + str(check)
+    return code
+
+
+class DuplicateIndex:
+    """本の表から作り、タイトル・著者・ISBN が一致する登録済みの本を探す"""
+
+    def __init__(self, df=None):
+        self.by_title = {}  # タイトル -> [(著者, 本)]
+        self.by_isbn = {}   # ISBN -> 本
+        if df is not None and not df.empty:
+            isbns = df["ISBN"].fillna("") if "ISBN" in df.columns else [""] * len(df)
+            for row_id, title, author, end, isbn in zip(df["ID"], df["タイトル"], df["著者"], df["読了日"], isbns):
+                self.add({"ID": row_id, "タイトル": title, "著者": author, "読了日": end, "ISBN": isbn})
+
+    def add(self, rec):
+        book = {k: rec.get(k, "") for k in ("ID", "タイトル", "著者", "読了日")}
+        key = title_key(rec.get("タイトル", ""))
+        if key:
+            self.by_title.setdefault(key, []).append((author_key(rec.get("著者")), book))
+        isbn = normalize_isbn(rec.get("ISBN"))
+        if isbn:
+            self.by_isbn.setdefault(isbn, book)
+
+    def find(self, title, author="", isbn=""):
+        """一致する登録済みの本（ID・タイトル・著者・読了日）を返す（なければ None）
+
+        ISBN が一致するか、タイトルが一致して著者も一致する（どちらかの著者が不明なら
+        タイトルだけで判断する）ものを重複とみなす。
+        """
+        isbn = normalize_isbn(isbn)
+        if isbn and isbn in self.by_isbn:
+            return self.by_isbn[isbn]
+        author = author_key(author)
+        for other, book in self.by_title.get(title_key(title), ()):
+            if not author or not other or author == other:
+                return book
+        return None
@@ -0,0 +1,155 @@
+"""登録済みの本の表紙・著者を Google Books で補完するバックグラウンドジョブ
+
+表紙か著者が欠けている行を探し、スレッド数を抑えて問い合わせる（毎秒の回数と、失敗したときの
+再試行は api_gateway.BOOKS が行う）。見つかった分は最後にまとめて1回でミラーに反映し、シートへは同期キューから送る。
+問い合わせの結果は行ごとに SQLite に残すので、途中で再起動しても済んだ分は問い合わせ直さない。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import books_api
+import local_mirror
+from bulk_import import ENRICH_WORKERS, fill_from_hit, lookup_query, needs_enrichment
+from sheet_store import ID_COLUMN, row_fingerprint
+
+# status: found（見つかった・未反映）/ applied（反映済み）/ miss（候補なし）/ error（失敗が続いた）
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lookups (
+    id TEXT, query TEXT, status TEXT, hit TEXT, tries INTEGER DEFAULT 0, at REAL,
+    PRIMARY KEY (id, query)
+);
+"""
+
+
+class EnrichJob:
+    def __init__(self, mirror, path=None):
+        self.mirror = mirror
+        self.path = path or os.path.join(local_mirror.CACHE_DIR, f"enrich_{mirror.worksheet}.sqlite3")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.progress = {"total": 0, "done": 0, "found": 0, "failed": 0, "applied": 0, "stale": 0}
+        self.last_error = None
+        self.finished_at = None
+
+    # --- 操作 ---
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"enrich-{self.mirror.worksheet}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """問い合わせ中の分が終わったら止める（見つかった分はそこまでで反映する）"""
+        self._stop.set()
+
+    def status(self):
+        with self.lock:
+            return {**self.progress, "running": self.running(), "last_error": self.last_error, "finished_at": self.finished_at}
+
+    # --- 対象の選定 ---
+    def targets(self):
+        """(行, 検索文字列) のうち、まだ問い合わせが済んでいないもの"""
+        df = self.mirror.read()
+        if df.empty:
+            return []
+        with self.lock:
+            done = set(self.db.execute("SELECT id, query FROM lookups WHERE status IN ('found', 'applied', 'miss')"))
+        out = []
+        for rec in df.fillna("").to_dict("records"):
+            if not rec.get(ID_COLUMN) or not rec["タイトル"] or not needs_enrichment(rec):
+                continue
+            query = lookup_query(rec)
+            if (rec[ID_COLUMN], query) not in done:
+                out.append((rec, query))
+        return out
+
+    # --- 内部処理 ---
+    def _run(self):
+        try:
+            targets = self.targets()
+            with self.lock:
+                self.progress = {"total": len(targets), "done": 0, "found": 0, "failed": 0, "applied": 0, "stale": 0}
+                self.last_error = None
+                self.finished_at = None
+            with ThreadPoolExecutor(max_workers=ENRICH_WORKERS, thread_name_prefix="enrich") as ex:
+                futures = [ex.submit(self._lookup, rec[ID_COLUMN], query) for rec, query in targets]
+                for fut in as_completed(futures):
+                    status = fut.result()
+                    if status is None:
+                        continue
+                    with self.lock:
+                        self.progress["done"] += 1
+                        if status == "found":
+                            self.progress["found"] += 1
+                        elif status == "error":
+                            self.progress["failed"] += 1
+            self._apply()
+        except Exception as e:
+            with self.lock:
+                self.last_error = f"{type(e).__name__}: {e}"
+        finally:
+            with self.lock:
+                self.finished_at = time.time()
+
+    def _lookup(self, row_id, query):
+        """1行分を問い合わせて結果を保存し、status を返す（停止済みなら None）"""
+        if self._stop.is_set():
+            return None
+        results, errors = books_api.search(query)
+        if results or not errors:
+            status = "found" if results else "miss"
+            self._save(row_id, query, status, results[0] if results else None)
+            return status
+        # 再試行しても失敗した行（次回の開始時にもう一度試す）
+        with self.lock:
+            self.last_error = f"{errors[0][0]}: {errors[0][1]}"
+        self._save(row_id, query, "error", None)
+        return "error"
+
+    def _save(self, row_id, query, status, hit):
+        with self.lock, self.db:
+            # tries は問い合わせたジョブの回数（失敗した行は開始のたびに1つ増える）
+            self.db.execute("INSERT INTO lookups (id, query, status, hit, tries, at) VALUES (?, ?, ?, ?, 1, ?) "
+                            "ON CONFLICT (id, query) DO UPDATE SET status = excluded.status, hit = excluded.hit, "
+                            "tries = tries + 1, at = excluded.at",
+                            (row_id, query, status, json.dumps(hit, ensure_ascii=False) if hit else None, time.time()))
+
+    def _apply(self):
+        """見つかった分（前回までの未反映分も含む）を1回の更新でミラーに反映する"""
+        with self.lock:
+            found = self.db.execute("SELECT id, query, hit FROM lookups WHERE status = 'found'").fetchall()
+        if not found:
+            return
+        df = self.mirror.read()
+        columns = [c for c in self.mirror.header if c]
+        current = {rec[ID_COLUMN]: rec for rec in df.fillna("").to_dict("records")}
+        items, applied = [], []
+        for row_id, query, hit in found:
+            rec = current.get(row_id)
+            # 問い合わせの後に消された・書き換えられた行はそのまま済みにする
+            if rec is None or lookup_query(rec) != query or not needs_enrichment(rec):
+                applied.append((row_id, query))
+                continue
+            expected = row_fingerprint(rec, columns)
+            changes = fill_from_hit(dict(rec), json.loads(hit))
+            if changes:
+                items.append((row_id, changes, expected))
+            applied.append((row_id, query))
+        stale = set(self.mirror.patch_many(items)) if items else set()
+        with self.lock, self.db:
+            self.db.executemany("UPDATE lookups SET status = 'applied' WHERE id = ? AND query = ?",
+                                [(row_id, query) for row_id, query in applied if row_id not in stale])
+            self.progress["applied"] = len(items) - len(stale)
+            self.progress["stale"] = len(stale)
@@ -0,0 +1,66 @@
+"""1つのサーバーで扱う本棚（ライブラリ）の設定
+
+secrets.toml の [libraries.<名前>] で定義する（なければ従来どおり Sheet1 の1冊棚だけ）:
+
+    [libraries.alice]
+    title = "Alice の読書記録"
+    worksheet = "Alice"          # 同じスプレッドシートの別シート
+    connection = "gsheets"       # 別のスプレッドシートなら [connections.<名前>] を用意して指定
+    password = "..."
+
+    [libraries.bob]
+    local = true                 # シートを使わず、サーバー内（.cache）だけに保存する
+    password = "..."
+
+表示するライブラリは URL の ?lib=<名前> で選ぶ。ログインしたパスワードのライブラリにも切り替わる。
+"""
+from sheet_store import ID_COLUMN, ISBN_COLUMN
+
+DEFAULT_LIBRARY = "default"
+DEFAULT_PASSWORD = "251225"  # secrets に libraries がないときの管理パスワード（従来のもの）
+DEFAULT_TITLE = "読書記録"
+# シートを使わないライブラリの列見出し
+LOCAL_HEADER = ["タイトル", "著者", "評価", "カテゴリ", "言語", "ステータス", "コメント", "開始日", "読了日", "画像URL", ISBN_COLUMN, ID_COLUMN]
+
+
+def load_libraries(secrets):
+    """{名前: 設定} を定義順に返す（設定は name / title / worksheet / connection / password / local）"""
+    try:
+        conf = dict(secrets.get("libraries", {}))
+    except Exception:
+        # secrets.toml がない環境
+        conf = {}
+    libraries = {}
+    for name, c in conf.items():
+        local = bool(c.get("local", False))
+        libraries[name] = {
+            "name": name,
+            "title": c.get("title", DEFAULT_TITLE),
+            "worksheet": None if local else c.get("worksheet", "Sheet1"),
+            "connection": c.get("connection", "gsheets"),
+            "password": str(c.get("password", "")),
+            "local": local,
+        }
+    if not libraries:
+        libraries[DEFAULT_LIBRARY] = {
+            "name": DEFAULT_LIBRARY, "title": DEFAULT_TITLE, "worksheet": "Sheet1",
+            "connection": "gsheets", "password": DEFAULT_PASSWORD, "local": False,
+        }
+    return libraries
+
+
+def storage_name(library):
+    """ローカルミラー・キャッシュのファイル名に使う名前（既定の接続のシートはワークシート名のまま）"""
+    if library["local"]:
+        return f"local_{library['name']}"
+    if library["connection"] != "gsheets":
+        return f"{library['connection']}_{library['worksheet']}"
+    return library["worksheet"]
+
+
+def find_by_password(libraries, password):
+    """パスワードが一致するライブラリの名前（なければ None）"""
+    for name, library in libraries.items():
+        if library["password"] and password == library["password"]:
+            return name
+    return None
@@ -0,0 +1,541 @@
+"""シートのローカルミラー（SQLite）と、書き込みの後追い同期キュー
+
+読み込みは常にローカルの SQLite から行い、ネットワークを待たない。
+登録・更新・削除もまずローカルに反映して outbox に積み、バックグラウンドの
+同期スレッドがまとめて Sheet1 に送る（失敗時は間隔を空けて再試行）。
+シート側の変更は一定間隔、または sync_now() で取り込む。
+
+行ごとの変更（前後の内容）は history に残し、一定間隔で Parquet のスナップショットを書く。
+起動時は最新のスナップショットから読み、rollback_to() で過去の時点の内容に戻せる。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import snapshots
+from sheet_store import ID_COLUMN, RowMissingError, StaleRowError, new_row_id, row_fingerprint
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+PULL_INTERVAL = 60      # シートから取り込む間隔（秒）
+PUSH_BATCH = 1000       # 1回の送信でまとめる操作数
+MAX_BACKOFF = 300       # 再試行間隔の上限（秒）
+SNAPSHOT_INTERVAL = 600 # 変更があったときにスナップショットを書く間隔（秒）
+HISTORY_DAYS = 30       # 変更履歴を残す日数
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (id TEXT PRIMARY KEY, pos REAL, data TEXT, remote_fp TEXT);
+CREATE TABLE IF NOT EXISTS outbox (seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT, id TEXT, data TEXT, expected TEXT);
+CREATE TABLE IF NOT EXISTS conflicts (seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT, id TEXT, data TEXT, at REAL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS history (seq INTEGER PRIMARY KEY AUTOINCREMENT, at REAL, source TEXT, id TEXT, before TEXT, after TEXT);
+CREATE INDEX IF NOT EXISTS history_at ON history (at);
+"""
+
+
+class LocalMirror:
+    def __init__(self, worksheet="Sheet1", path=None):
+        self.worksheet = worksheet
+        self.path = path or os.path.join(CACHE_DIR, f"mirror_{worksheet}.sqlite3")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.lock = threading.RLock()
+        self.store = None
+        self.header = json.loads(self._meta("header") or "[]")
+        self.last_pull = float(self._meta("last_pull") or 0)
+        self.last_error = None
+        # 取り込んだシートにローカルの行が1つもなく、どちらに合わせるか選ぶのを待っている
+        self.remote_empty = False
+        self.snapshot_dir = os.path.join(os.path.dirname(self.path), "snapshots", worksheet)
+        # 書き込み・取り込みのたびに増やす（初期値は再起動をまたいで重複しないよう時刻から）
+        self.version = time.time_ns()
+        # 内容が変わるたびに増やす通し番号（保存され、スナップショットが最新かの判定に使う）
+        self.rev = int(self._meta("rev") or 0)
+        self._wake = threading.Event()
+        self._pulled = threading.Condition()
+        self._pull_requested = False
+        self._backoff = 0
+        self._thread = None
+        self._sync_lock = threading.Lock()  # 送信・取り込みは同時に1つだけ
+        self._inflight = set()  # 送信中の outbox の seq（まとめの対象にしない）
+        if not self.header:
+            self._seed_from_snapshot()
+
+    # --- 準備 ---
+    def attach(self, store):
+        """SheetStore を接続し、同期スレッドを開始する"""
+        self.store = store
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        """同期スレッドを開始する（シートなしでも、スナップショットは書く）"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"mirror-{self.worksheet}", daemon=True)
+            self._thread.start()
+
+    def init_header(self, header):
+        """シートを使わないとき、列見出しを設定する（既にあれば、足りない列だけを右端に足す）"""
+        with self.lock, self.db:
+            missing = [c for c in header if c not in self.header]
+            if missing:
+                self.header = self.header + missing
+                self._set_meta("header", json.dumps(self.header, ensure_ascii=False))
+                self._changed()
+
+    def has_data(self):
+        return bool(self.header)
+
+    def refresh(self):
+        """別のプロセス（アプリ）が書き込んだ列見出しと rev を読み直し、rev を返す"""
+        with self.lock:
+            self.header = json.loads(self._meta("header") or "[]")
+            rev = int(self._meta("rev") or 0)
+            if rev != self.rev:
+                self.rev = rev
+                self.version += 1
+            return self.rev
+
+    def pull_blocking(self):
+        """ローカルにまだ何もないとき（初回起動）だけ使う同期的な取り込み"""
+        with self._sync_lock:
+            self._pull()
+
+    # --- 読み込み（ローカルのみ） ---
+    def read(self):
+        if not self.header:
+            return pd.DataFrame()
+        columns = [c for c in self.header if c]
+        df = self._read_snapshot(columns)
+        if df is None:
+            with self.lock:
+                rows = self.db.execute("SELECT data FROM books ORDER BY pos").fetchall()
+            records = [json.loads(r[0]) for r in rows]
+            df = pd.DataFrame.from_records(records, columns=columns) if records else pd.DataFrame(columns=columns)
+        # 空セルは従来の conn.read() と同じく NaN として扱う
+        return df.replace("", np.nan)
+
+    def status(self):
+        with self.lock:
+            pending = self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+            conflicts = self.db.execute("SELECT COUNT(*) FROM conflicts").fetchone()[0]
+        return {"pending": pending, "conflicts": conflicts, "last_pull": self.last_pull, "last_error": self.last_error,
+                "remote_empty": self.remote_empty}
+
+    # --- 書き込み（ローカルに反映してキューに積む） ---
+    def append(self, record):
+        return self.append_many([record])[0]
+
+    def append_many(self, records):
+        """複数行を1回のトランザクションで追記し、IDのリストを返す"""
+        columns = [c for c in self.header if c]
+        records = [{c: _text(r.get(c, "")) for c in columns} for r in records]
+        with self.lock, self.db:
+            pos = self.db.execute("SELECT COALESCE(MAX(pos), 0) + 1 FROM books").fetchone()[0]
+            now = time.time()
+            for i, record in enumerate(records):
+                record[ID_COLUMN] = record.get(ID_COLUMN) or new_row_id()
+                encoded = json.dumps(record, ensure_ascii=False)
+                self.db.execute("INSERT INTO books (id, pos, data, remote_fp) VALUES (?, ?, ?, NULL)",
+                                (record[ID_COLUMN], pos + i, encoded))
+                self._enqueue("append", record[ID_COLUMN], record, None)
+                self._log(now, "local", record[ID_COLUMN], None, encoded)
+            self._changed()
+        self._wake.set()
+        return [r[ID_COLUMN] for r in records]
+
+    def patch(self, row_id, changes, expected=None):
+        with self.lock, self.db:
+            data, remote_fp = self._local_row(row_id, expected)
+            self._update(time.time(), "local", row_id, data, changes, remote_fp)
+            self._changed()
+        self._wake.set()
+
+    def patch_many(self, items):
+        """(ID, changes, expected) のリストを1回のトランザクションで反映し、競合したIDのリストを返す"""
+        stale = []
+        with self.lock, self.db:
+            now = time.time()
+            for row_id, changes, expected in items:
+                try:
+                    data, remote_fp = self._local_row(row_id, expected)
+                except StaleRowError:
+                    stale.append(row_id)
+                    continue
+                self._update(now, "local", row_id, data, changes, remote_fp)
+            self._changed()
+        self._wake.set()
+        return stale
+
+    def delete(self, row_id, expected=None):
+        with self.lock, self.db:
+            data, remote_fp = self._local_row(row_id, expected)
+            self.db.execute("DELETE FROM books WHERE id = ?", (row_id,))
+            self._enqueue("delete", row_id, None, remote_fp)
+            self._log(time.time(), "local", row_id, json.dumps(data, ensure_ascii=False), None)
+            self._changed()
+        self._wake.set()
+
+    def sync_now(self, wait=0):
+        """すぐに送信・取り込みを行う（wait 秒まで取り込みの完了を待つ）"""
+        if self.store is None:
+            # シートを使わない本棚（と接続前）には送信・取り込みがないので待たない
+            return
+        requested = time.time()
+        with self._pulled:
+            self._pull_requested = True
+            self._backoff = 0
+            self._wake.set()
+            if wait:
+                self._pulled.wait_for(lambda: self.last_pull > requested, timeout=wait)
+
+    def clear_conflicts(self):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM conflicts")
+
+    def resolve_empty_remote(self, use_local):
+        """シートにローカルの行が1つもなかったとき、選んだ方に合わせる
+
+        use_local ならローカルの全行をシートに追記し直し、そうでなければシートに合わせて
+        ローカルの行を消す（変更履歴に残るので rollback_to で戻せる）。
+        """
+        with self._sync_lock:
+            if use_local:
+                self.store.ensure_header(self.header)
+                with self.lock, self.db:
+                    # シートにない行への更新・削除は送れないので、追記にまとめ直す
+                    self.db.execute("DELETE FROM outbox WHERE op != 'append'")
+                    queued = {r[0] for r in self.db.execute("SELECT id FROM outbox")}
+                    for row_id, data in self.db.execute("SELECT id, data FROM books ORDER BY pos").fetchall():
+                        if row_id not in queued:
+                            self._enqueue("append", row_id, json.loads(data), None)
+                    self.remote_empty = False
+            else:
+                self._pull(keep_local=False)
+        self._wake.set()
+
+    # --- スナップショットと変更履歴 ---
+    def snapshot(self, force=False):
+        """前回のスナップショットから変わっていれば書き出す（force でなければ SNAPSHOT_INTERVAL ごと）"""
+        with self.lock:
+            if not self.header:
+                return None
+            existing = snapshots.list_snapshots(self.snapshot_dir)
+            if existing and snapshots.read_meta(existing[-1][1])["rev"] == self.rev:
+                return None
+            if existing and not force and time.time() - existing[-1][0] < SNAPSHOT_INTERVAL:
+                return None
+            rows = self.db.execute("SELECT data FROM books ORDER BY pos").fetchall()
+            header, rev = list(self.header), self.rev
+            # 古い変更履歴を消す（それより前の時点にはスナップショットからしか戻せない）
+            cutoff = time.time() - HISTORY_DAYS * 86400
+            with self.db:
+                if self.db.execute("DELETE FROM history WHERE at < ?", (cutoff,)).rowcount:
+                    self._set_meta("history_from", str(cutoff))
+        return snapshots.write_snapshot(self.snapshot_dir, header, [json.loads(r[0]) for r in rows], rev)
+
+    def snapshots(self):
+        """(作成時刻, パス) のリスト（古い順）"""
+        return snapshots.list_snapshots(self.snapshot_dir)
+
+    def history(self, limit=100):
+        """新しい順の変更履歴（seq, at, source, id, op, title）"""
+        with self.lock:
+            rows = self.db.execute("SELECT seq, at, source, id, before, after FROM history ORDER BY seq DESC LIMIT ?", (limit,)).fetchall()
+        out = []
+        for seq, at, source, row_id, before, after in rows:
+            op = "append" if before is None else "delete" if after is None else "patch"
+            out.append({"seq": seq, "at": at, "source": source, "id": row_id, "op": op,
+                        "title": json.loads(after or before).get("タイトル", "")})
+        return out
+
+    def rollback_preview(self, ts):
+        """rollback_to(ts) で変わる行数 {"added", "changed", "removed"}"""
+        with self.lock:
+            added, changed, removed = self._diff(self._state_at(ts))
+        return {"added": len(added), "changed": len(changed), "removed": len(removed)}
+
+    def rollback_to(self, ts):
+        """時刻 ts の時点の内容に戻し、シートへの送信をキューに積む（戻す操作も履歴に残る）"""
+        with self.lock, self.db:
+            added, changed, removed = self._diff(self._state_at(ts))
+            now = time.time()
+            for row_id, before in removed:
+                self.db.execute("DELETE FROM books WHERE id = ?", (row_id,))
+                self._enqueue("delete", row_id, None, None)
+                self._log(now, "rollback", row_id, before, None)
+            pos = self.db.execute("SELECT COALESCE(MAX(pos), 0) + 1 FROM books").fetchone()[0]
+            for i, (row_id, after) in enumerate(added):
+                self.db.execute("INSERT INTO books (id, pos, data, remote_fp) VALUES (?, ?, ?, NULL)", (row_id, pos + i, after))
+                self._enqueue("append", row_id, json.loads(after), None)
+                self._log(now, "rollback", row_id, None, after)
+            for row_id, before, after in changed:
+                # シート側の現在の内容に関係なく上書きする
+                self._update(now, "rollback", row_id, json.loads(before), json.loads(after), None)
+            if added or changed or removed:
+                self._changed()
+        self._wake.set()
+        return {"added": len(added), "changed": len(changed), "removed": len(removed)}
+
+    # --- 内部処理 ---
+    def _meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _changed(self):
+        self.version += 1
+        self.rev += 1
+        self._set_meta("rev", str(self.rev))
+
+    def _log(self, at, source, row_id, before, after):
+        self.db.execute("INSERT INTO history (at, source, id, before, after) VALUES (?, ?, ?, ?, ?)",
+                        (at, source, row_id, before, after))
+
+    def _update(self, at, source, row_id, data, changes, remote_fp):
+        before = json.dumps(data, ensure_ascii=False)
+        # 列を足す前に書いた行には、足した列のキーがない
+        changes = {k: _text(v) for k, v in changes.items() if (k in data or k in self.header) and k != ID_COLUMN}
+        data.update(changes)
+        after = json.dumps(data, ensure_ascii=False)
+        self.db.execute("UPDATE books SET data = ? WHERE id = ?", (after, row_id))
+        self._enqueue("patch", row_id, changes, remote_fp)
+        self._log(at, source, row_id, before, after)
+
+    def _read_snapshot(self, columns):
+        # ローカルの内容と同じ rev のスナップショットがあれば、JSON を解かずにそれを読む
+        with self.lock:
+            rev = self.rev
+        existing = snapshots.list_snapshots(self.snapshot_dir)
+        if not existing:
+            return None
+        try:
+            info, table = snapshots.read_table(existing[-1][1])
+        except Exception:
+            return None
+        if info["rev"] != rev or table.column_names != columns:
+            return None
+        return table.to_pandas()
+
+    def _seed_from_snapshot(self):
+        # ミラーが空（初回・消えた場合）でもスナップショットがあれば、シートを待たずにそこから始める
+        existing = snapshots.list_snapshots(self.snapshot_dir)
+        if not existing:
+            return
+        try:
+            info, table = snapshots.read_table(existing[-1][1])
+        except Exception:
+            return
+        with self.lock, self.db:
+            for pos, record in enumerate(table.to_pylist()):
+                self.db.execute("INSERT OR REPLACE INTO books (id, pos, data, remote_fp) VALUES (?, ?, ?, NULL)",
+                                (record[ID_COLUMN], pos, json.dumps(record, ensure_ascii=False)))
+            self.header = info["header"]
+            self._set_meta("header", json.dumps(self.header, ensure_ascii=False))
+            self.rev = info["rev"]
+            self._set_meta("rev", str(self.rev))
+
+    def _state_at(self, ts):
+        """時刻 ts の時点の {ID: data（JSON）}（表示順）"""
+        if ts < float(self._meta("history_from") or 0):
+            # 履歴が残っていない時点は、それ以前で最新のスナップショットから
+            earlier = [path for at, path in snapshots.list_snapshots(self.snapshot_dir) if at <= ts]
+            if not earlier:
+                raise ValueError("その時点のデータは残っていません")
+            _, table = snapshots.read_table(earlier[-1])
+            return {r[ID_COLUMN]: json.dumps(r, ensure_ascii=False) for r in table.to_pylist()}
+        # 現在の内容から、ts より後の変更を新しい順に取り消す
+        state = dict(self.db.execute("SELECT id, data FROM books ORDER BY pos").fetchall())
+        for row_id, before in self.db.execute("SELECT id, before FROM history WHERE at > ? ORDER BY seq DESC", (ts,)):
+            if before is None:
+                state.pop(row_id, None)
+            else:
+                state[row_id] = before
+        return state
+
+    def _diff(self, target):
+        """現在の内容を target にするための (追加, 変更, 削除)"""
+        current = dict(self.db.execute("SELECT id, data FROM books").fetchall())
+        added = [(row_id, data) for row_id, data in target.items() if row_id not in current]
+        changed = [(row_id, current[row_id], data) for row_id, data in target.items()
+                   if row_id in current and json.loads(current[row_id]) != json.loads(data)]
+        removed = [(row_id, data) for row_id, data in current.items() if row_id not in target]
+        return added, changed, removed
+
+    def _local_row(self, row_id, expected):
+        row = self.db.execute("SELECT data, remote_fp FROM books WHERE id = ?", (row_id,)).fetchone()
+        if row is None:
+            raise StaleRowError("この本は他の画面で削除されています")
+        data = json.loads(row[0])
+        if expected is not None:
+            columns = [c for c in self.header if c]
+            expected_fp = expected if isinstance(expected, str) else row_fingerprint(expected, columns)
+            if row_fingerprint(data, columns) != expected_fp:
+                raise StaleRowError("この本は他の画面で更新されています")
+        return data, row[1]
+
+    def _enqueue(self, op, row_id, data, expected):
+        # 同じ行への未送信の操作があればまとめる（送信回数と競合の誤検出を減らす）
+        pending = self.db.execute("SELECT seq, op, data FROM outbox WHERE id = ? ORDER BY seq DESC LIMIT 1", (row_id,)).fetchone()
+        if pending and pending[0] in self._inflight:
+            pending = None
+        if pending and op == "patch" and pending[1] in ("append", "patch"):
+            merged = json.loads(pending[2])
+            merged.update(data)
+            self.db.execute("UPDATE outbox SET data = ? WHERE seq = ?", (json.dumps(merged, ensure_ascii=False), pending[0]))
+            return
+        if pending and op == "delete" and pending[1] == "append":
+            self.db.execute("DELETE FROM outbox WHERE seq = ?", (pending[0],))
+            return
+        if pending and op == "delete" and pending[1] == "patch":
+            expected = self.db.execute("SELECT expected FROM outbox WHERE seq = ?", (pending[0],)).fetchone()[0]
+            self.db.execute("DELETE FROM outbox WHERE seq = ?", (pending[0],))
+        self.db.execute("INSERT INTO outbox (op, id, data, expected) VALUES (?, ?, ?, ?)",
+                        (op, row_id, json.dumps(data, ensure_ascii=False) if data is not None else None, expected))
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=self._backoff or PULL_INTERVAL)
+            self._wake.clear()
+            if self.store is not None:
+                self._sync()
+            try:
+                self.snapshot()
+            except Exception as e:
+                self.last_error = f"スナップショットの保存に失敗しました: {e}"
+
+    def _sync(self):
+        try:
+            with self._sync_lock:
+                pushed = self._push()
+                if pushed or self._pull_requested or time.time() - self.last_pull >= PULL_INTERVAL:
+                    self._pull()
+            self.last_error = None
+            self._backoff = 0
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self._backoff = min(MAX_BACKOFF, max(5, self._backoff * 2))
+        finally:
+            with self.lock:
+                self._inflight = set()
+            with self._pulled:
+                self._pulled.notify_all()
+
+    def _push(self):
+        """outbox が空になるまで操作を古い順に送信する。送信した件数を返す"""
+        done = 0
+        while True:
+            with self.lock:
+                ops = self.db.execute("SELECT seq, op, id, data, expected FROM outbox ORDER BY seq LIMIT ?", (PUSH_BATCH,)).fetchall()
+            if not ops:
+                return done
+            i = 0
+            while i < len(ops):
+                # 同じ種類の連続した操作をひとまとめにする
+                j = i
+                while j < len(ops) and ops[j][1] == ops[i][1]:
+                    j += 1
+                group = ops[i:j]
+                kind = group[0][1]
+                with self.lock:
+                    self._inflight = {o[0] for o in group}
+                stale = []
+                if kind == "append":
+                    # 追記は冪等でないので、前回の送信が失敗していても書き込まれていた行は送らない
+                    self.store.append_rows([json.loads(o[3]) for o in group], skip_existing=True)
+                elif kind == "patch":
+                    stale = self.store.patch_rows([(o[2], json.loads(o[3]), o[4]) for o in group])
+                else:
+                    for o in group:
+                        try:
+                            self.store.delete_row(o[2], expected=o[4])
+                        except RowMissingError:
+                            # 応答が返らなかった前回の送信（または他の画面）で削除済み
+                            pass
+                        except StaleRowError:
+                            stale.append(o[2])
+                self._finish(group, set(stale))
+                with self.lock:
+                    self._inflight = set()
+                done += len(group)
+                i = j
+
+    def _finish(self, group, stale):
+        with self.lock, self.db:
+            for seq, op, row_id, data, _ in group:
+                self.db.execute("DELETE FROM outbox WHERE seq = ?", (seq,))
+                if row_id in stale:
+                    # シート側が先に変わっていた操作は送らずに記録だけ残す（次の取り込みでシート側の内容に戻る）
+                    self.db.execute("INSERT INTO conflicts (op, id, data, at) VALUES (?, ?, ?, ?)", (op, row_id, data, time.time()))
+                else:
+                    # 送った後のシート上の行（ローカルにない列も含む）は次の取り込みまで分からないので、それまで競合チェックはしない
+                    self.db.execute("UPDATE books SET remote_fp = NULL WHERE id = ?", (row_id,))
+                    # 送信中に積まれた同じ行の操作は送信前の内容を前提にしているので、それとも比べない
+                    self.db.execute("UPDATE outbox SET expected = NULL WHERE id = ? AND seq > ?", (row_id, seq))
+
+    def _pull(self, keep_local=True):
+        remote = self.store.read()
+        header = list(self.store.header)
+        columns = [c for c in header if c]
+        changed = False
+        with self.lock, self.db:
+            pending_ids = {r[0] for r in self.db.execute("SELECT DISTINCT id FROM outbox")}
+            local = {r[0]: r[1] for r in self.db.execute("SELECT id, data FROM books")}
+            synced = set(local) - pending_ids
+            found = set(remote[ID_COLUMN]) if ID_COLUMN in remote.columns else set()
+            if keep_local and synced and not synced & found:
+                # 一時的なエラーや空にされたシートで、ローカルの全行を消さない（どちらに合わせるかは画面で選ぶ）
+                self.remote_empty = True
+                self.last_pull = time.time()
+                self._pull_requested = False
+                return
+            self.remote_empty = False
+            now = time.time()
+            remote_ids = set()
+            for pos, values in enumerate(remote.itertuples(index=False, name=None)):
+                data = {c: _text(v) for c, v in zip(remote.columns, values)}
+                row_id = data[ID_COLUMN]
+                remote_ids.add(row_id)
+                if row_id in pending_ids:
+                    continue
+                fp = row_fingerprint(data, columns)
+                encoded = json.dumps(data, ensure_ascii=False)
+                if local.get(row_id) != encoded:
+                    changed = True
+                    # 初回の取り込み（ローカルが空）は履歴に残さない
+                    if local:
+                        self._log(now, "sheet", row_id, local.get(row_id), encoded)
+                self.db.execute("INSERT OR REPLACE INTO books (id, pos, data, remote_fp) VALUES (?, ?, ?, ?)",
+                                (row_id, pos, encoded, fp))
+            for row_id in set(local) - remote_ids - pending_ids:
+                self.db.execute("DELETE FROM books WHERE id = ?", (row_id,))
+                self._log(now, "sheet", row_id, local[row_id], None)
+                changed = True
+            # 見出しもない空のシートに合わせたときは、ローカルの見出しを残す
+            if header and header != self.header:
+                self.header = header
+                self._set_meta("header", json.dumps(header, ensure_ascii=False))
+                changed = True
+            self.last_pull = time.time()
+            self._set_meta("last_pull", str(self.last_pull))
+            self._pull_requested = False
+            if changed:
+                self._changed()
+
+
+def _text(v):
+    if v is None:
+        return ""
+    try:
+        if pd.isna(v):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    return str(v).strip()
@@ -0,0 +1,56 @@
+"""読書統計（型付きの表に対するベクトル演算のみで集計する）"""
+import pandas as pd
+
+
+def compute_stats(df):
+    """統計ダッシュボード用の集計結果を dict で返す"""
+    done = df[df["ステータス"] == "読了"]
+    end = done["読了日_dt"].dropna()
+
+    per_month = end.dt.to_period("M").value_counts().sort_index()
+    if len(per_month):
+        # 読まなかった月も0冊として並べる
+        per_month = per_month.reindex(pd.period_range(per_month.index.min(), per_month.index.max(), freq="M"), fill_value=0)
+    per_year = end.dt.year.value_counts().sort_index()
+
+    ratings = done["評価"].value_counts().reindex(range(1, 6), fill_value=0)
+    categories = done["カテゴリ"].value_counts()
+    languages = done["言語"].value_counts()
+    categories = categories[categories > 0]
+    languages = languages[languages > 0]
+
+    days = (done["読了日_dt"] - done["開始日_dt"]).dt.days
+    days = days[days >= 0]
+
+    return {
+        "total": len(done),
+        "this_year": int((end.dt.year == pd.Timestamp.today().year).sum()),
+        "per_month": per_month,
+        "per_year": per_year,
+        "ratings": ratings,
+        "avg_rating": float(done["評価"].mean()) if done["評価"].notna().any() else None,
+        "categories": categories,
+        "languages": languages,
+        "avg_days": float(days.mean()) if len(days) else None,
+        "median_days": float(days.median()) if len(days) else None,
+        **month_streaks(per_month),
+    }
+
+
+def month_streaks(per_month):
+    """1冊以上読み終えた月が何か月続いたか（最長と、今月まで続いている分）"""
+    if per_month.empty:
+        return {"longest_streak": 0, "current_streak": 0}
+    active = per_month > 0
+    # 連続区間ごとに番号を振り、区間の長さを数える
+    run_id = (active != active.shift()).cumsum()
+    runs = active.groupby(run_id).agg(["first", "size"])
+    runs = runs[runs["first"]]
+    longest = int(runs["size"].max()) if len(runs) else 0
+
+    this_month = pd.Timestamp.today().to_period("M")
+    last = per_month.index.max()
+    current = 0
+    if active.iloc[-1] and (this_month - last).n <= 1:
+        current = int(runs["size"].iloc[-1])
+    return {"longest_streak": longest, "current_streak": current}
@@ -0,0 +1,148 @@
+"""読書期間（開始日〜読了日）のインターバルインデックス
+
+データバージョンごとに1回だけ作り、全行を走査せずに次を答える:
+  - ある日・ある期間に読んでいた本（区間木で O(log n + 件数)）
+  - ある期間に読んでいた冊数（開始日・読了日それぞれの整列済み配列の二分探索で O(log n)）
+  - 同時に読んでいた冊数の推移と、続けて読んでいた最長の期間（作成時に1回だけ求める）
+日付は 1970-01-01 からの日数（int）で扱い、期間は両端を含む。
+"""
+import numpy as np
+import pandas as pd
+
+# 期間として扱うステータス（読書中で読了日がなければ、作成した日まで読んでいるものとする）
+STATUSES = ["読了", "読書中", "断念"]
+
+
+def to_days(values):
+    """datetime64 の配列・Series を日数の int 配列にする"""
+    return np.asarray(values, dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
+
+
+def to_date(day):
+    return pd.Timestamp(np.datetime64(int(day), "D")).date()
+
+
+class _Node:
+    __slots__ = ("center", "by_start", "starts", "by_end", "ends", "left", "right")
+
+
+class ReadingTimeline:
+    """本の表から作り、読書期間の重なりを調べる（戻り値の行は元の表のインデックスのラベル）"""
+
+    def __init__(self, df, today=None):
+        today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+        if df.empty:
+            df = pd.DataFrame({"ステータス": [], "開始日_dt": pd.Series([], dtype="datetime64[ns]"),
+                               "読了日_dt": pd.Series([], dtype="datetime64[ns]")})
+        end = df["読了日_dt"].where(df["読了日_dt"].notna() | (df["ステータス"] != "読書中"), today)
+        ok = df["ステータス"].isin(STATUSES) & df["開始日_dt"].notna() & end.notna() & (df["開始日_dt"] <= end)
+        self.labels = df.index[ok.to_numpy()]
+        self.start = to_days(df.loc[ok, "開始日_dt"])
+        self.end = to_days(end[ok])
+        # 冊数を数える用（開始日・読了日をそれぞれ昇順に）
+        self.sorted_start = np.sort(self.start)
+        self.sorted_end = np.sort(self.end)
+        self.root = self._build(np.arange(len(self.start)))
+        self._sweep()
+
+    def __len__(self):
+        return len(self.start)
+
+    # --- 問い合わせ ---
+    def count(self, first, last):
+        """first〜last（日付）のどこかで読んでいた冊数"""
+        a, b = self._days(first), self._days(last)
+        # 重なる = 開始が last 以前 かつ 読了が first 以降（そうでないものは互いに重ならない）
+        return int(np.searchsorted(self.sorted_start, b, "right") - np.searchsorted(self.sorted_end, a, "left"))
+
+    def overlapping(self, first, last=None):
+        """first〜last（省略すると first の1日）に読んでいた本の、元の表のラベル（開始日順）"""
+        a = self._days(first)
+        b = a if last is None else self._days(last)
+        found = []
+        self._query(self.root, a, b, found)
+        if not found:
+            return self.labels[:0]
+        pos = np.concatenate(found)
+        return self.labels[pos[np.argsort(self.start[pos], kind="stable")]]
+
+    def monthly_counts(self):
+        """月ごとの、その月に読んでいた冊数（Series、インデックスは月初の日付）"""
+        if not len(self):
+            return pd.Series(dtype=np.int64)
+        months = pd.period_range(to_date(self.start.min()), to_date(self.end.max()), freq="M").to_timestamp()
+        first = to_days(months.values)
+        last = to_days((months + pd.offsets.MonthEnd(0)).values)
+        counts = np.searchsorted(self.sorted_start, last, "right") - np.searchsorted(self.sorted_end, first, "left")
+        return pd.Series(counts, index=months)
+
+    def summary(self):
+        """同時に読んでいた最大の冊数とその日、続けて読んでいた（1冊以上・2冊以上）最長の期間"""
+        out = {"books": len(self), "max_concurrent": 0, "max_concurrent_on": None,
+               "first_day": to_date(self.sorted_start[0]) if len(self) else None,
+               "last_day": to_date(self.sorted_end[-1]) if len(self) else None}
+        if len(self.levels):
+            i = int(np.argmax(self.levels))
+            out["max_concurrent"] = int(self.levels[i])
+            out["max_concurrent_on"] = to_date(self.points[i])
+        out["reading_streak"] = self._longest(1)
+        out["parallel_streak"] = self._longest(2)
+        return out
+
+    # --- 内部処理 ---
+    @staticmethod
+    def _days(value):
+        return int(to_days([pd.Timestamp(value).to_datetime64()])[0])
+
+    def _build(self, idx):
+        # 中心で区間を3つに分ける（中心を含むもの・すべて左・すべて右）。中心は端点の中央値なので深さは O(log n)
+        if not len(idx):
+            return None
+        s, e = self.start[idx], self.end[idx]
+        center = np.median(np.concatenate([s, e]))
+        here = (s <= center) & (e >= center)
+        node = _Node()
+        node.center = center
+        node.by_start = idx[here][np.argsort(s[here], kind="stable")]
+        node.starts = self.start[node.by_start]
+        order = np.argsort(-e[here], kind="stable")
+        node.by_end = idx[here][order]
+        node.ends = -self.end[node.by_end]  # 降順を昇順として二分探索するため符号を反転
+        node.left = self._build(idx[e < center])
+        node.right = self._build(idx[s > center])
+        return node
+
+    def _query(self, node, a, b, found):
+        while node is not None:
+            if b < node.center:
+                # ここの区間はすべて中心を含むので、開始が b 以前なら重なる
+                found.append(node.by_start[:np.searchsorted(node.starts, b, "right")])
+                node = node.left
+            elif a > node.center:
+                found.append(node.by_end[:np.searchsorted(node.ends, -a, "right")])
+                node = node.right
+            else:
+                found.append(node.by_start)
+                self._query(node.left, a, b, found)
+                node = node.right
+
+    def _sweep(self):
+        # 冊数が変わる日（開始日と読了日の翌日）ごとの、その日から読んでいた冊数
+        points = np.unique(np.concatenate([self.start, self.end + 1]))
+        self.points = points
+        self.levels = (np.searchsorted(self.sorted_start, points, "right")
+                       - np.searchsorted(self.sorted_end + 1, points, "right"))
+
+    def _longest(self, k):
+        """k 冊以上を同時に読んでいた期間のうち最長のもの（(開始日, 終了日, 日数) または None）"""
+        if len(self.points) < 2:
+            return None
+        active = self.levels[:-1] >= k
+        if not active.any():
+            return None
+        # 連続する区間をまとめ、長さを合計する
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], active.astype(np.int8), [0]])))
+        starts, stops = edges[::2], edges[1::2]
+        lengths = self.points[stops] - self.points[starts]
+        i = int(np.argmax(lengths))
+        return to_date(self.points[starts[i]]), to_date(self.points[stops[i]] - 1), int(lengths[i])
@@ -0,0 +1,96 @@
+"""キーワード検索用の n-gram 転置インデックス（日本語対応）"""
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+# 検索対象の列と、順位付けの重み
+FIELDS = {"タイトル": 3.0, "著者": 2.0, "コメント": 1.0}
+
+_KATAKANA = re.compile(r"[ァ-ヶ]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """全角/半角・大文字/小文字・カタカナ/ひらがなの違いを吸収し、空白を除く"""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    text = _KATAKANA.sub(lambda m: chr(ord(m.group(0)) - 0x60), text)
+    return _SPACES.sub("", text)
+
+
+def _grams(text):
+    # 1文字の検索語にも対応できるよう、1-gram と 2-gram を両方登録する
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class SearchIndex:
+    """タイトル・著者・コメントを横断して検索し、関連度順の行IDを返す"""
+
+    def __init__(self, df):
+        self.ids = df.index.tolist()
+        self.texts = {}
+        postings = defaultdict(list)
+        for field in FIELDS:
+            col = df[field] if field in df.columns else [""] * len(df)
+            self.texts[field] = [normalize_text(v) for v in col]
+        for pos in range(len(self.ids)):
+            grams = set()
+            for field in FIELDS:
+                grams |= _grams(self.texts[field][pos])
+            for g in grams:
+                postings[g].append(pos)
+        self.postings = {g: np.asarray(p, dtype=np.int32) for g, p in postings.items()}
+
+    def _candidates(self, term):
+        if len(term) == 1:
+            keys = [term]
+        else:
+            keys = [term[i:i + 2] for i in range(len(term) - 1)]
+        lists = []
+        for k in set(keys):
+            p = self.postings.get(k)
+            if p is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(p)
+        lists.sort(key=len)
+        cand = lists[0]
+        for p in lists[1:]:
+            cand = np.intersect1d(cand, p, assume_unique=True)
+            if not len(cand):
+                break
+        return cand
+
+    def search(self, query):
+        """空白区切りの全ての語を含む行の ID を関連度順に返す"""
+        terms = [normalize_text(t) for t in _SPACES.split(str(query).strip())]
+        terms = [t for t in terms if t]
+        if not terms:
+            return list(self.ids)
+
+        cand = None
+        for t in sorted(terms, key=len, reverse=True):
+            c = self._candidates(t)
+            cand = c if cand is None else np.intersect1d(cand, c, assume_unique=True)
+            if not len(cand):
+                return []
+
+        # n-gram の一致は候補の絞り込みなので、部分文字列として含むかを確認しつつ採点する
+        scored = []
+        for pos in cand:
+            score = 0.0
+            for t in terms:
+                term_score = 0.0
+                for field, weight in FIELDS.items():
+                    text = self.texts[field][pos]
+                    if t in text:
+                        term_score += weight * (1.5 if text.startswith(t) else 1.0)
+                if term_score == 0.0:
+                    break
+                score += term_score
+            else:
+                scored.append((-score, int(pos)))
+        scored.sort()
+        return [self.ids[pos] for _, pos in scored]
@@ -0,0 +1,290 @@
+"""Google Sheets への行単位の読み書き（追記・部分更新・削除）"""
+import hashlib
+import re
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+import api_gateway
+
+ID_COLUMN = "ID"
+ISBN_COLUMN = "ISBN"
+# 読み込み時に、なければシートの右端に追加する列
+REQUIRED_COLUMNS = [ISBN_COLUMN, ID_COLUMN]
+
+
+class StaleRowError(Exception):
+    """読み込み後に他の画面から行が変更・削除されていた場合のエラー"""
+
+
+class RowMissingError(StaleRowError):
+    """対象の行がシートにもうない場合のエラー"""
+
+
+def open_worksheet(conn, worksheet="Sheet1"):
+    """GSheetsConnection から gspread の Worksheet を取り出す"""
+    return conn.client._select_worksheet(worksheet=worksheet)
+
+
+def new_row_id():
+    return uuid.uuid4().hex[:12]
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    return str(value).strip()
+
+
+def _col_letter(n):
+    # 1 -> A, 27 -> AA
+    s = ""
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+class SheetStore:
+    """1枚のワークシートを「ID列をキーにした行の集合」として扱う
+
+    書き込みは変更のあった行だけに対して行い、シート全体の書き換えはしない。
+    更新・削除の前には対象行を読み直し、読み込み時の内容（fingerprint）と
+    一致しなければ StaleRowError を送出する。
+    """
+
+    def __init__(self, worksheet):
+        self.ws = worksheet
+        self.header = []
+        self._row_hint = {}  # ID -> シート上の行番号（1始まり、ヘッダーが1行目）
+        self._lock = threading.Lock()
+
+    # --- 読み込み ---
+    def read(self):
+        with self._lock:
+            values = self._api("get_all_values")
+            if not values:
+                return pd.DataFrame()
+            self.header = [h.strip() for h in values[0]]
+            # 空行は読み飛ばすが、書き込み先にはシート上の行番号をそのまま使う
+            numbered = [(i + 2, (r + [""] * (len(self.header) - len(r)))[:len(self.header)])
+                        for i, r in enumerate(values[1:]) if any(c.strip() for c in r)]
+            row_numbers = [n for n, _ in numbered]
+            rows = [r for _, r in numbered]
+            self._ensure_ids(rows, row_numbers)
+            self._row_hint = {r[self._id_col()]: n for n, r in zip(row_numbers, rows)}
+        df = pd.DataFrame(rows, columns=self.header)
+        df = df.loc[:, [c for c in df.columns if c]]
+        # 空セルは従来の conn.read() と同じく NaN として扱う
+        return df.replace("", np.nan)
+
+    def _id_col(self):
+        return self.header.index(ID_COLUMN)
+
+    def _ensure_ids(self, rows, row_numbers):
+        # 無い列（ISBN・ID）の見出しを足し、ID列が空欄の行にIDを振って、まとめて書き込む（row_numbers は各行のシート上の行番号）
+        updates = []
+        for name in REQUIRED_COLUMNS:
+            if name not in self.header:
+                self.header.append(name)
+                updates.append({"range": f"{_col_letter(len(self.header))}1", "values": [[name]]})
+                for r in rows:
+                    r.append("")
+        col = self._id_col() + 1
+        for row_no, r in zip(row_numbers, rows):
+            if not r[col - 1].strip():
+                r[col - 1] = new_row_id()
+                updates.append({"range": f"{_col_letter(col)}{row_no}", "values": [[r[col - 1]]]})
+        if updates:
+            self._api("batch_update", updates)
+
+    # --- 書き込み ---
+    def ensure_header(self, header):
+        """見出し行が空なら header を書き込む（空のシートにローカルの行を書き戻すとき）"""
+        with self._lock:
+            if not any(h.strip() for h in self._api("row_values", 1)):
+                self._api("batch_update", [{"range": "A1", "values": [list(header)]}])
+            self.header = []
+            self._load_header()
+
+    def append_row(self, record):
+        """1行追記して、振ったIDを返す"""
+        record = dict(record)
+        record[ID_COLUMN] = record.get(ID_COLUMN) or new_row_id()
+        with self._lock:
+            self._load_header()
+            values = self._to_values(record)
+            res = self._api("append_row", values, value_input_option="RAW", table_range="A1", idempotent=False)
+            row_no = self._updated_row(res)
+            if row_no:
+                self._row_hint[record[ID_COLUMN]] = row_no
+        return record[ID_COLUMN]
+
+    def append_rows(self, records, skip_existing=False):
+        """複数行をまとめて1回で追記し、IDのリストを返す
+
+        skip_existing なら、シートに既にある ID の行は追記しない（応答が返らずに失敗した追記を
+        送り直すとき、実際には書き込まれていた行を重複させないため）。
+        """
+        records = [dict(r) for r in records]
+        for r in records:
+            r[ID_COLUMN] = r.get(ID_COLUMN) or new_row_id()
+        if not records:
+            return []
+        with self._lock:
+            self._load_header()
+            todo = records
+            if skip_existing:
+                ids = self._api("col_values", self._id_col() + 1)
+                row_of = {v: i + 1 for i, v in enumerate(ids) if v}
+                todo = [r for r in records if r[ID_COLUMN] not in row_of]
+                self._row_hint.update({r[ID_COLUMN]: row_of[r[ID_COLUMN]] for r in records if r[ID_COLUMN] in row_of})
+            if todo:
+                res = self._api("append_rows", [self._to_values(r) for r in todo], value_input_option="RAW", table_range="A1", idempotent=False)
+                first = self._updated_row(res)
+                if first:
+                    for i, r in enumerate(todo):
+                        self._row_hint[r[ID_COLUMN]] = first + i
+        return [r[ID_COLUMN] for r in records]
+
+    def patch_rows(self, items):
+        """(ID, changes, expected) のリストをまとめて書き換え、競合したIDのリストを返す
+
+        行番号の特定・現在値の確認・書き込みをそれぞれ1回のAPI呼び出しで行う。
+        """
+        if not items:
+            return []
+        with self._lock:
+            self._load_header()
+            ids = self._api("col_values", self._id_col() + 1)
+            row_of = {v: i + 1 for i, v in enumerate(ids) if v}
+            last = _col_letter(len(self.header))
+            found = [(row_id, changes, expected) for row_id, changes, expected in items if row_id in row_of]
+            stale = [row_id for row_id, _, _ in items if row_id not in row_of]
+            ranges = [f"A{row_of[row_id]}:{last}{row_of[row_id]}" for row_id, _, _ in found]
+            current_rows = self._api("batch_get", ranges) if ranges else []
+            updates = []
+            for (row_id, changes, expected), got in zip(found, current_rows):
+                current = self._row_dict(got[0] if got else [])
+                merged = dict(current)
+                merged.update({k: v for k, v in changes.items() if k in self.header})
+                merged[ID_COLUMN] = row_id
+                if expected is not None:
+                    expected_fp = expected if isinstance(expected, str) else row_fingerprint(expected, self.header)
+                    current_fp = row_fingerprint(current, self.header)
+                    if current_fp != expected_fp:
+                        # 応答が返らなかった前回の送信で書き込み済みなら、競合ではなく書き込み不要
+                        if current_fp != row_fingerprint(merged, self.header):
+                            stale.append(row_id)
+                        continue
+                row_no = row_of[row_id]
+                self._row_hint[row_id] = row_no
+                updates.append({"range": f"A{row_no}:{last}{row_no}", "values": [self._to_values(merged)]})
+            if updates:
+                self._api("batch_update", updates, value_input_option="RAW")
+        return stale
+
+    def patch_row(self, row_id, changes, expected=None):
+        """IDで指定した行のうち changes に含まれる列だけを書き換える
+
+        expected には読み込み時の行（または row_fingerprint の値）を渡す。
+        """
+        with self._lock:
+            self._load_header()
+            row_no, current = self._locate(row_id, expected)
+            merged = dict(current)
+            merged.update({k: v for k, v in changes.items() if k in self.header})
+            merged[ID_COLUMN] = row_id
+            values = self._to_values(merged)
+            rng = f"A{row_no}:{_col_letter(len(self.header))}{row_no}"
+            self._api("batch_update", [{"range": rng, "values": [values]}], value_input_option="RAW")
+
+    def delete_row(self, row_id, expected=None):
+        """IDで指定した行を削除する"""
+        with self._lock:
+            self._load_header()
+            row_no, _ = self._locate(row_id, expected)
+            self._api("delete_rows", row_no, idempotent=False)
+            self._row_hint.pop(row_id, None)
+            for k, v in self._row_hint.items():
+                if v > row_no:
+                    self._row_hint[k] = v - 1
+
+    # --- 内部処理 ---
+    def _api(self, method, *args, idempotent=True, **kwargs):
+        # 回数制限と、429・一時的なエラーの再試行は api_gateway.SHEETS（追記・行削除は 429 のときだけ再試行）
+        fn = getattr(self.ws, method)
+        return api_gateway.SHEETS.call(lambda: fn(*args, **kwargs), idempotent=idempotent)
+
+    def _load_header(self):
+        if not self.header:
+            self.header = [h.strip() for h in self._api("row_values", 1)]
+        if ID_COLUMN not in self.header:
+            raise StaleRowError("ID列がありません。再読み込みしてください")
+
+    def _to_values(self, record):
+        return [_cell(record.get(c, "")) for c in self.header]
+
+    def _row_dict(self, values):
+        values = list(values) + [""] * (len(self.header) - len(values))
+        return dict(zip(self.header, values))
+
+    def _locate(self, row_id, expected):
+        # まず前回読み込み時の行番号を1行だけ読んで確認し、ずれていればID列から探し直す
+        row_no = self._row_hint.get(row_id)
+        current = None
+        if row_no:
+            current = self._row_dict(self._api("row_values", row_no))
+            if current.get(ID_COLUMN) != row_id:
+                current = None
+        if current is None:
+            ids = self._api("col_values", self._id_col() + 1)
+            if row_id not in ids:
+                raise RowMissingError("この本は他の画面で削除されています")
+            row_no = ids.index(row_id) + 1
+            current = self._row_dict(self._api("row_values", row_no))
+            self._row_hint[row_id] = row_no
+        if expected is not None:
+            expected_fp = expected if isinstance(expected, str) else row_fingerprint(expected, self.header)
+            if row_fingerprint(current, self.header) != expected_fp:
+                raise StaleRowError("この本は他の画面で更新されています")
+        return row_no, current
+
+    @staticmethod
+    def _updated_row(res):
+        try:
+            rng = res["updates"]["updatedRange"]
+        except (TypeError, KeyError):
+            return None
+        m = re.search(r"![A-Z]+(\d+)", rng)
+        return int(m.group(1)) if m else None
+
+
+def row_fingerprint(row, columns):
+    """行内容のハッシュ（古い行への上書き検出用）"""
+    get = row.get if hasattr(row, "get") else dict(row).get
+    joined = "\x1f".join(_cell(get(c, "")) for c in columns if c)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+def row_fingerprints(df, columns):
+    """表の全行の row_fingerprint のリスト（列ごとにまとめて文字列にするので、行ごとに求めるより速い）"""
+    joined = None
+    for c in columns:
+        if not c:
+            continue
+        if c in df.columns:
+            s = df[c].fillna("").astype(str).str.strip()
+        else:
+            s = pd.Series("", index=df.index)
+        joined = s if joined is None else joined + "\x1f" + s
+    if joined is None:
+        joined = pd.Series("", index=df.index)
+    return [hashlib.sha1(v.encode("utf-8")).hexdigest() for v in joined.tolist()]
@@ -0,0 +1,174 @@
+"""詳細ダイアログの「似ている本」用の類似度インデックス（TF-IDF・疎行列）
+
+タイトル・著者・コメントの文字 2-gram と、著者名・カテゴリ・言語を特徴量にし、行ごとの重み付き
+出現数を scipy.sparse の行列に持つ。IDF は問い合わせのときに現在の文書頻度から掛けるので、
+行の追加・変更・削除では、変わった行（行ハッシュが違うもの）だけを数え直せばよい（update()）。
+"""
+import math
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+
+from dup_index import author_key
+from search_index import normalize_text
+from sheet_store import ID_COLUMN
+
+# 文字 2-gram を取る列と重み
+TEXT_FIELDS = {"タイトル": ("t", 2.0), "著者": ("a", 1.0), "コメント": ("c", 1.0)}
+# 値そのものを1語として扱う列と重み
+TAG_FIELDS = {"カテゴリ": ("k", 1.5), "言語": ("l", 0.5)}
+AUTHOR_WEIGHT = 3.0  # 著者名の完全一致
+TOP_K = 6
+
+_AUTHOR_SEP = re.compile(r"[,、/／&]+")
+_WEIGHTS = {prefix: w for prefix, w in [*TEXT_FIELDS.values(), *TAG_FIELDS.values(), ("A", AUTHOR_WEIGHT)]}
+
+
+def features(rec):
+    """1冊分の特徴量 {語: 重み}（語は「列の記号:値」。出現数は 1 + log で抑える）"""
+    counts = Counter()
+    for field, (prefix, _) in TEXT_FIELDS.items():
+        text = normalize_text(rec.get(field) or "")
+        if len(text) > 1:
+            counts.update(f"{prefix}:{text[i:i + 2]}" for i in range(len(text) - 1))
+        elif text:
+            counts[f"{prefix}:{text}"] += 1
+    for name in _AUTHOR_SEP.split(str(rec.get("著者") or "")):
+        key = author_key(name)
+        if key:
+            counts[f"A:{key}"] = 1
+    for field, (prefix, _) in TAG_FIELDS.items():
+        value = str(rec.get(field) or "")
+        if value:
+            counts[f"{prefix}:{value}"] = 1
+    return {term: (1.0 + math.log(n)) * _WEIGHTS[term[0]] for term, n in counts.items()}
+
+
+class SimilarBooks:
+    """本の表から作り、ある本に似ている本の ID を類似度（コサイン）の高い順に返す"""
+
+    def __init__(self, df):
+        self.lock = threading.Lock()
+        self.vocab = {}                       # 語 -> 列番号
+        self.doc_freq = np.zeros(0)           # 列ごとの、その語を含む本の数
+        self.ids = []                         # 行番号 -> ID（削除した行は None）
+        self.pos = {}                         # ID -> 行番号
+        self.fps = {}                         # ID -> 行ハッシュ
+        self.rows = []                        # 行番号 -> (列番号, 重み)
+        self._csc = None                      # 問い合わせ用（変更があったら作り直す）
+        self._norms = None
+        self.last_changed = 0
+        self.update(df)
+
+    def update(self, df):
+        """新しい表に合わせて、追加・変更された行を数え直し、なくなった行を消す（self を返す）"""
+        if df.empty or ID_COLUMN not in df.columns:
+            ids, fps = [], []
+        else:
+            ids = df[ID_COLUMN].astype(str).tolist()
+            fps = df["行ハッシュ"].tolist()
+        with self.lock:
+            changed = 0
+            seen = set()
+            todo = []
+            for i, (row_id, fp) in enumerate(zip(ids, fps)):
+                if not row_id or row_id in seen:
+                    continue
+                seen.add(row_id)
+                if self.fps.get(row_id) != fp:
+                    todo.append(i)
+            if todo:
+                # 変わった行だけを取り出して数え直す
+                columns = [c for c in [*TEXT_FIELDS, *TAG_FIELDS] if c in df.columns]
+                part = df.iloc[todo][columns].astype(str)
+                for i, rec in zip(todo, part.to_dict("records")):
+                    rec["行ハッシュ"] = fps[i]
+                    self._set(ids[i], rec)
+                changed += len(todo)
+            for row_id in set(self.pos) - seen:
+                self._remove(row_id)
+                changed += 1
+            if changed:
+                self._csc = self._norms = None
+            # 削除で空いた行が多くなったら詰める
+            if len(self.ids) > 2 * len(self.pos) + 100:
+                self._compact()
+            self.last_changed = changed
+        return self
+
+    def neighbours(self, row_id, k=TOP_K):
+        """似ている本の [(ID, 類似度)]（自分自身と、共通する特徴のない本は含まない）"""
+        with self.lock:
+            p = self.pos.get(row_id)
+            if p is None:
+                return []
+            csc, norms = self._matrix()
+            cols, vals = self.rows[p]
+            if not len(cols) or not norms[p]:
+                return []
+            idf = self._idf()
+            # 問い合わせの本が持つ語の列だけを掛け合わせる（転置インデックスを引くのと同じ）
+            scores = csc[:, cols] @ (vals * idf[cols] ** 2)
+            scores = scores / np.maximum(norms * norms[p], 1e-12)
+            scores[p] = 0.0
+            k = min(k, len(scores) - 1)
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k)[:k] if k < len(scores) else np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            return [(self.ids[i], float(scores[i])) for i in top if scores[i] > 0 and self.ids[i] is not None]
+
+    # --- 内部処理 ---
+    def _set(self, row_id, rec):
+        feats = features(rec)
+        for term in feats:
+            if term not in self.vocab:
+                self.vocab[term] = len(self.vocab)
+        if len(self.vocab) > len(self.doc_freq):
+            self.doc_freq = np.concatenate([self.doc_freq, np.zeros(max(len(self.vocab) - len(self.doc_freq), 1024))])
+        cols = np.fromiter((self.vocab[t] for t in feats), dtype=np.int32, count=len(feats))
+        vals = np.fromiter(feats.values(), dtype=np.float64, count=len(feats))
+        p = self.pos.get(row_id)
+        if p is None:
+            p = self.pos[row_id] = len(self.ids)
+            self.ids.append(row_id)
+            self.rows.append((cols, vals))
+        else:
+            self.doc_freq[self.rows[p][0]] -= 1
+            self.rows[p] = (cols, vals)
+        self.doc_freq[cols] += 1
+        self.fps[row_id] = rec.get("行ハッシュ")
+
+    def _remove(self, row_id):
+        p = self.pos.pop(row_id)
+        self.fps.pop(row_id, None)
+        self.doc_freq[self.rows[p][0]] -= 1
+        self.ids[p] = None
+        self.rows[p] = (np.zeros(0, dtype=np.int32), np.zeros(0))
+
+    def _compact(self):
+        keep = [i for i, row_id in enumerate(self.ids) if row_id is not None]
+        self.ids = [self.ids[i] for i in keep]
+        self.rows = [self.rows[i] for i in keep]
+        self.pos = {row_id: i for i, row_id in enumerate(self.ids)}
+        self._csc = self._norms = None
+
+    def _idf(self):
+        n = len(self.pos)
+        return np.log((1 + n) / (1 + self.doc_freq[:len(self.vocab)])) + 1.0
+
+    def _matrix(self):
+        if self._csc is None:
+            lengths = np.fromiter((len(c) for c, _ in self.rows), dtype=np.int64, count=len(self.rows))
+            indptr = np.concatenate([[0], np.cumsum(lengths)])
+            indices = np.concatenate([c for c, _ in self.rows]) if self.rows else np.zeros(0, dtype=np.int32)
+            data = np.concatenate([v for _, v in self.rows]) if self.rows else np.zeros(0)
+            csr = sp.csr_matrix((data, indices, indptr), shape=(len(self.rows), len(self.vocab)))
+            # 各行の TF-IDF ベクトルの長さ（IDF は文書頻度が変わるたびに変わるので、ここで掛ける）
+            idf = self._idf()
+            self._norms = np.sqrt(csr.multiply(csr) @ idf ** 2)
+            self._csc = csr.tocsc()
+        return self._csc, self._norms
@@ -0,0 +1,64 @@
+"""本の表の Parquet スナップショット（zstd 圧縮・メモリマップで読み込み）
+
+ファイル名は作成時刻（ミリ秒）で、メタデータに列見出しとミラーの rev（変更の通し番号）を持つ。
+"""
+import glob
+import json
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+KEEP_SNAPSHOTS = 144  # 残すスナップショットの数（古いものから消す）
+
+
+def write_snapshot(directory, header, records, rev):
+    """records（dict のリスト、表示順）を1つのファイルに書き出し、そのパスを返す"""
+    os.makedirs(directory, exist_ok=True)
+    columns = [c for c in header if c]
+    at = time.time()
+    table = pa.table({c: pa.array([r.get(c, "") for r in records], type=pa.string()) for c in columns})
+    table = table.replace_schema_metadata({
+        "header": json.dumps(header, ensure_ascii=False),
+        "rev": str(rev),
+        "at": repr(at),
+    })
+    path = os.path.join(directory, f"{int(at * 1000)}.parquet")
+    # 書きかけのファイルを読まないよう、書き終えてから名前を付け替える
+    pq.write_table(table, path + ".tmp", compression="zstd")
+    os.replace(path + ".tmp", path)
+    for old in list_snapshots(directory)[:-KEEP_SNAPSHOTS]:
+        os.remove(old[1])
+    return path
+
+
+def list_snapshots(directory):
+    """(作成時刻, パス) のリスト（古い順）"""
+    out = []
+    for path in glob.glob(os.path.join(directory, "*.parquet")):
+        try:
+            out.append((int(os.path.basename(path).split(".")[0]) / 1000, path))
+        except ValueError:
+            continue
+    return sorted(out)
+
+
+def _info(schema):
+    meta = schema.metadata or {}
+    return {
+        "header": json.loads(meta.get(b"header", b"[]")),
+        "rev": int(meta.get(b"rev", b"0")),
+        "at": float(meta.get(b"at", b"0")),
+    }
+
+
+def read_meta(path):
+    """列見出し・rev・作成時刻（本体は読まない）"""
+    return _info(pq.read_schema(path))
+
+
+def read_table(path):
+    """スナップショットをメモリマップで読み、(メタデータ, pyarrow.Table) を返す"""
+    table = pq.read_table(pa.memory_map(path), memory_map=True)
+    return _info(table.schema), table
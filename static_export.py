@@ -0,0 +1,194 @@
+"""閲覧専用の本棚を静的サイト（HTML/CSS/JSON）として書き出す
+
+匿名の訪問者には、Streamlit のセッションを使わずにこのサイトを任意の静的ファイルサーバーで配信できる。
+グリッド・リスト表示、月ごとの見出し、詳細表示、読了年・言語・カテゴリ・キーワードでの絞り込みは
+すべてブラウザ側で行う。
+
+使い方:
+    python static_export.py                           # 既定の本棚を site/ に書き出す
+    python static_export.py --lib alice --out public/alice
+    python static_export.py --watch 60                # 60秒ごとに確認し、データが変わったら書き出す
+
+データはアプリのローカルミラー（.cache）から読む。本は読了月ごとのJSONに分け、ファイル名に内容の
+ハッシュを付けるので、変更のあった月のファイルだけを書き直す（変わらない月はブラウザ・CDNの
+キャッシュがそのまま使える）。data/index.json だけは毎回書き換わる。
+"""
+import argparse
+import datetime
+import hashlib
+import html
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+import cover_cache
+from book_table import normalize_books, rating_value, sort_books
+from libraries import load_libraries, storage_name
+from local_mirror import LocalMirror
+from sheet_store import ID_COLUMN
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DIR = os.path.join(ROOT, "static_site")
+SHELF_DIR = os.path.join(ROOT, "bookshelf_frontend")
+DEFAULT_OUT = os.path.join(ROOT, "site")
+
+
+def site_books(df):
+    """書き出す本のリスト（読了日の新しい順）と、書き出す書影の (キャッシュのパス, 書き出し先) のリスト"""
+    books, covers = [], []
+    for row in sort_books(df, "新しい順").to_dict("records"):
+        url = row["画像URL"]
+        paths = {}
+        for size in ("grid", "list", "detail"):
+            cached = cover_cache.cached_path(url, size)
+            if cached:
+                paths[size] = f"covers/{os.path.basename(cached)}"
+                covers.append((cached, paths[size]))
+            else:
+                # 未取得の書影は元のURLを使う（画像なしは空。ページ側で「No Cover」か既定の画像にする）
+                paths[size] = url.replace("http://", "https://")
+        end = row["読了日_dt"]
+        books.append({
+            "id": row[ID_COLUMN],
+            "month": row["月ラベル"],
+            "year": "" if pd.isna(end) else str(end.year),
+            "title": row["タイトル"],
+            "author": row["著者"] or "不明な著者",
+            "rating": rating_value(row["評価"]),
+            "category": str(row["カテゴリ"]),
+            "language": str(row["言語"]),
+            "status": str(row["ステータス"]),
+            "comment": row["コメント"],
+            "start": row["開始日"],
+            "end": row["読了日"],
+            "date": row["読了日"],
+            "covers": paths,
+        })
+    return books, covers
+
+
+def _write(path, data):
+    """内容が同じなら書かない（書いたら True）"""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+def export_site(df, data_version, out_dir, title="読書記録", force=False):
+    """本の表を out_dir に書き出し、{"skipped", "written", "removed", "covers", "books"} を返す
+
+    前回と data_version が同じなら何もしない（force で書き直す）。
+    """
+    data_dir = os.path.join(out_dir, "data")
+    index_path = os.path.join(data_dir, "index.json")
+    if not force and os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            if json.load(f).get("data_version") == data_version:
+                return {"skipped": True, "written": 0, "removed": 0, "covers": 0, "books": len(df)}
+    os.makedirs(os.path.join(out_dir, "covers"), exist_ok=True)
+    os.makedirs(data_dir, exist_ok=True)
+
+    # ページと本棚の CSS/JS
+    page = open(os.path.join(TEMPLATE_DIR, "index.html"), encoding="utf-8").read().replace("__TITLE__", html.escape(title))
+    _write(os.path.join(out_dir, "index.html"), page.encode("utf-8"))
+    for name in ("shelf.css", "shelf.js"):
+        with open(os.path.join(SHELF_DIR, name), "rb") as f:
+            _write(os.path.join(out_dir, name), f.read())
+    with open(cover_cache.PLACEHOLDER_PATH, "rb") as f:
+        _write(os.path.join(out_dir, "no_cover.svg"), f.read())
+
+    books, covers = site_books(df) if not df.empty else ([], [])
+    n_covers = 0
+    for src, rel in covers:
+        dst = os.path.join(out_dir, rel)
+        if not os.path.exists(dst):
+            shutil.copyfile(src, dst)
+            n_covers += 1
+
+    # 読了月ごとのファイル（並び替え済みなので同じ月は連続している）
+    months, written = [], 0
+    for book in books:
+        if not months or months[-1]["label"] != book["month"]:
+            months.append({"label": book["month"], "books": []})
+        months[-1]["books"].append(book)
+    index_months = []
+    for m in months:
+        data = json.dumps(m["books"], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        name = f"m-{hashlib.sha1(data).hexdigest()[:12]}.json"
+        written += _write(os.path.join(data_dir, name), data)
+        index_months.append({"label": m["label"], "count": len(m["books"]), "file": name})
+
+    # 使われなくなった月のファイルを消す
+    keep = {m["file"] for m in index_months}
+    removed = 0
+    for name in os.listdir(data_dir):
+        if name.startswith("m-") and name.endswith(".json") and name not in keep:
+            os.remove(os.path.join(data_dir, name))
+            removed += 1
+
+    years = sorted({b["year"] for b in books if b["year"]}, reverse=True)
+    index = {
+        "data_version": data_version,
+        "exported_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "months": index_months,
+        "years": years,
+        "languages": list(df["言語"].cat.categories) if not df.empty else [],
+        "categories": list(df["カテゴリ"].cat.categories) if not df.empty else [],
+    }
+    _write(index_path, json.dumps(index, ensure_ascii=False).encode("utf-8"))
+    return {"skipped": False, "written": written, "removed": removed, "covers": n_covers, "books": len(books)}
+
+
+def export_library(library, out_dir, force=False, mirror=None):
+    mirror = mirror or LocalMirror(storage_name(library))
+    mirror.refresh()
+    if not mirror.has_data():
+        raise SystemExit("データがありません。先にアプリを開いてシートを読み込んでください")
+    df, data_version = normalize_books(mirror.read())
+    return export_site(df, data_version, out_dir, title=library["title"], force=force)
+
+
+def main():
+    import streamlit as st
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lib", help="書き出す本棚の名前（既定は最初の本棚）")
+    ap.add_argument("--out", default=DEFAULT_OUT, help="書き出し先のディレクトリ")
+    ap.add_argument("--force", action="store_true", help="データが変わっていなくても書き直す")
+    ap.add_argument("--watch", type=float, metavar="SECONDS", help="この間隔でデータの変更を確認し続ける")
+    args = ap.parse_args()
+
+    libraries = load_libraries(st.secrets)
+    name = args.lib or next(iter(libraries))
+    if name not in libraries:
+        raise SystemExit(f"本棚「{name}」は見つかりません（{', '.join(libraries)}）")
+    library = libraries[name]
+    mirror = LocalMirror(storage_name(library))
+    last_rev = None
+    while True:
+        rev = mirror.refresh()
+        if rev != last_rev:
+            t = time.perf_counter()
+            result = export_library(library, args.out, force=args.force, mirror=mirror)
+            last_rev = rev
+            if result["skipped"]:
+                print(f"{name}: 変更なし（{result['books']} 冊）")
+            else:
+                print(f"{name}: {result['books']} 冊を書き出しました（月ファイル 書き込み {result['written']} / 削除 {result['removed']}、"
+                      f"書影 {result['covers']} 件、{time.perf_counter() - t:.2f} 秒）→ {args.out}")
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
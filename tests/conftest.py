@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api_gateway  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _unthrottled_sheets(monkeypatch):
+    # 偽のシートには回数制限がないので、テストの中では Sheets の回数制限で待たない
+    monkeypatch.setattr(api_gateway.SHEETS, "bucket", api_gateway.TokenBucket(rate=1000, burst=1000))
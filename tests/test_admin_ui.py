@@ -0,0 +1,41 @@
+from streamlit.testing.v1 import AppTest
+
+from bench.fakes import HEADER, FakeWorksheet
+from local_mirror import LocalMirror
+from sheet_store import SheetStore
+
+
+def _edit_form(path):
+    # AppTest がこの関数の中身をスクリプトとして実行する（import は中に書く）
+    import admin_ui
+    from book_table import normalize_books
+    from local_mirror import LocalMirror
+
+    mirror = LocalMirror(path=path)
+    df, _ = normalize_books(mirror.read())
+    admin_ui.render_edit_form(mirror, df.iloc[0])
+
+
+def test_edit_form_saves_row(tmp_path):
+    path = str(tmp_path / "mirror.sqlite3")
+    mirror = LocalMirror(path=path)
+    mirror.store = SheetStore(FakeWorksheet([HEADER]))
+    mirror.pull_blocking()
+    row_id = mirror.append({"タイトル": "こころ", "著者": "夏目漱石", "評価": "4", "カテゴリ": "小説", "言語": "日本語",
+                            "ステータス": "読了", "コメント": "", "開始日": "2024-01-01", "読了日": "2024-01-10",
+                            "ISBN": "9784101010137"})
+
+    at = AppTest.from_function(_edit_form, args=(path,), default_timeout=30)
+    at.run()
+    assert not at.exception
+    [a for a in at.text_area if a.label == "コメント"][0].input("再読した")
+    at.checkbox[0].check()
+    [b for b in at.button if b.label == "💾 更新を保存する"][0].click()
+    at.run()
+    assert not at.exception
+    assert not at.error
+
+    saved = LocalMirror(path=path).read().set_index("ID").loc[row_id]
+    assert saved["コメント"] == "再読した"
+    assert saved["タイトル"] == "こころ"
+    assert saved["ISBN"] == "9784101010137"
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from api_gateway import Gateway, TokenBucket, is_retryable
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _http_error(status, headers=None):
+    return requests.HTTPError(f"{status}", response=FakeResponse(status, headers))
+
+
+def _flaky(*errors, value="ok"):
+    """errors を順に送出し、最後に value を返す fn と、呼ばれた回数のリスト"""
+    calls = []
+
+    def fn():
+        calls.append(time.monotonic())
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return value
+    return fn, calls
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=20, burst=2)
+    assert bucket.acquire() == 0 and bucket.acquire() == 0
+    t = time.monotonic()
+    assert bucket.acquire() > 0
+    assert time.monotonic() - t >= 0.04
+
+
+def test_concurrent_calls_with_the_same_key_share_one_request():
+    gateway = Gateway("test", rate=100, burst=100)
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return ["result"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gateway.call(fn, key="q"))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    while gateway.stats()["coalesced"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [["result"]] * 5
+    assert gateway.stats()["in_flight"] == 0
+
+
+def test_429_waits_for_retry_after_and_pauses_the_bucket():
+    gateway = Gateway("test", rate=100, burst=100, base_delay=0.01)
+    fn, calls = _flaky(_http_error(429, {"Retry-After": "0.3"}))
+    assert gateway.call(fn) == "ok"
+    assert calls[1] - calls[0] >= 0.3
+    stats = gateway.stats()
+    assert (stats["calls"], stats["retries"], stats["quota"], stats["failed"]) == (2, 1, 1, 0)
+
+
+def test_only_429_is_retried_for_non_idempotent_calls():
+    assert is_retryable(_http_error(429), idempotent=False)
+    assert not is_retryable(_http_error(503), idempotent=False)
+    assert not is_retryable(requests.ConnectionError(), idempotent=False)
+    assert is_retryable(requests.ConnectionError())
+    assert not is_retryable(_http_error(404))
+
+    gateway = Gateway("test", rate=100, burst=100, base_delay=0.01)
+    fn, calls = _flaky(requests.ConnectionError("reset"))
+    with pytest.raises(requests.ConnectionError):
+        gateway.call(fn, idempotent=False)
+    assert len(calls) == 1
+    assert gateway.call(fn) == "ok"
+
+
+def test_gives_up_after_max_tries():
+    gateway = Gateway("test", rate=100, burst=100, max_tries=3, base_delay=0.01)
+    fn, calls = _flaky(*[_http_error(500)] * 5)
+    with pytest.raises(requests.HTTPError):
+        gateway.call(fn)
+    assert len(calls) == 3
+    assert gateway.stats()["failed"] == 1
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from book_table import normalize_books, rating_value, sort_books
+
+COLUMNS = ["タイトル", "著者", "評価", "カテゴリ", "言語", "ステータス", "コメント", "開始日", "読了日", "画像URL", "ID"]
+
+
+def _raw(rows):
+    # ミラーの read() と同じく、空セルは NaN
+    return pd.DataFrame(rows, columns=COLUMNS).replace("", np.nan)
+
+
+def test_normalize_books_reads_mixed_dates_and_ratings():
+    raw = _raw([
+        ["こころ", "夏目漱石", "4", "小説", "日本語", "読了", "", "2024-01-05", "2024/02/03", "", "r1"],
+        ["門", "夏目漱石", "3.6", "", "", "", "再読", "2024/1/7", "", "", "r2"],
+        ["Meditations", "", "", "Stoicism", "英語", "読書中", "", "not a date", "2023-12-31", "", "r3"],
+    ])
+    df, version = normalize_books(raw)
+
+    assert df["開始日_dt"].tolist()[:2] == [pd.Timestamp("2024-01-05"), pd.Timestamp("2024-01-07")]
+    assert pd.isna(df.loc[2, "開始日_dt"])
+    assert df["月ラベル"].tolist() == ["2024年 02月", "日付なし", "2023年 12月"]
+
+    assert str(df["評価"].dtype) == "Int64"
+    assert df["評価"].tolist()[:2] == [4, 4]
+    assert pd.isna(df.loc[2, "評価"])
+    assert [rating_value(v) for v in df["評価"]] == [4, 4, 0]
+
+    # 空欄のカテゴリ・言語・ステータスは既定値、文字列の空欄は ""
+    assert df.loc[1, ["カテゴリ", "言語", "ステータス"]].tolist() == ["その他", "日本語", "読了"]
+    assert df["カテゴリ"].dtype == "category"
+    assert df.loc[2, "著者"] == ""
+    assert len(version) == 16
+
+
+def test_data_version_follows_row_contents():
+    rows = [["こころ", "夏目漱石", "4", "小説", "日本語", "読了", "", "2024-01-05", "2024-02-03", "", "r1"]]
+    _, v1 = normalize_books(_raw(rows))
+    _, v2 = normalize_books(_raw(rows))
+    rows[0][6] = "再読した"
+    _, v3 = normalize_books(_raw(rows))
+    assert v1 == v2 != v3
+
+
+def test_sort_books_puts_undated_books_last():
+    raw = _raw([
+        ["A", "", "", "", "", "", "", "", "2023-01-01", "", "a"],
+        ["B", "", "", "", "", "", "", "", "", "", "b"],
+        ["C", "", "", "", "", "", "", "", "2024-01-01", "", "c"],
+    ])
+    df, _ = normalize_books(raw)
+    assert sort_books(df, "新しい順")["ID"].tolist() == ["c", "a", "b"]
+    assert sort_books(df, "古い順")["ID"].tolist() == ["a", "c", "b"]
@@ -0,0 +1,56 @@
+import pytest
+
+import books_api
+
+
+@pytest.fixture
+def fetches(tmp_path, monkeypatch):
+    """fetch_volumes の代わり（startIndex から通し番号のタイトルを返す。全部で 12 件）と、一時ディレクトリのキャッシュ"""
+    calls = []
+
+    def fetch_volumes(q, max_results=10, start_index=0):
+        calls.append((q, max_results, start_index))
+        n = min(max_results, max(0, 12 - start_index))
+        return [{"title": f"{q} {start_index + i}", "authors": ["著者"],
+                 "imageLinks": {"thumbnail": "http://books.google.com/x?zoom=1"}} for i in range(n)]
+    monkeypatch.setattr(books_api, "fetch_volumes", fetch_volumes)
+    monkeypatch.setattr(books_api, "CACHE_PATH", str(tmp_path / "books_api.sqlite3"))
+    monkeypatch.setattr(books_api, "_cache_conn", None)
+    return calls
+
+
+def test_search_page_pages_through_keyword_results(fetches):
+    results, errors, has_more = books_api.search_page("夜", 0)
+    assert errors == [] and has_more
+    assert [r["title"] for r in results] == [f"夜 {i}" for i in range(9)]
+
+    results, _, has_more = books_api.search_page("夜", 1)
+    assert [r["title"] for r in results] == ["夜 9", "夜 10", "夜 11"]
+    assert not has_more
+    assert [c[2] for c in fetches] == [0, 9]
+
+
+def test_search_page_is_cached_per_page(fetches):
+    first = books_api.search_page("Deep Work", 0)
+    # 表記ゆれ（大文字・空白）は同じキャッシュを使う
+    again = books_api.search_page("deep  work", 0)
+    assert again[0] == first[0] and len(fetches) == 1
+
+
+def test_parse_query_reads_amazon_urls():
+    asin, keyword = books_api.parse_query("https://www.amazon.co.jp/Deep-Work-Cal-Newport-ebook/dp/B00X47ZVXM/ref=sr_1_1")
+    assert asin == "B00X47ZVXM"
+    assert keyword == "Deep Work Cal Newport"
+    assert books_api.parse_query("ノルウェイの森") == (None, "ノルウェイの森")
+
+
+def test_to_candidate_keeps_small_https_thumbnail():
+    volume = {"title": "こころ", "imageLinks": {"thumbnail": "http://books.google.com/books/content?id=x&zoom=1"},
+              "industryIdentifiers": [{"type": "ISBN_10", "identifier": "4101010137"}]}
+    candidate = books_api.to_candidate(volume)
+    assert candidate["thumbnail"] == "https://books.google.com/books/content?id=x&zoom=1"
+    assert (candidate["authors"], candidate["isbn"]) == (books_api.UNKNOWN_AUTHOR, "4101010137")
+
+
+def test_session_leaves_retries_to_the_gateway():
+    assert books_api._session.get_adapter(books_api.API_URL).max_retries.total == 0
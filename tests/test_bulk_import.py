@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+from bulk_import import map_record, read_export
+
+GOODREADS = '''\ufeffBook Id,Title,Author,ISBN13,My Rating,Exclusive Shelf,Date Read,My Review
+1,Meditations,Marcus Aurelius,"=""9780812968255""",5,read,2023/12/31,Short and dense
+2,ノルウェイの森,村上春樹,,0,to-read,,
+3,,No Title,,3,read,,
+'''
+
+
+def test_read_export_maps_goodreads_columns():
+    records = read_export(io.BytesIO(GOODREADS.encode("utf-8")))
+    # タイトルのない行は取り込まない
+    assert [r["タイトル"] for r in records] == ["Meditations", "ノルウェイの森"]
+    first, second = records
+    assert first["著者"] == "Marcus Aurelius"
+    assert first["評価"] == "5"
+    assert first["ステータス"] == "読了"
+    assert first["読了日"] == first["開始日"] == "2023-12-31"
+    assert first["コメント"] == "Short and dense"
+    assert first["ISBN"] == "9780812968255"
+    assert first["言語"] == "英語"
+    # Goodreads の 0 は未評価、言語はタイトルから推定
+    assert second["評価"] == ""
+    assert second["ステータス"] == "読みたい"
+    assert second["言語"] == "日本語"
+    assert second["カテゴリ"] == "その他"
+
+
+def test_read_export_without_title_column():
+    with pytest.raises(ValueError):
+        read_export(io.BytesIO("Name,Author\nx,y\n".encode("utf-8")))
+
+
+def test_map_record_keeps_known_values():
+    rec = map_record({"タイトル": " 門 ", "評価": "7", "ステータス": "断念", "カテゴリ": "小説", "言語": "スペイン語",
+                      "開始日": "2024-01-02", "読了日": "2024-03-04"})
+    assert rec["タイトル"] == "門"
+    assert rec["評価"] == ""
+    assert (rec["ステータス"], rec["カテゴリ"], rec["言語"]) == ("断念", "小説", "スペイン語")
+    assert (rec["開始日"], rec["読了日"]) == ("2024-01-02", "2024-03-04")
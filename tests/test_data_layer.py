@@ -0,0 +1,65 @@
+import pandas as pd
+
+from data_layer import DataLayer
+
+
+class FakeMirror:
+    def __init__(self, rows):
+        self.version = 1
+        self.rows = rows
+
+    def write(self, rows):
+        self.rows = rows
+        self.version += 1
+
+
+def _load(calls):
+    def load(mirror):
+        calls.append(mirror.version)
+        df = pd.DataFrame({"タイトル": mirror.rows})
+        return df, "v" + "|".join(mirror.rows)
+    return load
+
+
+def test_books_loads_once_per_mirror_version():
+    layer, mirror, calls = DataLayer(), FakeMirror(["こころ"]), []
+    df1, v1 = layer.books("alice", mirror, _load(calls))
+    df2, v2 = layer.books("alice", mirror, _load(calls))
+    assert df1 is df2 and v1 == v2 and calls == [1]
+
+    mirror.write(["こころ", "門"])
+    df3, v3 = layer.books("alice", mirror, _load(calls))
+    assert len(df3) == 2 and v3 != v1 and calls == [1, 2]
+
+
+def test_derived_is_shared_and_updated_from_the_previous_version():
+    layer, mirror, calls = DataLayer(), FakeMirror(["こころ"]), []
+    _, v1 = layer.books("alice", mirror, _load(calls))
+    built = []
+    first = layer.derived("alice", v1, "index", lambda: built.append(v1) or {"version": v1})
+    assert layer.derived("alice", v1, "index", lambda: built.append(v1) or {}) is first
+    assert built == [v1]
+
+    mirror.write(["こころ", "門"])
+    _, v2 = layer.books("alice", mirror, _load(calls))
+    # 更新に使うまで残している前のものも、メモリの計算に含める
+    assert set(layer.entries["alice"].sizes) == {"books", "previous:index"}
+    updated = layer.derived("alice", v2, "index", lambda: {"version": "rebuilt"}, lambda old: {**old, "updated": v2})
+    assert updated == {"version": v1, "updated": v2}
+    assert set(layer.entries["alice"].sizes) == {"books", "index"}
+    # 読み込みより古い data_version からの呼び出しは、共有せずにその場で作る
+    assert layer.derived("alice", v1, "index", lambda: "stale") == "stale"
+
+
+def test_least_recently_opened_library_is_evicted():
+    layer = DataLayer(budget_mb=0)
+    alice, bob = FakeMirror(["こころ"]), FakeMirror(["門"])
+    layer.books("alice", alice, _load([]))
+    layer.books("bob", bob, _load([]))
+    # 上限を超えても、直近に開かれた1つは残す
+    assert list(layer.entries) == ["bob"]
+    assert layer.stats()["evictions"] == 1
+
+    calls = []
+    layer.books("alice", alice, _load(calls))
+    assert calls == [1]
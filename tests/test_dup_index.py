@@ -0,0 +1,77 @@
+import pandas as pd
+
+from bench.fakes import FakeWorksheet
+from book_table import normalize_books
+from dup_index import DuplicateIndex, normalize_isbn, title_key
+from libraries import LOCAL_HEADER
+from local_mirror import LocalMirror
+from sheet_store import SheetStore
+
+# ISBN 列を足す前からあるシートの見出し
+OLD_HEADER = [c for c in LOCAL_HEADER if c != "ISBN"]
+
+
+def test_normalize_isbn():
+    # ISBN-10 は ISBN-13 に揃える（チェックディジットも計算し直す）
+    assert normalize_isbn("4-10-101013-X") == "9784101010137"
+    assert normalize_isbn("4101010137") == "9784101010137"
+    assert normalize_isbn("978-4-10-101013-7") == "9784101010137"
+    assert normalize_isbn("b00abc1234") == "B00ABC1234"
+    assert normalize_isbn(None) == ""
+
+
+def test_title_key_ignores_notation():
+    assert title_key("ノルウェイの森（上）") == title_key("のるうぇいの森 上")
+    assert title_key("ＤＥＥＰ　ＷＯＲＫ!") == title_key("Deep Work")
+
+
+def test_find_by_title_author_and_isbn():
+    df = pd.DataFrame({
+        "ID": ["a", "b"],
+        "タイトル": ["こころ", "Deep Work"],
+        "著者": ["夏目漱石", "不明な著者"],
+        "読了日": ["2024-01-10", ""],
+        "ISBN": ["9784101010137", ""],
+    })
+    index = DuplicateIndex(df)
+
+    assert index.find("ココロ", "夏目 漱石")["ID"] == "a"
+    assert index.find("こころ", "別の人") is None
+    # どちらかの著者が不明ならタイトルだけで判断する
+    assert index.find("deep work", "Cal Newport")["ID"] == "b"
+    assert index.find("別のタイトル", "", isbn="4-10-101013-X")["ID"] == "a"
+
+    index.add({"ID": "c", "タイトル": "門", "著者": "夏目漱石"})
+    assert index.find("門", "夏目漱石")["ID"] == "c"
+
+
+def test_isbn_saved_to_an_old_sheet_is_found_after_reload(tmp_path):
+    ws = FakeWorksheet([OLD_HEADER, ["こころ", "夏目漱石", "", "小説", "日本語", "読了", "", "", "", "", "r1"]])
+    mirror = LocalMirror(path=str(tmp_path / "a.sqlite3"))
+    mirror.store = SheetStore(ws)
+    mirror.pull_blocking()
+    # 読み込み時にシートへ ISBN 列が足される
+    assert ws.values[0][-1] == "ISBN"
+    row_id = mirror.append({"タイトル": "門", "著者": "夏目漱石", "ISBN": "4-10-101018-0"})
+    mirror.patch("r1", {"ISBN": "9784101010137"})
+    mirror._sync()
+    assert mirror.status()["pending"] == 0
+
+    reloaded = LocalMirror(path=str(tmp_path / "b.sqlite3"))
+    reloaded.store = SheetStore(ws)
+    reloaded.pull_blocking()
+    df, _ = normalize_books(reloaded.read())
+    index = DuplicateIndex(df)
+    assert index.find("別のタイトル", isbn="9784101010182")["ID"] == row_id
+    assert index.find("別のタイトル", isbn="4-10-101013-X")["ID"] == "r1"
+
+
+def test_local_library_header_gains_isbn(tmp_path):
+    mirror = LocalMirror(path=str(tmp_path / "mirror.sqlite3"))
+    mirror.init_header(OLD_HEADER)
+    row_id = mirror.append({"タイトル": "こころ", "著者": "夏目漱石"})
+    mirror.init_header(LOCAL_HEADER)
+    assert mirror.header[-1] == "ISBN"
+    mirror.patch(row_id, {"ISBN": "9784101010137"})
+    index = DuplicateIndex(mirror.read())
+    assert index.find("別のタイトル", isbn="9784101010137")["ID"] == row_id
@@ -0,0 +1,57 @@
+import time
+
+import books_api
+from bench.fakes import HEADER, FakeWorksheet
+from enrich_worker import EnrichJob
+from local_mirror import LocalMirror
+from sheet_store import SheetStore
+
+HIT = {"title": "こころ", "authors": "夏目漱石", "thumbnail": "https://example.com/kokoro.jpg", "isbn": ""}
+
+
+def _mirror(tmp_path):
+    # 見出しだけのシートから始める（同期スレッドは動かさない）
+    mirror = LocalMirror(path=str(tmp_path / "mirror.sqlite3"))
+    mirror.store = SheetStore(FakeWorksheet([HEADER]))
+    mirror.pull_blocking()
+    return mirror
+
+
+def _run(job):
+    job.start()
+    deadline = time.monotonic() + 10
+    while job.running():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_enrich_job_fills_missing_covers_and_resumes(tmp_path, monkeypatch):
+    mirror = _mirror(tmp_path)
+    missing = mirror.append({"タイトル": "こころ", "著者": ""})
+    unknown = mirror.append({"タイトル": "存在しない本", "著者": "誰か"})
+    complete = mirror.append({"タイトル": "門", "著者": "夏目漱石", "画像URL": "https://example.com/mon.jpg"})
+    queries = []
+
+    def search(query):
+        queries.append(query)
+        return ([HIT], []) if "こころ" in query else ([], [])
+    monkeypatch.setattr(books_api, "search", search)
+
+    path = str(tmp_path / "enrich.sqlite3")
+    job = EnrichJob(mirror, path=path)
+    _run(job)
+    status = job.status()
+    assert (status["total"], status["found"], status["applied"], status["last_error"]) == (2, 1, 1, None)
+
+    books = mirror.read().fillna("").set_index("ID")
+    assert books.loc[missing, ["著者", "画像URL"]].tolist() == ["夏目漱石", HIT["thumbnail"]]
+    assert books.loc[unknown, "画像URL"] == ""
+    # 表紙・著者のそろった本は問い合わせない
+    assert books.loc[complete, "画像URL"] == "https://example.com/mon.jpg"
+    assert len(queries) == 2
+
+    # 再起動しても、問い合わせの済んだ行（候補なしも含む）は問い合わせ直さない
+    job = EnrichJob(mirror, path=path)
+    assert job.targets() == []
+    _run(job)
+    assert len(queries) == 2
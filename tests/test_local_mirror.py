@@ -0,0 +1,145 @@
+import time
+
+from bench.fakes import FakeWorksheet
+from book_table import normalize_books
+from libraries import LOCAL_HEADER
+from local_mirror import LocalMirror
+from sheet_store import SheetStore
+
+ROW = ["こころ", "夏目漱石", "4", "小説", "日本語", "読了", "", "2024-01-01", "2024-01-10", "", "", "r1"]
+
+
+def _mirror(tmp_path, latency=0.0):
+    ws = FakeWorksheet([LOCAL_HEADER, ROW], latency=latency)
+    mirror = LocalMirror(path=str(tmp_path / "mirror.sqlite3"))
+    store = SheetStore(ws)
+    mirror.store = store
+    mirror.pull_blocking()
+    return mirror, ws
+
+
+def _wait(cond, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _row_fp(mirror):
+    df, _ = normalize_books(mirror.read())
+    return df.set_index("ID").loc["r1", "行ハッシュ"]
+
+
+def test_patch_while_previous_patch_is_in_flight(tmp_path):
+    mirror, ws = _mirror(tmp_path, latency=0.3)
+    mirror.attach(mirror.store)
+    mirror.patch("r1", {"コメント": "edit1"}, expected=_row_fp(mirror))
+    _wait(lambda: mirror._inflight)
+    mirror.patch("r1", {"コメント": "edit2"}, expected=_row_fp(mirror))
+    _wait(lambda: mirror.status()["pending"] == 0)
+
+    assert mirror.status()["conflicts"] == 0
+    assert ws.values[1][LOCAL_HEADER.index("コメント")] == "edit2"
+    assert mirror.read().set_index("ID").loc["r1", "コメント"] == "edit2"
+
+
+def test_sync_now_without_store_returns_at_once(tmp_path):
+    mirror = LocalMirror(path=str(tmp_path / "mirror.sqlite3"))
+    mirror.init_header(LOCAL_HEADER)
+    mirror.start()
+    t = time.monotonic()
+    mirror.sync_now(wait=3)
+    assert time.monotonic() - t < 0.5
+
+
+def test_empty_remote_read_keeps_local_rows(tmp_path):
+    mirror, ws = _mirror(tmp_path)
+    for values in ([LOCAL_HEADER], []):
+        ws.values = [list(r) for r in values]
+        mirror._pull_requested = True
+        mirror._sync()
+        status = mirror.status()
+        assert status["remote_empty"] and status["last_error"] is None
+        assert mirror.read()["ID"].tolist() == ["r1"]
+    ws.values = [LOCAL_HEADER, ROW]
+    mirror._pull_requested = True
+    mirror._sync()
+    assert not mirror.status()["remote_empty"]
+
+
+def test_empty_remote_resolved_by_pushing_local_rows(tmp_path):
+    mirror, ws = _mirror(tmp_path)
+    mirror.patch("r1", {"コメント": "未送信の更新"})
+    ws.values = []
+    mirror._sync()
+    assert mirror.status()["remote_empty"]
+
+    mirror.resolve_empty_remote(use_local=True)
+    mirror._sync()
+    assert ws.values[0][:len(LOCAL_HEADER)] == LOCAL_HEADER
+    assert [r[LOCAL_HEADER.index("ID")] for r in ws.values[1:]] == ["r1"]
+    assert ws.values[1][LOCAL_HEADER.index("コメント")] == "未送信の更新"
+    status = mirror.status()
+    assert (status["remote_empty"], status["pending"]) == (False, 0)
+
+
+def test_empty_remote_resolved_by_adopting_it(tmp_path):
+    mirror, ws = _mirror(tmp_path)
+    ws.values = [list(LOCAL_HEADER)]
+    mirror._sync()
+    mirror.resolve_empty_remote(use_local=False)
+    assert mirror.read().empty
+    assert not mirror.status()["remote_empty"]
+    # 消した行は変更履歴から戻せる
+    assert mirror.history(limit=1)[0]["source"] == "sheet"
+
+
+def _fail_after(ws, method):
+    # 書き込みは成功したが、応答が返らなかった（1回だけ）
+    real = getattr(ws, method)
+
+    def call(*args, **kwargs):
+        real(*args, **kwargs)
+        setattr(ws, method, real)
+        raise ConnectionError("connection reset")
+    setattr(ws, method, call)
+
+
+def test_patch_and_delete_resent_after_ambiguous_failure_are_not_conflicts(tmp_path):
+    mirror, ws = _mirror(tmp_path)
+    _fail_after(ws, "batch_update")
+    mirror.patch("r1", {"コメント": "edit"}, expected=_row_fp(mirror))
+    mirror._sync()
+    mirror._sync()
+    status = mirror.status()
+    assert (status["pending"], status["conflicts"]) == (0, 0)
+    assert ws.values[1][LOCAL_HEADER.index("コメント")] == "edit"
+
+    _fail_after(ws, "delete_rows")
+    mirror.delete("r1", expected=_row_fp(mirror))
+    mirror._sync()
+    mirror._sync()
+    status = mirror.status()
+    assert (status["pending"], status["conflicts"]) == (0, 0)
+    assert len(ws.values) == 1
+
+
+def test_append_retried_after_ambiguous_failure_is_not_duplicated(tmp_path):
+    mirror, ws = _mirror(tmp_path)
+    real_append = ws.append_rows
+
+    def append_then_fail(values, **kwargs):
+        # 書き込みは成功したが、応答が返らなかった
+        real_append(values, **kwargs)
+        raise ConnectionError("connection reset")
+
+    ws.append_rows = append_then_fail
+    row_id = mirror.append({"タイトル": "門", "ステータス": "読みたい"})
+    mirror._sync()
+    assert mirror.status()["pending"] == 1
+
+    ws.append_rows = real_append
+    mirror._sync()
+    assert mirror.status()["pending"] == 0
+    ids = [r[LOCAL_HEADER.index("ID")] for r in ws.values[1:]]
+    assert ids.count(row_id) == 1
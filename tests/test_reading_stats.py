@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from book_table import normalize_books
+from reading_stats import compute_stats, month_streaks
+
+COLUMNS = ["タイトル", "著者", "評価", "カテゴリ", "言語", "ステータス", "コメント", "開始日", "読了日", "画像URL", "ID"]
+
+
+def _books(rows):
+    df, _ = normalize_books(pd.DataFrame(rows, columns=COLUMNS).replace("", np.nan))
+    return df
+
+
+def test_compute_stats_counts_finished_books():
+    df = _books([
+        ["A", "", "5", "小説", "日本語", "読了", "", "2024-01-01", "2024-01-11", "", "a"],
+        ["B", "", "3", "AI", "英語", "読了", "", "2024-03-01", "2024-03-05", "", "b"],
+        ["C", "", "4", "小説", "日本語", "読了", "", "", "2024-03-20", "", "c"],
+        ["D", "", "1", "小説", "日本語", "読みたい", "", "", "", "", "d"],
+    ])
+    stats = compute_stats(df)
+
+    assert stats["total"] == 3
+    # 読まなかった2月も0冊として並ぶ
+    assert stats["per_month"].tolist() == [1, 0, 2]
+    assert stats["ratings"].tolist() == [0, 0, 1, 1, 1]
+    assert stats["avg_rating"] == 4.0
+    assert stats["categories"].to_dict() == {"小説": 2, "AI": 1}
+    assert stats["avg_days"] == 7.0
+    assert stats["longest_streak"] == 1
+
+
+def test_month_streaks():
+    months = pd.period_range("2023-01", periods=6, freq="M")
+    assert month_streaks(pd.Series([1, 2, 0, 1, 1, 1], index=months))["longest_streak"] == 3
+    assert month_streaks(pd.Series([], dtype=int)) == {"longest_streak": 0, "current_streak": 0}
+
+    this_month = pd.Timestamp.today().to_period("M")
+    recent = pd.period_range(this_month - 2, this_month, freq="M")
+    assert month_streaks(pd.Series([0, 1, 1], index=recent))["current_streak"] == 2
@@ -0,0 +1,56 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from reading_timeline import ReadingTimeline
+
+
+def _df(periods, status="読了"):
+    return pd.DataFrame({
+        "ステータス": [status] * len(periods),
+        "開始日_dt": pd.to_datetime([s for s, _ in periods]),
+        "読了日_dt": pd.to_datetime([e for _, e in periods]),
+    })
+
+
+def test_overlapping_and_count_match_a_full_scan():
+    rng = np.random.default_rng(0)
+    start = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1000, 500), unit="D")
+    end = start + pd.to_timedelta(rng.integers(0, 60, 500), unit="D")
+    df = _df(list(zip(start, end)))
+    df.index = [f"b{i}" for i in range(len(df))]
+    timeline = ReadingTimeline(df)
+
+    for _ in range(50):
+        a = pd.Timestamp("2019-12-01") + pd.Timedelta(days=int(rng.integers(0, 1100)))
+        b = a + pd.Timedelta(days=int(rng.integers(0, 30)))
+        hit = (df["開始日_dt"] <= b) & (df["読了日_dt"] >= a)
+        assert set(timeline.overlapping(a, b)) == set(df.index[hit])
+        assert timeline.count(a, b) == hit.sum()
+    found = timeline.overlapping(a, b)
+    assert list(found) == list(df.loc[found].sort_values("開始日_dt", kind="stable").index)
+
+
+def test_summary_finds_peak_and_streaks():
+    df = _df([("2024-01-01", "2024-01-10"), ("2024-01-05", "2024-01-20"), ("2024-01-08", "2024-01-09"),
+              ("2024-02-01", "2024-02-03")])
+    summary = ReadingTimeline(df).summary()
+    assert summary["max_concurrent"] == 3
+    assert summary["max_concurrent_on"] == datetime.date(2024, 1, 8)
+    assert summary["reading_streak"] == (datetime.date(2024, 1, 1), datetime.date(2024, 1, 20), 20)
+    assert summary["parallel_streak"] == (datetime.date(2024, 1, 5), datetime.date(2024, 1, 10), 6)
+    assert ReadingTimeline(df).monthly_counts().tolist() == [3, 1]
+
+
+def test_reading_books_run_until_today_and_others_are_skipped():
+    df = pd.concat([
+        _df([("2024-03-01", None)], status="読書中"),
+        _df([("2024-03-01", None)], status="読みたい"),
+        _df([("2024-03-10", "2024-03-01")]),  # 開始日が読了日より後
+    ], ignore_index=True)
+    timeline = ReadingTimeline(df, today="2024-03-31")
+    assert len(timeline) == 1
+    assert list(timeline.overlapping("2024-03-31")) == [0]
+    assert timeline.count("2024-04-01", "2024-04-30") == 0
+    assert ReadingTimeline(df.iloc[:0]).summary()["books"] == 0
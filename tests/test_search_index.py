@@ -0,0 +1,35 @@
+import pandas as pd
+
+from search_index import SearchIndex, normalize_text
+
+
+def _index():
+    df = pd.DataFrame({
+        "タイトル": ["ノルウェイの森", "猫を棄てる", "Deep Work", "夜と霧"],
+        "著者": ["村上春樹", "村上春樹", "Cal Newport", "フランクル"],
+        "コメント": ["", "父の話", "deep な集中", "猫は出てこない"],
+    }, index=[10, 11, 12, 13])
+    return SearchIndex(df)
+
+
+def test_normalize_text_folds_width_case_kana_and_spaces():
+    assert normalize_text("ＤＥＥＰ　Ｗｏｒｋ") == "deepwork"
+    assert normalize_text("ノルウェイ") == normalize_text("のるうぇい")
+
+
+def test_search_matches_every_term_across_fields():
+    index = _index()
+    assert index.search("村上") == [10, 11]
+    assert index.search("村上 猫") == [11]
+    assert index.search("森") == [10]
+    assert index.search("のるうぇい") == [10]
+    assert index.search("存在しない") == []
+    assert index.search("  ") == [10, 11, 12, 13]
+
+
+def test_search_ranks_title_over_comment():
+    index = _index()
+    # 「猫」はタイトルの先頭（11）とコメント（13）にある
+    assert index.search("猫") == [11, 13]
+    # 「deep」はタイトルの先頭とコメントの両方にある本だけ
+    assert index.search("DEEP") == [12]
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from bench.fakes import HEADER, FakeWorksheet
+from sheet_store import SheetStore, row_fingerprint, row_fingerprints
+
+
+class RecordingWorksheet(FakeWorksheet):
+    """書き込みの value_input_option を記録する"""
+
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.options = []
+
+    def append_rows(self, values, **kwargs):
+        self.options.append(kwargs.get("value_input_option"))
+        return super().append_rows(values, **kwargs)
+
+    def batch_update(self, data, **kwargs):
+        if "value_input_option" in kwargs:
+            self.options.append(kwargs["value_input_option"])
+        return super().batch_update(data, **kwargs)
+
+
+def test_row_fingerprints_match_row_fingerprint():
+    df = pd.DataFrame({"タイトル": [" こころ ", None, np.nan, "門"], "評価": [4.0, np.nan, 3.0, 5.0], "": [1, 2, 3, 4]})
+    columns = ["タイトル", "評価", "", "ID"]
+    expected = [row_fingerprint(dict(zip(df.columns, vals)), columns) for vals in df.itertuples(index=False, name=None)]
+    assert row_fingerprints(df, columns) == expected
+
+
+def test_user_text_is_written_raw():
+    # 数式として解釈させない（=HYPERLINK などのセルを書き込ませない）
+    ws = RecordingWorksheet([HEADER])
+    store = SheetStore(ws)
+    store.read()
+    formula = '=HYPERLINK("https://example.com", "こころ")'
+    row_id = store.append_rows([{"タイトル": formula, "コメント": "+1"}])[0]
+    store.patch_rows([(row_id, {"コメント": "@me"}, None)])
+    assert ws.options == ["RAW", "RAW"]
+    assert store.read().set_index("ID").loc[row_id, ["タイトル", "コメント"]].tolist() == [formula, "@me"]
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from book_table import normalize_books
+from similar_books import SimilarBooks, features
+
+COLUMNS = ["タイトル", "著者", "評価", "カテゴリ", "言語", "ステータス", "コメント", "開始日", "読了日", "画像URL", "ID"]
+ROWS = [
+    ["こころ", "夏目漱石", "", "小説", "日本語", "読了", "明治の終わり", "", "", "", "kokoro"],
+    ["門", "夏目漱石", "", "小説", "日本語", "読了", "", "", "", "", "mon"],
+    ["それから", "夏目漱石", "", "小説", "日本語", "読了", "", "", "", "", "sorekara"],
+    ["Deep Work", "Cal Newport", "", "ビジネス", "英語", "読了", "focus", "", "", "", "deep"],
+    ["Digital Minimalism", "Cal Newport", "", "ビジネス", "英語", "読了", "focus", "", "", "", "digital"],
+]
+
+
+def _books(rows):
+    df, _ = normalize_books(pd.DataFrame(rows, columns=COLUMNS).replace("", np.nan))
+    return df
+
+
+def test_features_weight_exact_author_match():
+    feats = features({"タイトル": "門", "著者": "夏目漱石, 森鷗外", "カテゴリ": "小説"})
+    assert feats["t:門"] == 2.0
+    assert "A:夏目漱石" in feats and "A:森鷗外" in feats
+    assert feats["k:小説"] == 1.5
+
+
+def test_neighbours_rank_same_author_first():
+    index = SimilarBooks(_books(ROWS))
+    ids = [row_id for row_id, _ in index.neighbours("deep")]
+    assert ids[0] == "digital"
+    assert "deep" not in ids
+    assert {row_id for row_id, _ in index.neighbours("mon")[:2]} == {"kokoro", "sorekara"}
+    assert index.neighbours("unknown") == []
+
+
+def test_update_recounts_only_changed_rows():
+    index = SimilarBooks(_books(ROWS))
+    assert index.update(_books(ROWS)).last_changed == 0
+
+    rows = [list(r) for r in ROWS if r[-1] != "sorekara"]
+    rows[1][1] = "Cal Newport"  # 門の著者を変える
+    rows.append(["三四郎", "夏目漱石", "", "小説", "日本語", "読了", "", "", "", "", "sanshiro"])
+    index.update(_books(rows))
+    # 変更1・削除1・追加1
+    assert index.last_changed == 3
+    assert "sorekara" not in {row_id for row_id, _ in index.neighbours("kokoro")}
+    assert index.neighbours("kokoro")[0][0] == "sanshiro"
+
+    # 作り直したものと同じ結果になる
+    fresh = SimilarBooks(_books(rows))
+    for row_id in ("kokoro", "mon", "deep"):
+        got = dict(index.neighbours(row_id))
+        want = dict(fresh.neighbours(row_id))
+        assert got.keys() == want.keys()
+        assert np.allclose([got[r] for r in want], list(want.values()))
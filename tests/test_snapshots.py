@@ -0,0 +1,74 @@
+import os
+import time
+
+from bench.fakes import HEADER, FakeWorksheet
+from local_mirror import LocalMirror
+from sheet_store import SheetStore
+
+
+def _mirror(tmp_path):
+    # 見出しだけのシートから始める（同期スレッドは動かさない）
+    mirror = LocalMirror(path=str(tmp_path / "mirror.sqlite3"))
+    mirror.store = SheetStore(FakeWorksheet([HEADER]))
+    mirror.pull_blocking()
+    return mirror
+
+
+def _rows(mirror):
+    return mirror.read().fillna("").set_index("ID")[["タイトル", "コメント"]].to_dict("index")
+
+
+def _tick():
+    # 履歴の時刻が前後の操作と重ならないようにする
+    time.sleep(0.02)
+    ts = time.time()
+    time.sleep(0.02)
+    return ts
+
+
+def test_rollback_to_restores_rows_and_is_recorded(tmp_path):
+    mirror = _mirror(tmp_path)
+    a = mirror.append({"タイトル": "こころ"})
+    b = mirror.append({"タイトル": "門"})
+    mirror.patch(a, {"コメント": "一度目"})
+    ts = _tick()
+    before = _rows(mirror)
+
+    mirror.patch(a, {"コメント": "二度目"})
+    mirror.delete(b)
+    c = mirror.append({"タイトル": "それから"})
+    assert mirror.rollback_preview(ts) == {"added": 1, "changed": 1, "removed": 1}
+
+    assert mirror.rollback_to(ts) == {"added": 1, "changed": 1, "removed": 1}
+    assert _rows(mirror) == before
+    assert c not in _rows(mirror)
+    assert {h["source"] for h in mirror.history(limit=3)} == {"rollback"}
+    # 戻したあとの状態にはもう変更がない
+    assert mirror.rollback_preview(time.time()) == {"added": 0, "changed": 0, "removed": 0}
+
+
+def test_rollback_can_be_undone(tmp_path):
+    mirror = _mirror(tmp_path)
+    a = mirror.append({"タイトル": "こころ"})
+    ts = _tick()
+    mirror.patch(a, {"コメント": "消したくないメモ"})
+    ts_after = _tick()
+
+    mirror.rollback_to(ts)
+    assert _rows(mirror)[a]["コメント"] == ""
+    mirror.rollback_to(ts_after)
+    assert _rows(mirror)[a]["コメント"] == "消したくないメモ"
+
+
+def test_snapshot_seeds_a_new_mirror(tmp_path):
+    mirror = _mirror(tmp_path)
+    a = mirror.append({"タイトル": "こころ", "コメント": "スナップショットから"})
+    assert mirror.snapshot(force=True)
+    # 前回と同じ内容なら書かない
+    assert mirror.snapshot(force=True) is None
+    mirror.db.close()
+    os.remove(mirror.path)
+
+    seeded = LocalMirror(path=mirror.path)
+    assert seeded.header == HEADER
+    assert _rows(seeded) == {a: {"タイトル": "こころ", "コメント": "スナップショットから"}}
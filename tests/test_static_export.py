@@ -0,0 +1,63 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from book_table import normalize_books
+from static_export import export_site
+
+COLUMNS = ["タイトル", "著者", "評価", "カテゴリ", "言語", "ステータス", "コメント", "開始日", "読了日", "画像URL", "ID"]
+ROWS = [
+    ["こころ", "夏目漱石", "4", "小説", "日本語", "読了", "", "2024-01-01", "2024-01-10", "", "a"],
+    ["門", "夏目漱石", "3", "小説", "日本語", "読了", "", "2024-01-11", "2024-01-20", "", "b"],
+    ["Deep Work", "Cal Newport", "5", "ビジネス", "英語", "読了", "", "2023-11-01", "2023-12-01", "http://example.com/c.jpg", "c"],
+]
+
+
+def _books(rows):
+    return normalize_books(pd.DataFrame(rows, columns=COLUMNS).replace("", np.nan))
+
+
+def _index(out):
+    with open(os.path.join(out, "data", "index.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_export_site_writes_one_file_per_month(tmp_path):
+    out = str(tmp_path / "site")
+    df, version = _books(ROWS)
+    result = export_site(df, version, out, title="<テスト>")
+    assert (result["skipped"], result["written"], result["books"]) == (False, 2, 3)
+
+    index = _index(out)
+    assert [(m["label"], m["count"]) for m in index["months"]] == [("2024年 01月", 2), ("2023年 12月", 1)]
+    assert index["years"] == ["2024", "2023"]
+    with open(os.path.join(out, "data", index["months"][1]["file"]), encoding="utf-8") as f:
+        [book] = json.load(f)
+    # 未取得の書影は元のURL（https）のまま
+    assert book["covers"]["grid"] == "https://example.com/c.jpg"
+    page = open(os.path.join(out, "index.html"), encoding="utf-8").read()
+    assert "&lt;テスト&gt;" in page
+    for name in ("shelf.css", "shelf.js", "no_cover.svg"):
+        assert os.path.exists(os.path.join(out, name))
+
+    # 同じ data_version なら何もしない
+    assert export_site(df, version, out)["skipped"]
+
+
+def test_export_site_rewrites_only_changed_months(tmp_path):
+    out = str(tmp_path / "site")
+    df, version = _books(ROWS)
+    export_site(df, version, out)
+    old = {m["label"]: m["file"] for m in _index(out)["months"]}
+
+    rows = [list(r) for r in ROWS]
+    rows[0][6] = "再読した"
+    df, version = _books(rows)
+    result = export_site(df, version, out)
+    new = {m["label"]: m["file"] for m in _index(out)["months"]}
+    assert (result["written"], result["removed"]) == (1, 1)
+    assert new["2023年 12月"] == old["2023年 12月"]
+    assert new["2024年 01月"] != old["2024年 01月"]
+    assert sorted(os.listdir(os.path.join(out, "data"))) == sorted([*new.values(), "index.json"])
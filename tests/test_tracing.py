@@ -0,0 +1,24 @@
+from streamlit.testing.v1 import AppTest
+
+
+def _script():
+    # AppTest がこの関数の中身をスクリプトとして実行する（import は中に書く）
+    import streamlit as st
+
+    import tracing
+
+    tracing.start()
+    with tracing.span("form"):
+        st.text_input("タイトル")
+        st.button("登録")
+        st.markdown("ウィジェットではない要素")
+    tracing.count("rows_rendered", 3)
+    st.session_state.trace = tracing.finish()
+
+
+def test_finish_counts_widgets_of_the_run():
+    at = AppTest.from_function(_script, default_timeout=30)
+    at.run()
+    trace = at.session_state.trace
+    assert trace["counters"] == {"rows_rendered": 3, "widgets": 2}
+    assert [s["name"] for s in trace["spans"]] == ["form"]
@@ -0,0 +1,86 @@
+"""再実行ごとの簡易計測（区間の所要時間とカウンタ）
+
+Streamlit はセッションごとに別スレッドでスクリプトを実行するので、
+計測中のトレースはスレッドローカルに持つ。
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+TRACE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "trace.jsonl")
+# 本番で全セッションを記録したいときは READING_LOG_TRACE=1 で起動する
+TRACE_ALL = os.environ.get("READING_LOG_TRACE") == "1"
+
+_local = threading.local()
+_file_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.spans = []  # (名前, 開始までの秒, 所要秒)
+        self.counters = defaultdict(int)
+
+
+def start():
+    """再実行の先頭で呼ぶ"""
+    _local.trace = Trace()
+
+
+def current():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def span(name):
+    tr = current()
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        if tr is not None:
+            tr.spans.append((name, t - tr.t0, time.perf_counter() - t))
+
+
+def count(name, n=1):
+    tr = current()
+    if tr is not None:
+        tr.counters[name] += n
+
+
+def widget_count():
+    """この再実行で作られたウィジェットの数（Streamlit の内部の集合を読むので、取れなければ None）"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        ids = ctx.shared.widget_ids_this_run if hasattr(ctx, "shared") else ctx.widget_ids_this_run
+        return len(ids.snapshot() if hasattr(ids, "snapshot") else ids)
+    except Exception:
+        return None
+
+
+def finish(write=False, **meta):
+    """計測を締めて dict にする（write=True なら JSONL に追記）"""
+    tr = current()
+    if tr is None:
+        return None
+    _local.trace = None
+    widgets = widget_count()
+    if widgets is not None:
+        tr.counters["widgets"] = widgets
+    record = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "total_ms": round((time.perf_counter() - tr.t0) * 1000, 2),
+        "spans": [{"name": n, "start_ms": round(s * 1000, 2), "ms": round(d * 1000, 2)} for n, s, d in tr.spans],
+        "counters": dict(tr.counters),
+        **meta,
+    }
+    if write:
+        os.makedirs(os.path.dirname(TRACE_PATH), exist_ok=True)
+        with _file_lock, open(TRACE_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return record